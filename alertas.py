@@ -0,0 +1,35 @@
+# alertas.py
+# Productos por debajo de su umbral de reposición. El umbral efectivo es el
+# del producto (productos.stock_minimo), si no el de su categoría
+# (categorias_stock) y si no estadisticas.STOCK_BAJO. El conjunto vive en
+# alertas_stock y se actualiza en la misma transacción que cambia el stock o
+# el umbral, así la página de alertas y el contador del dashboard cuestan
+# O(alertas) y no O(catálogo). Como estadisticas.py, no confirma.
+from repositorios import repos
+import estadisticas
+
+
+def evaluar(conn, producto_ids):
+    """Reevalúa los productos cuyo stock o umbral acaba de cambiar"""
+    cambio = repos(conn).alertas.evaluar(producto_ids, estadisticas.STOCK_BAJO)
+    estadisticas.ajustar(conn, bajo_stock=cambio)
+
+
+def producto_eliminado(conn, producto_id):
+    """Llamar antes de borrar el producto (el ON DELETE CASCADE no ajustaría el contador)"""
+    estadisticas.ajustar(conn, bajo_stock=repos(conn).alertas.descartar(producto_id))
+
+
+def fijar_umbral_categoria(conn, categoria, stock_minimo):
+    """Fija (o quita, con None) el umbral de una categoría y reevalúa sus productos"""
+    repo = repos(conn).alertas
+    if stock_minimo is None:
+        repo.quitar_umbral_categoria(categoria)
+    else:
+        repo.fijar_umbral_categoria(categoria, stock_minimo)
+    estadisticas.ajustar(conn, bajo_stock=repo.evaluar_categoria(categoria, estadisticas.STOCK_BAJO))
+
+
+def listar(conn):
+    """Productos en alerta, con su umbral efectivo, de menor a mayor stock"""
+    return repos(conn).alertas.listar()
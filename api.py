@@ -0,0 +1,54 @@
+# api.py
+# API JSON de solo lectura (/api/v1/<recurso>) para scripts y terminales de
+# venta. Cada respuesta lleva un ETag fuerte calculado con el contador de
+# cambios de la tabla (versiones_tabla) y los parámetros de la petición: si
+# el cliente ya tiene esa versión, la vista responde 304 tras leer una sola
+# fila de versiones_tabla, sin consultar los datos.
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+API_VERSION = 'v1'
+# Recursos expuestos (atributo de repos(conn) y tabla de su contador)
+RECURSOS = ('productos', 'clientes', 'ventas', 'compras')
+
+
+class PeticionInvalida(ValueError):
+    """Parámetros de la API no válidos"""
+
+
+def campos_pedidos(repo, texto):
+    """Columnas de ?campos=a,b validadas contra las que expone el repositorio (None: todas)"""
+    if not texto:
+        return None
+    campos = [c.strip() for c in texto.split(',') if c.strip()]
+    desconocidos = [c for c in campos if c not in repo.CAMPOS]
+    if desconocidos:
+        raise PeticionInvalida(f"Campos desconocidos: {', '.join(desconocidos)}. "
+                               f"Disponibles: {', '.join(repo.CAMPOS)}")
+    return list(dict.fromkeys(campos))
+
+
+def etag(recurso, version, args):
+    """ETag fuerte: mismo recurso, versión y parámetros producen el mismo cuerpo"""
+    parametros = sorted((clave, valor) for clave, valores in args.lists() for valor in valores)
+    huella = hashlib.sha1(repr(parametros).encode('utf-8')).hexdigest()[:16]
+    return f"{API_VERSION}-{recurso}-{version}-{huella}"
+
+
+def _valor(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def cuerpo(pagina, campos, version):
+    """Cuerpo JSON de una página con solo los campos pedidos"""
+    return {
+        'datos': [{c: _valor(fila[c]) for c in campos} for fila in pagina.filas],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+        'version': version,
+    }
@@ -1,19 +1,64 @@
 # app.py - VERSIÓN FINAL COMPLETA
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
+from markupsafe import Markup
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from conexion.conexion import conexion, cerrar_conexion, crear_tablas, verificar_tabla_usuarios
-from forms import ProductoForm, ClienteForm, LoginForm, RegistroForm, VentaForm, CompraForm
+from conexion.conexion import conexion, cerrar_conexion, crear_tablas, verificar_esquema, metricas_pool
+from conexion.conexion import init_app as init_db, dialecto, conexion_exclusiva
+from forms import ProductoForm, ClienteForm, LoginForm, RegistroForm, VentaForm, CompraForm, ImportarForm
 from models_user import Usuario 
+from repositorios import repos
+from paginacion import paginar_lista, tamano_pagina
+from busqueda import indice_productos, indice_clientes, BUSQUEDA_MAX, AUTOCOMPLETAR_LIMITE, AUTOCOMPLETAR_MAX
+from exportacion import FORMATOS, FORMATOS_RECURSO, CODIFICACIONES, EXPORT_LOTE, comprimir, lotes_tabla
+from cache import CacheLRU
+from catalogo import catalogo
+import contrasenas
+from contrasenas import PoolSaturado
+import alertas
+import api
+import bitacora
+import estadisticas
+import migraciones
+import metricas
+import movimientos
+import reportes
+from trabajos import trabajos, resumen as resumen_trabajo, TIPOS as TIPOS_TRABAJO, TrabajoInvalido, TrabajosSaturados
+from diagnostico import sondas
+from ventas import registrar_venta, VentaInvalida
+from compras import registrar_compra, CompraInvalida
+from reportes import ReporteInvalido
+from importacion import importar, leer_filas, detectar_formato
 from datetime import datetime
-from decimal import Decimal
+import click
+import itertools
 import json
-import csv
+import logging
 import os
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Registro JSON en segundo plano con id de correlación por petición (X-Request-ID)
+bitacora.init_app(app)
+log = logging.getLogger('papeleria.app')
+
+# Una conexión del pool por petición, devuelta en el teardown
+init_db(app)
+# Latencia por endpoint y consultas/tiempo/filas de BD por petición (/metrics)
+metricas.init_app(app)
+metricas.registrar_fuente('db_pool', metricas_pool)
+metricas.registrar_fuente('user_cache', Usuario.estadisticas_cache)
+metricas.registrar_fuente('password_pool', contrasenas.pool.estadisticas)
+metricas.registrar_fuente('catalogo', catalogo.estadisticas)
+metricas.registrar_fuente('trabajos', trabajos.estadisticas)
+
+# Tablas HTML ya renderizadas de los listados, válidas mientras no cambie la
+# versión de su tabla (versiones_tabla, que avanzan las escrituras) y como
+# mucho PAGE_CACHE_TTL segundos, por si se perdió el avance de una versión
+cache_listados = CacheLRU(max_entradas=int(os.environ.get('PAGE_CACHE_SIZE', '256')),
+                          ttl=float(os.environ.get('PAGE_CACHE_TTL', '300')))
+metricas.registrar_fuente('page_cache', cache_listados.estadisticas)
+
 # Configuración de Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -25,7 +70,7 @@ def handle_db_error(e=None):
     error_msg = 'Error de conexión a la base de datos'
     if e:
         error_msg = f'Error: {str(e)}'
-        print(f"❌ ERROR BD: {e}")
+        log.error("Error de base de datos: %s", e)
     flash(error_msg, 'error')
     return None
 
@@ -38,7 +83,7 @@ def convertir_tipos_producto(producto):
             producto['precio'] = float(producto['precio'])
             producto['id'] = int(producto['id'])
         except (ValueError, TypeError) as e:
-            print(f"⚠️ Error convirtiendo tipos: {e}")
+            log.warning("Error convirtiendo tipos de producto: %s", e)
             # Mantener valores originales si hay error en conversión
             pass
     return producto
@@ -49,19 +94,28 @@ def convertir_tipos_cliente(cliente):
         try:
             cliente['id'] = int(cliente['id'])
         except (ValueError, TypeError) as e:
-            print(f"⚠️ Error convirtiendo tipos cliente: {e}")
+            log.warning("Error convirtiendo tipos de cliente: %s", e)
             pass
     return cliente
 
-# Inicialización de tablas
-print("🔄 Inicializando tablas de la base de datos...")
+def clave_listado(versiones):
+    """Clave de caché de un listado: vista, parámetros de la petición y versión de sus tablas"""
+    return (request.endpoint, tuple(sorted(request.args.items(multi=True))), tuple(sorted(versiones.items())))
+
+# Verificación del esquema: una sola consulta a schema_version.
+# Las migraciones se aplican con `flask --app app db-migrar` (o AUTO_MIGRATE=1)
 try:
-    if crear_tablas():
-        print("✅ Tablas inicializadas correctamente")
-    else:
-        print("⚠️ Problemas al inicializar tablas")
+    version_esquema = verificar_esquema()
+    if version_esquema is None:
+        log.warning("No se pudo verificar el esquema de la base de datos")
+    elif version_esquema[0] < version_esquema[1]:
+        if os.environ.get('AUTO_MIGRATE') == '1':
+            crear_tablas()
+        else:
+            log.warning("Esquema en versión %s, hay migraciones pendientes hasta la %s: "
+                        "ejecute `flask --app app db-migrar`", *version_esquema)
 except Exception as e:
-    print(f"❌ Error inicializando tablas: {e}")
+    log.exception("Error verificando el esquema: %s", e)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -105,16 +159,18 @@ def registro():
             return render_template('registro.html', title='Registro', form=form)
         
         try:
-            cursor = conn.cursor()
-            hashed_password = generate_password_hash(password)
-            cursor.execute(
-                "INSERT INTO usuarios (nombre, email, password) VALUES (%s, %s, %s)",
-                (nombre, email, hashed_password)
-            )
+            # El hash se calcula en el pool de contraseñas, no en el hilo de la petición
+            hashed_password = contrasenas.pool.cifrar(password)
+            usuario_id = repos(conn).usuarios.crear(nombre, email, hashed_password)
             conn.commit()
+            Usuario.invalidar_cache(usuario_id)
             flash('✅ Registro exitoso. Ahora puedes iniciar sesión.', 'success')
             return redirect(url_for('login'))
             
+        except PoolSaturado:
+            conn.rollback()
+            flash('⏳ Hay demasiadas solicitudes en este momento. Inténtalo de nuevo en unos segundos.', 'error')
+            return render_template('registro.html', title='Registro', form=form), 503
         except Exception as e:
             conn.rollback()
             handle_db_error(e)
@@ -135,7 +191,15 @@ def login():
         
         user = Usuario.get_by_email(email)
         
-        if user and check_password_hash(user.password, password):
+        try:
+            valida, nuevo_hash = contrasenas.pool.verificar(user.password, password) if user else (False, None)
+        except PoolSaturado:
+            flash('⏳ Hay demasiados inicios de sesión en este momento. Inténtalo de nuevo en unos segundos.', 'error')
+            return render_template('login.html', title='Iniciar Sesión', form=form), 503
+        
+        if valida:
+            if nuevo_hash:
+                actualizar_hash(user, nuevo_hash)
             login_user(user)
             next_page = request.args.get('next')
             flash(f' Bienvenido de vuelta, {user.nombre}!', 'success')
@@ -145,6 +209,22 @@ def login():
     
     return render_template('login.html', title='Iniciar Sesión', form=form)
 
+def actualizar_hash(user, nuevo_hash):
+    """Guarda el hash recalculado con el coste actual; si falla, el login sigue adelante"""
+    conn = conexion()
+    if conn is None:
+        return
+    try:
+        repos(conn).usuarios.actualizar_password(user.id, nuevo_hash)
+        conn.commit()
+        user.password = nuevo_hash
+        Usuario.invalidar_cache(user.id)
+    except Exception as e:
+        conn.rollback()
+        log.warning("No se pudo actualizar el hash del usuario %s: %s", user.id, e)
+    finally:
+        cerrar_conexion(conn)
+
 @app.route('/logout')
 @login_required
 def logout():
@@ -193,34 +273,41 @@ def eliminar(id):
 @login_required
 def listar_productos():
     q = request.args.get('q', '').strip()
+    por_pagina = tamano_pagina(request.args.get('por_pagina'))
     conn = conexion()
     if conn is None:
         handle_db_error()
-        return render_template('productos/list.html', title='Productos', productos=[], q=q)
+        return render_template('productos/list.html', title='Productos', q=q, tabla=None)
     
+    tabla = None
     try:
-        cur = conn.cursor(dictionary=True)
-        if q:
-            cur.execute("""
-                SELECT id, nombre, cantidad, precio 
-                FROM productos 
-                WHERE nombre LIKE %s 
-                ORDER BY nombre ASC
-            """, (f"%{q}%",))
-        else:
-            cur.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY nombre ASC")
-        
-        productos_raw = cur.fetchall()
-        # 🔧 CONVERTIR TIPOS DE DATOS
-        productos = [convertir_tipos_producto(p) for p in productos_raw]
+        r = repos(conn)
+        # Mientras la versión de productos no cambie se reutiliza la tabla renderizada
+        clave = clave_listado(r.versiones.leer(['productos']))
+        tabla = cache_listados.obtener(clave)
+        if tabla is None:
+            # Las filas salen de la foto del catálogo en memoria, sin consultar productos
+            foto = catalogo.sincronizar(conn)
+            if q:
+                # Búsqueda en el índice de trigramas, ordenada por relevancia
+                ids = indice_productos.buscar(conn, q)
+                pagina = paginar_lista(ids, request.args.get('despues'), request.args.get('antes'), por_pagina)
+                pagina.total_exacto = len(ids) < BUSQUEDA_MAX
+            else:
+                # Cursor (nombre, id) sobre el orden de la foto; el total solo si se pide (?total=1)
+                pagina = foto.pagina(request.args.get('despues'), request.args.get('antes'), por_pagina)
+                if not request.args.get('total'):
+                    pagina.total = None
+            productos = foto.filas(pagina.filas)
+            tabla = Markup(render_template('productos/_tabla.html', productos=productos, q=q, pagina=pagina))
+            cache_listados.guardar(clave, tabla)
         
     except Exception as e:
         handle_db_error(e)
-        productos = []
     finally:
         cerrar_conexion(conn)
     
-    return render_template('productos/list.html', title='Productos', productos=productos, q=q)
+    return render_template('productos/list.html', title='Productos', q=q, tabla=tabla)
 
 @app.route('/productos/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -230,6 +317,8 @@ def crear_producto():
         nombre = form.nombre.data.strip()
         cantidad = form.cantidad.data
         precio = form.precio.data
+        categoria = (form.categoria.data or '').strip() or 'general'
+        stock_minimo = form.stock_minimo.data
         
         # Validaciones adicionales
         if cantidad < 0:
@@ -246,18 +335,18 @@ def crear_producto():
             return render_template('productos/form.html', title='Nuevo producto', form=form, modo='crear')
         
         try:
-            cur = conn.cursor()
+            repo = repos(conn).productos
             # Verificar si el producto ya existe
-            cur.execute("SELECT id FROM productos WHERE nombre = %s", (nombre,))
-            if cur.fetchone():
+            if repo.id_por_nombre(nombre):
                 flash('❌ Ya existe un producto con ese nombre', 'error')
                 return render_template('productos/form.html', title='Nuevo producto', form=form, modo='crear')
             
-            cur.execute(
-                "INSERT INTO productos (nombre, cantidad, precio) VALUES (%s, %s, %s)",
-                (nombre, cantidad, float(precio))
-            )
+            producto_id = repo.crear(nombre, cantidad, precio, categoria, stock_minimo)
+            estadisticas.producto_creado(conn, cantidad, precio)
+            movimientos.registrar(conn, 'alta', {producto_id: cantidad}, usuario_id=current_user.id)
+            alertas.evaluar(conn, [producto_id])
             conn.commit()
+            indice_productos.agregar(producto_id, nombre)
             flash('✅ Producto agregado correctamente.', 'success')
             return redirect(url_for('listar_productos'))
         except Exception as e:
@@ -277,9 +366,8 @@ def editar_producto(pid):
         return redirect(url_for('listar_productos'))
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, nombre, cantidad, precio FROM productos WHERE id = %s", (pid,))
-        producto_raw = cursor.fetchone()
+        repo = repos(conn).productos
+        producto_raw = repo.por_id(pid)
         
         if not producto_raw:
             flash('❌ Producto no encontrado', 'error')
@@ -291,13 +379,17 @@ def editar_producto(pid):
         form = ProductoForm(data={
             'nombre': producto['nombre'], 
             'cantidad': producto['cantidad'], 
-            'precio': float(producto['precio'])
+            'precio': float(producto['precio']),
+            'categoria': producto['categoria'] or 'general',
+            'stock_minimo': producto['stock_minimo'],
         })
         
         if form.validate_on_submit():
             nombre = form.nombre.data.strip()
             cantidad = form.cantidad.data
             precio = form.precio.data
+            categoria = (form.categoria.data or '').strip() or 'general'
+            stock_minimo = form.stock_minimo.data
             
             # Validaciones
             if cantidad < 0:
@@ -310,16 +402,17 @@ def editar_producto(pid):
             
             try:
                 # Verificar si el nombre ya existe en otro producto
-                cursor.execute("SELECT id FROM productos WHERE nombre = %s AND id != %s", (nombre, pid))
-                if cursor.fetchone():
+                if repo.id_por_nombre(nombre, excluir_id=pid):
                     flash('❌ Ya existe otro producto con ese nombre', 'error')
                     return render_template('productos/form.html', title='Editar producto', form=form, modo='editar', pid=pid)
                 
-                cursor.execute(
-                    "UPDATE productos SET nombre=%s, cantidad=%s, precio=%s WHERE id=%s", 
-                    (nombre, cantidad, float(precio), pid)
-                )
+                repo.actualizar(pid, nombre, cantidad, precio, categoria, stock_minimo)
+                estadisticas.producto_modificado(conn, producto['cantidad'], producto['precio'], cantidad, precio)
+                movimientos.registrar(conn, 'ajuste', {pid: cantidad - producto['cantidad']},
+                                      usuario_id=current_user.id)
+                alertas.evaluar(conn, [pid])
                 conn.commit()
+                indice_productos.agregar(pid, nombre)
                 flash('✅ Producto actualizado correctamente.', 'success')
                 return redirect(url_for('listar_productos'))
             except Exception as e:
@@ -343,9 +436,8 @@ def eliminar_producto(pid):
         return redirect(url_for('listar_productos'))
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT nombre FROM productos WHERE id = %s", (pid,))
-        producto = cursor.fetchone()
+        repo = repos(conn).productos
+        producto = repo.por_id(pid)
         
         if not producto:
             flash('❌ Producto no encontrado.', 'error')
@@ -366,11 +458,15 @@ def eliminar_producto(pid):
             </form>
             '''
         
-        cursor.execute("DELETE FROM productos WHERE id = %s", (pid,))
-        if cursor.rowcount > 0:
+        alertas.producto_eliminado(conn, pid)
+        if repo.eliminar(pid):
+            estadisticas.producto_eliminado(conn, producto['cantidad'], producto['precio'])
+            movimientos.registrar(conn, 'baja', {pid: -int(producto['cantidad'])}, usuario_id=current_user.id)
             conn.commit()
+            indice_productos.eliminar(pid)
             flash(f'✅ Producto "{producto["nombre"]}" eliminado correctamente.', 'success')
         else:
+            conn.rollback()
             flash('⚠️ No se pudo eliminar el producto.', 'warning')
     except Exception as e:
         conn.rollback()
@@ -385,40 +481,43 @@ def eliminar_producto(pid):
 @login_required
 def listar_clientes():
     q = request.args.get('q', '').strip()
+    por_pagina = tamano_pagina(request.args.get('por_pagina'))
     conn = conexion()
     if conn is None:
         handle_db_error()
-        return render_template('clientes/list.html', title='Clientes', clientes=[], q=q)
+        return render_template('clientes/list.html', title='Clientes', q=q, tabla=None)
     
+    tabla = None
     try:
-        cur = conn.cursor(dictionary=True)
-        if q:
-            sql = """
-                SELECT id, nombre, apellido, telefono, email, fecha_registro 
-                FROM clientes 
-                WHERE nombre LIKE %s OR apellido LIKE %s OR email LIKE %s 
-                ORDER BY fecha_registro DESC
-            """
-            q_like = f"%{q}%"
-            cur.execute(sql, (q_like, q_like, q_like))
-        else:
-            cur.execute("""
-                SELECT id, nombre, apellido, telefono, email, fecha_registro 
-                FROM clientes 
-                ORDER BY fecha_registro DESC
-            """)
-        
-        clientes_raw = cur.fetchall()
-        # 🔧 CONVERTIR TIPOS DE DATOS
-        clientes = [convertir_tipos_cliente(c) for c in clientes_raw]
+        r = repos(conn)
+        # Mientras la versión de clientes no cambie se reutiliza la tabla renderizada
+        clave = clave_listado(r.versiones.leer(['clientes']))
+        tabla = cache_listados.obtener(clave)
+        if tabla is None:
+            repo = r.clientes
+            if q:
+                # Búsqueda en el índice de trigramas (nombre, apellido y email)
+                ids = indice_clientes.buscar(conn, q)
+                pagina = paginar_lista(ids, request.args.get('despues'), request.args.get('antes'), por_pagina)
+                pagina.total_exacto = len(ids) < BUSQUEDA_MAX
+                pagina.filas = repo.por_ids(pagina.filas)
+            else:
+                # Paginación por cursor sobre el índice (fecha_registro, id), más recientes primero
+                pagina = repo.pagina(request.args.get('despues'), request.args.get('antes'), por_pagina)
+                if request.args.get('total'):
+                    pagina.total, pagina.total_exacto = repo.contar_aproximado()
+            
+            # 🔧 CONVERTIR TIPOS DE DATOS
+            clientes = [convertir_tipos_cliente(c) for c in pagina.filas]
+            tabla = Markup(render_template('clientes/_tabla.html', clientes=clientes, q=q, pagina=pagina))
+            cache_listados.guardar(clave, tabla)
         
     except Exception as e:
         handle_db_error(e)
-        clientes = []
     finally:
         cerrar_conexion(conn)
     
-    return render_template('clientes/list.html', title='Clientes', clientes=clientes, q=q)
+    return render_template('clientes/list.html', title='Clientes', q=q, tabla=tabla)
 
 @app.route('/clientes/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -437,18 +536,16 @@ def crear_cliente():
             return render_template('clientes/form.html', title='Nuevo cliente', form=form, modo='crear')
         
         try:
-            cur = conn.cursor(dictionary=True)
+            repo = repos(conn).clientes
             # Verificar si el email ya existe
-            cur.execute("SELECT id FROM clientes WHERE email = %s", (email,))
-            if cur.fetchone():
+            if repo.id_por_email(email):
                 flash('❌ Ya existe un cliente con este email', 'error')
                 return render_template('clientes/form.html', title='Nuevo cliente', form=form, modo='crear')
             
-            cur.execute(
-                "INSERT INTO clientes (nombre, apellido, telefono, email) VALUES (%s, %s, %s, %s)",
-                (nombre, apellido, telefono, email)
-            )
+            cliente_id = repo.crear(nombre, apellido, telefono, email)
+            estadisticas.cliente_creado(conn, cliente_id)
             conn.commit()
+            indice_clientes.agregar(cliente_id, nombre, apellido, email)
             flash('✅ Cliente agregado correctamente.', 'success')
             return redirect(url_for('listar_clientes'))
             
@@ -469,9 +566,8 @@ def editar_cliente(cid):
         return redirect(url_for('listar_clientes'))
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, nombre, apellido, telefono, email FROM clientes WHERE id = %s", (cid,))
-        cliente_raw = cursor.fetchone()
+        repo = repos(conn).clientes
+        cliente_raw = repo.por_id(cid)
         
         if not cliente_raw:
             flash('❌ Cliente no encontrado', 'error')
@@ -495,16 +591,13 @@ def editar_cliente(cid):
             
             try:
                 # Verificar si el email ya existe en otro cliente
-                cursor.execute("SELECT id FROM clientes WHERE email = %s AND id != %s", (email, cid))
-                if cursor.fetchone():
+                if repo.id_por_email(email, excluir_id=cid):
                     flash('❌ Ya existe otro cliente con este email', 'error')
                     return render_template('clientes/form.html', title='Editar cliente', form=form, modo='editar', cid=cid)
                 
-                cursor.execute(
-                    "UPDATE clientes SET nombre=%s, apellido=%s, telefono=%s, email=%s WHERE id=%s", 
-                    (nombre, apellido, telefono, email, cid)
-                )
+                repo.actualizar(cid, nombre, apellido, telefono, email)
                 conn.commit()
+                indice_clientes.agregar(cid, nombre, apellido, email)
                 flash('✅ Cliente actualizado correctamente.', 'success')
                 return redirect(url_for('listar_clientes'))
             except Exception as e:
@@ -528,9 +621,8 @@ def eliminar_cliente(cid):
         return redirect(url_for('listar_clientes'))
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT nombre, apellido FROM clientes WHERE id = %s", (cid,))
-        cliente = cursor.fetchone()
+        repo = repos(conn).clientes
+        cliente = repo.por_id(cid)
         
         if not cliente:
             flash('❌ Cliente no encontrado.', 'error')
@@ -551,9 +643,10 @@ def eliminar_cliente(cid):
             </form>
             '''
         
-        cursor.execute("DELETE FROM clientes WHERE id = %s", (cid,))
-        if cursor.rowcount > 0:
+        if repo.eliminar(cid):
+            estadisticas.cliente_eliminado(conn, cliente['fecha_registro'])
             conn.commit()
+            indice_clientes.eliminar(cid)
             flash(f'✅ Cliente "{cliente["nombre"]} {cliente["apellido"]}" eliminado correctamente.', 'success')
         else:
             flash('⚠️ No se pudo eliminar el cliente.', 'warning')
@@ -573,16 +666,7 @@ def listar_ventas():
     ventas = []
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("""
-            SELECT v.*, c.nombre as cliente_nombre, c.apellido as cliente_apellido,
-                   u.nombre as usuario_nombre
-            FROM ventas v
-            JOIN clientes c ON v.cliente_id = c.id
-            JOIN usuarios u ON v.usuario_id = u.id
-            ORDER BY v.fecha_venta DESC
-        """)
-        ventas = cur.fetchall()
+        ventas = repos(conn).ventas.listar()
         
     except Exception as e:
         flash(f'❌ Error al cargar ventas: {str(e)}', 'error')
@@ -597,9 +681,7 @@ def crear_venta():
     form = VentaForm()
     
     if form.validate_on_submit():
-        cliente_id = form.cliente_id.data
-        producto_id = form.producto_id.data
-        cantidad = form.cantidad.data
+        lineas = [(linea.producto_id.data, linea.cantidad.data) for linea in form.lineas]
         
         conn = conexion()
         if conn is None:
@@ -607,55 +689,43 @@ def crear_venta():
             return render_template('ventas/form.html', title='Nueva Venta', form=form)
         
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Verificar que el producto existe y tiene stock
-            cursor.execute("SELECT nombre, precio, cantidad FROM productos WHERE id = %s", (producto_id,))
-            producto = cursor.fetchone()
-            
-            if not producto:
-                flash('❌ Producto no encontrado', 'error')
-                return render_template('ventas/form.html', title='Nueva Venta', form=form)
-            
-            if producto['cantidad'] < cantidad:
-                flash(f'❌ Stock insuficiente. Solo hay {producto["cantidad"]} unidades', 'error')
-                return render_template('ventas/form.html', title='Nueva Venta', form=form)
-            
-            # Verificar que el cliente existe
-            cursor.execute("SELECT id FROM clientes WHERE id = %s", (cliente_id,))
-            if not cursor.fetchone():
-                flash('❌ Cliente no encontrado', 'error')
-                return render_template('ventas/form.html', title='Nueva Venta', form=form)
-            
-            # Calcular total
-            precio_unitario = producto['precio']
-            subtotal = precio_unitario * cantidad
-            
-            # Crear venta
-            cursor.execute(
-                "INSERT INTO ventas (cliente_id, usuario_id, total) VALUES (%s, %s, %s)",
-                (cliente_id, current_user.id, subtotal)
-            )
-            venta_id = cursor.lastrowid
-            
-            # Crear detalle de venta
-            cursor.execute(
-                "INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) VALUES (%s, %s, %s, %s, %s)",
-                (venta_id, producto_id, cantidad, precio_unitario, subtotal)
-            )
-            
-            conn.commit()
-            flash('✅ Venta registrada correctamente', 'success')
+            venta_id, total = registrar_venta(conn, form.cliente_id.data, current_user.id, lineas)
+            flash(f'✅ Venta #{venta_id} registrada correctamente (total ${total:.2f})', 'success')
             return redirect(url_for('listar_ventas'))
-            
+        except VentaInvalida as e:
+            flash(f'❌ {e}', 'error')
         except Exception as e:
-            conn.rollback()
             flash(f'❌ Error al registrar venta: {str(e)}', 'error')
         finally:
             cerrar_conexion(conn)
     
     return render_template('ventas/form.html', title='Nueva Venta', form=form)
 
+@app.route('/api/ventas', methods=['POST'])
+@login_required
+def api_crear_venta():
+    """Venta de varias líneas en JSON: {"cliente_id": 1, "lineas": [{"producto_id": 2, "cantidad": 3}, ...]}"""
+    datos = request.get_json(silent=True) or {}
+    try:
+        cliente_id = int(datos.get('cliente_id'))
+        lineas = [(l.get('producto_id'), l.get('cantidad')) for l in datos.get('lineas') or []]
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Se esperaba cliente_id y una lista de lineas con producto_id y cantidad'}), 400
+    
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    
+    try:
+        venta_id, total = registrar_venta(conn, cliente_id, current_user.id, lineas)
+        return jsonify({'venta_id': venta_id, 'total': float(total)}), 201
+    except VentaInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
+
 # ---- Compras ----
 @app.route('/compras')
 @login_required
@@ -664,15 +734,7 @@ def listar_compras():
     compras = []
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("""
-            SELECT c.*, p.nombre as producto_nombre, u.nombre as usuario_nombre
-            FROM compras c
-            JOIN productos p ON c.producto_id = p.id
-            JOIN usuarios u ON c.usuario_id = u.id
-            ORDER BY c.fecha_compra DESC
-        """)
-        compras = cur.fetchall()
+        compras = repos(conn).compras.listar()
         
     except Exception as e:
         flash(f'❌ Error al cargar compras: {str(e)}', 'error')
@@ -687,10 +749,7 @@ def crear_compra():
     form = CompraForm()
     
     if form.validate_on_submit():
-        proveedor_nombre = form.proveedor_nombre.data.strip()
-        producto_id = form.producto_id.data
-        cantidad = form.cantidad.data
-        precio_compra = form.precio_compra.data
+        lineas = [(l.producto_id.data, l.cantidad.data, l.precio_compra.data) for l in form.lineas]
         
         conn = conexion()
         if conn is None:
@@ -698,90 +757,54 @@ def crear_compra():
             return render_template('compras/form.html', title='Nueva Compra', form=form)
         
         try:
-            cursor = conn.cursor(dictionary=True)
-            
-            # Verificar que el producto existe
-            cursor.execute("SELECT id FROM productos WHERE id = %s", (producto_id,))
-            if not cursor.fetchone():
-                flash('❌ Producto no encontrado', 'error')
-                return render_template('compras/form.html', title='Nueva Compra', form=form)
-            
-            # Registrar compra
-            cursor.execute(
-                "INSERT INTO compras (proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id) VALUES (%s, %s, %s, %s, %s)",
-                (proveedor_nombre, producto_id, cantidad, precio_compra, current_user.id)
-            )
-            
-            # Actualizar stock del producto
-            cursor.execute(
-                "UPDATE productos SET cantidad = cantidad + %s WHERE id = %s",
-                (cantidad, producto_id)
-            )
-            
-            conn.commit()
-            flash('✅ Compra registrada correctamente', 'success')
+            n = registrar_compra(conn, form.proveedor_nombre.data, current_user.id, lineas)
+            flash(f'✅ Compra registrada correctamente ({n} líneas)', 'success')
             return redirect(url_for('listar_compras'))
-            
+        except CompraInvalida as e:
+            flash(f'❌ {e}', 'error')
         except Exception as e:
-            conn.rollback()
             flash(f'❌ Error al registrar compra: {str(e)}', 'error')
         finally:
             cerrar_conexion(conn)
     
     return render_template('compras/form.html', title='Nueva Compra', form=form)
 
+@app.route('/api/compras', methods=['POST'])
+@login_required
+def api_crear_compra():
+    """Pedido de un proveedor en JSON: {"proveedor_nombre": "...", "lineas": [{"producto_id": 2, "cantidad": 3, "precio_compra": 1.5}, ...]}"""
+    datos = request.get_json(silent=True) or {}
+    try:
+        lineas = [(l.get('producto_id'), l.get('cantidad'), l.get('precio_compra')) for l in datos.get('lineas') or []]
+    except AttributeError:
+        return jsonify({'error': 'Se esperaba una lista de lineas con producto_id, cantidad y precio_compra'}), 400
+    
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    
+    try:
+        n = registrar_compra(conn, datos.get('proveedor_nombre'), current_user.id, lineas)
+        return jsonify({'lineas': n}), 201
+    except CompraInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
+
 # ---- Dashboard y Estadísticas ----
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    """Dashboard con estadísticas del sistema"""
+    """Dashboard con estadísticas del sistema (resumen materializado, una sola lectura)"""
     conn = conexion()
     stats = {}
     
     try:
-        cur = conn.cursor(dictionary=True)
-        
-        # Estadísticas de productos
-        cur.execute("SELECT COUNT(*) as total, SUM(cantidad) as stock_total, AVG(precio) as precio_promedio FROM productos")
-        productos_stats = cur.fetchone()
-        if productos_stats:
-            stats['productos'] = {
-                'total': int(productos_stats['total']),
-                'stock_total': int(productos_stats['stock_total'] or 0),
-                'precio_promedio': float(productos_stats['precio_promedio'] or 0)
-            }
-        
-        # Productos con stock bajo
-        cur.execute("SELECT COUNT(*) as bajo_stock FROM productos WHERE cantidad < 10")
-        bajo_stock = cur.fetchone()
-        stats['bajo_stock'] = int(bajo_stock['bajo_stock']) if bajo_stock else 0
-        
-        # Estadísticas de clientes
-        cur.execute("SELECT COUNT(*) as total FROM clientes")
-        clientes_total = cur.fetchone()
-        stats['clientes'] = int(clientes_total['total']) if clientes_total else 0
-        
-        # Clientes registrados este mes
-        cur.execute("SELECT COUNT(*) as este_mes FROM clientes WHERE MONTH(fecha_registro) = MONTH(CURRENT_DATE())")
-        clientes_mes = cur.fetchone()
-        stats['clientes_este_mes'] = int(clientes_mes['este_mes']) if clientes_mes else 0
-        
-        # Estadísticas de ventas
-        cur.execute("SELECT COUNT(*) as total, SUM(total) as ingresos FROM ventas WHERE estado = 'completada'")
-        ventas_stats = cur.fetchone()
-        if ventas_stats:
-            stats['ventas'] = {
-                'total': int(ventas_stats['total']),
-                'ingresos': float(ventas_stats['ingresos'] or 0)
-            }
-        
-        # Estadísticas de compras
-        cur.execute("SELECT COUNT(*) as total FROM compras")
-        compras_stats = cur.fetchone()
-        stats['compras'] = int(compras_stats['total']) if compras_stats else 0
-        
+        stats = estadisticas.leer(conn)
     except Exception as e:
-        print(f"Error obteniendo estadísticas: {e}")
+        log.exception("Error obteniendo estadísticas: %s", e)
         stats = {}
     finally:
         cerrar_conexion(conn)
@@ -791,22 +814,18 @@ def dashboard():
 @app.route('/productos/stock-bajo')
 @login_required
 def productos_stock_bajo():
-    """Productos con stock bajo (menos de 10 unidades)"""
+    """Productos por debajo de su umbral de reposición (lee solo alertas_stock)"""
     conn = conexion()
     productos = []
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("""
-            SELECT id, nombre, cantidad, precio 
-            FROM productos 
-            WHERE cantidad < 10 
-            ORDER BY cantidad ASC
-        """)
-        productos_raw = cur.fetchall()
+        productos_raw = alertas.listar(conn)
         
         # 🔧 CONVERTIR TIPOS DE DATOS
         productos = [convertir_tipos_producto(p) for p in productos_raw]
+        for producto in productos:
+            # Crítico: menos de la mitad de su stock mínimo
+            producto['critico'] = producto['cantidad'] * 2 < producto['umbral']
             
     except Exception as e:
         flash(f'❌ Error al cargar productos con stock bajo: {str(e)}', 'error')
@@ -815,163 +834,395 @@ def productos_stock_bajo():
     
     return render_template('stock_bajo.html', title='Productos con Stock Bajo', productos=productos)
 
-# --- Funciones de exportación ---
-@app.route('/guardar_txt')
+# ---- Autocompletado de los formularios de venta y compra ----
+@app.route('/autocompletar/<recurso>')
 @login_required
-def guardar_txt():
+def autocompletar(recurso):
+    """Sugerencias por prefijo: ?q=texto&limite=N -> {"resultados": [{"id", "etiqueta", ...}]}"""
+    if recurso not in ('productos', 'clientes'):
+        return jsonify({'error': f'Recurso desconocido: {recurso}'}), 404
+    try:
+        limite = max(1, min(int(request.args.get('limite', AUTOCOMPLETAR_LIMITE)), AUTOCOMPLETAR_MAX))
+    except ValueError:
+        return jsonify({'error': 'El límite debe ser un número'}), 400
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'resultados': []})
+    
     conn = conexion()
     if conn is None:
-        handle_db_error()
-        return redirect(url_for('listar_productos'))
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY nombre")
-        productos_raw = cur.fetchall()
-        
-        # 🔧 CONVERTIR TIPOS DE DATOS
-        productos = [convertir_tipos_producto(p) for p in productos_raw]
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"productos_{timestamp}.txt"
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("=" * 60 + "\n")
-            f.write("INVENTARIO DE PRODUCTOS - Librería y Papelería Cueva\n")
-            f.write(f"Exportado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(f"{'ID':<5} {'NOMBRE':<30} {'CANTIDAD':<10} {'PRECIO':<10}\n")
-            f.write("-" * 60 + "\n")
-            
-            for p in productos:
-                f.write(f"{p['id']:<5} {p['nombre']:<30} {p['cantidad']:<10} ${p['precio']:<10.2f}\n")
-            
-            f.write("-" * 60 + "\n")
-            f.write(f"Total de productos: {len(productos)}\n")
-        
-        flash(f'✅ Productos exportados a {filename}', 'success')
+        if recurso == 'productos':
+            # Índice de prefijos y foto del catálogo: ninguna consulta a productos
+            ids = indice_productos.autocompletar(conn, q, limite)
+            resultados = [
+                {'id': p['id'], 'etiqueta': p['nombre'], 'cantidad': p['cantidad'], 'precio': float(p['precio'])}
+                for p in catalogo.sincronizar(conn).filas(ids)
+            ]
+        else:
+            ids = indice_clientes.autocompletar(conn, q, limite)
+            resultados = [{'id': c['id'], 'etiqueta': f"{c['nombre']} {c['apellido']}", 'email': c['email']}
+                          for c in repos(conn).clientes.por_ids(ids)]
+        return jsonify({'resultados': resultados})
     except Exception as e:
-        flash(f'❌ Error al exportar TXT: {str(e)}', 'error')
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
     finally:
         cerrar_conexion(conn)
+
+@app.route('/productos/<int:pid>/stock')
+@login_required
+def stock_producto(pid):
+    """Stock del producto según el libro de movimientos: ?fecha=AAAA-MM-DDTHH:MM:SS (por defecto, ahora)"""
+    fecha = request.args.get('fecha', '').strip()
+    try:
+        fecha = datetime.fromisoformat(fecha).replace(microsecond=0, tzinfo=None) if fecha else None
+    except ValueError:
+        return jsonify({'error': 'La fecha debe tener formato ISO (AAAA-MM-DD o AAAA-MM-DDTHH:MM:SS)'}), 400
     
-    return redirect(url_for('listar_productos'))
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    
+    try:
+        if not repos(conn).productos.por_id(pid):
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        cantidad, leidos = movimientos.stock_en(conn, pid, fecha)
+        return jsonify({'producto_id': pid, 'fecha': fecha.isoformat() if fecha else None,
+                        'cantidad': cantidad, 'movimientos_leidos': leidos})
+    except Exception as e:
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
 
-@app.route('/guardar_json')     
+# ---- API JSON de solo lectura con ETag (ver api.py) ----
+@app.route(f'/api/{api.API_VERSION}/<recurso>')
 @login_required
-def guardar_json():
+def api_listar(recurso):
+    """Página de productos, clientes, ventas o compras: ?campos=a,b&por_pagina=&despues=&antes="""
+    if recurso not in api.RECURSOS:
+        return jsonify({'error': f'Recurso desconocido: {recurso}'}), 404
+    
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    
+    try:
+        r = repos(conn)
+        repo = getattr(r, recurso)
+        campos = api.campos_pedidos(repo, request.args.get('campos'))
+        
+        # Una lectura por clave primaria decide si el cliente ya tiene esta versión
+        version = r.versiones.leer([recurso])[recurso]
+        etag = api.etag(recurso, version, request.args)
+        if request.if_none_match.contains(etag):
+            respuesta = Response(status=304)
+        else:
+            pagina = repo.pagina_campos(campos, request.args.get('despues'), request.args.get('antes'),
+                                        tamano_pagina(request.args.get('por_pagina')))
+            respuesta = jsonify(api.cuerpo(pagina, campos or repo.CAMPOS, version))
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+        return respuesta
+    except api.PeticionInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
+
+# ---- Reportes de ventas (desde los agregados de reportes.py) ----
+def responder_reporte(consulta):
+    """Ejecuta consulta(conn) y responde en JSON; 400 si los parámetros no son válidos"""
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    try:
+        return jsonify(consulta(conn))
+    except ReporteInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
+
+def responder_consulta(consulta):
+    return responder_reporte(lambda conn: reportes.consultar(conn, consulta, reportes.parametros(consulta, request.args)))
+
+@app.route('/reportes/ventas/dia')
+@login_required
+def reporte_ventas_dia():
+    """Ventas e importe por día: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD"""
+    return responder_consulta('dia')
+
+@app.route('/reportes/ventas/producto')
+@login_required
+def reporte_ventas_producto():
+    """Productos más vendidos en el rango (?limite=), o la serie diaria de ?producto_id="""
+    return responder_consulta('producto')
+
+@app.route('/reportes/ventas/usuario')
+@login_required
+def reporte_ventas_usuario():
+    """Ventas e importe por usuario en el rango"""
+    return responder_consulta('usuario')
+
+@app.route('/reportes/ventas/mes')
+@login_required
+def reporte_ventas_mes():
+    """Totales mensuales: ?desde=AAAA-MM&hasta=AAAA-MM"""
+    return responder_consulta('mes')
+
+# --- Funciones de exportación ---
+def respuesta_exportacion(recurso, formato, fragmentos):
+    """Descarga en streaming; con ?comprimir=gzip|xz se entrega un .gz/.xz y, si no, se
+    comprime según Accept-Encoding (Content-Encoding). El compresor trabaja bloque a bloque."""
+    mimetype = FORMATOS[formato][1]
+    nombre = f"{recurso}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    headers = {'Vary': 'Accept-Encoding'}
+    codificacion = request.args.get('comprimir')
+    como_archivo = codificacion in CODIFICACIONES
+    if not como_archivo:
+        codificacion = request.accept_encodings.best_match(list(CODIFICACIONES))
+    if codificacion:
+        extension, tipo_archivo, _ = CODIFICACIONES[codificacion]
+        fragmentos = comprimir(fragmentos, codificacion)
+        if como_archivo:
+            nombre, mimetype = f'{nombre}.{extension}', tipo_archivo
+        else:
+            headers['Content-Encoding'] = codificacion
+    headers['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return Response(fragmentos, mimetype=mimetype, headers=headers)
+
+def exportar_productos(formato):
+    """Descarga del catálogo en streaming desde la foto en memoria: cada bloque
+    de filas se escribe directamente en la respuesta, sin cursor abierto"""
+    generador = FORMATOS[formato][0]
     conn = conexion()
     if conn is None:
         handle_db_error()
         return redirect(url_for('listar_productos'))
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY nombre")
-        productos_raw = cur.fetchall()
-        
-        # 🔧 CONVERTIR TIPOS DE DATOS
-        productos = [convertir_tipos_producto(p) for p in productos_raw]
-        
-        def decimal_default(obj):
-            if isinstance(obj, Decimal):
-                return float(obj)
-            raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"productos_{timestamp}.json"
-        
-        data = {
-            "empresa": "Librería y Papelería Cueva",
-            "fecha_exportacion": datetime.now().isoformat(),
-            "total_productos": len(productos),
-            "productos": productos
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=decimal_default)
-        
-        flash(f'✅ Productos exportados a {filename}', 'success')
+        foto = catalogo.sincronizar(conn)
     except Exception as e:
-        flash(f'❌ Error al exportar JSON: {str(e)}', 'error')
+        flash(f'❌ Error al exportar {formato.upper()}: {str(e)}', 'error')
+        return redirect(url_for('listar_productos'))
     finally:
         cerrar_conexion(conn)
     
-    return redirect(url_for('listar_productos'))
+    return respuesta_exportacion('productos', formato, generador(foto.lotes(EXPORT_LOTE)))
+
+# Página a la que se vuelve si falla la exportación de cada recurso
+LISTADO_EXPORTACION = {'ventas': 'listar_ventas', 'detalle_ventas': 'listar_ventas', 'compras': 'listar_compras'}
+
+@app.route('/exportar/<recurso>/<formato>')
+@login_required
+def exportar_datos(recurso, formato):
+    """Descarga de productos, ventas, detalle_ventas o compras (csv, json, ndjson; txt solo productos)"""
+    if formato not in FORMATOS_RECURSO.get(recurso, ()):
+        abort(404)
+    if recurso == 'productos':
+        return exportar_productos(formato)
+    
+    # Conexión propia: la respuesta se sigue generando después de salir de la vista
+    conn = conexion_exclusiva()
+    if conn is None:
+        handle_db_error()
+        return redirect(url_for(LISTADO_EXPORTACION[recurso]))
+    
+    try:
+        # Primer lote antes de responder: los errores de consulta vuelven al listado
+        lotes = lotes_tabla(conn, recurso)
+        primero = next(lotes, [])
+    except Exception as e:
+        cerrar_conexion(conn)
+        flash(f'❌ Error al exportar {formato.upper()}: {str(e)}', 'error')
+        return redirect(url_for(LISTADO_EXPORTACION[recurso]))
+    
+    def generar():
+        try:
+            yield from FORMATOS[formato][0](itertools.chain([primero], lotes), recurso)
+        finally:
+            cerrar_conexion(conn)
+    
+    return respuesta_exportacion(recurso, formato, generar())
+
+@app.route('/guardar_txt')
+@login_required
+def guardar_txt():
+    return exportar_productos('txt')
+
+@app.route('/guardar_json')     
+@login_required
+def guardar_json():
+    return exportar_productos('json')
 
 @app.route('/guardar_csv')
 @login_required
 def guardar_csv():
+    return exportar_productos('csv')
+
+# --- Importación masiva ---
+def ejecutar_importacion(conn, tipo, archivo, formato):
+    """Importa el archivo y deja al día las estadísticas, el libro de stock y el índice de búsqueda"""
+    informe = importar(conn, tipo, leer_filas(archivo, formato))
+    if informe.guardadas:
+        if tipo == 'productos':
+            movimientos.conciliar(conn, 'importacion')
+        estadisticas.recalcular(conn)
+        (indice_productos if tipo == 'productos' else indice_clientes).invalidar()
+    return informe
+
+@app.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar_datos():
+    form = ImportarForm()
+    informe = None
+    
+    if form.validate_on_submit():
+        archivo = form.archivo.data
+        formato = detectar_formato(archivo.filename)
+        if formato is None:
+            flash('❌ Formato no reconocido: use un archivo .csv, .json o .ndjson', 'error')
+            return render_template('importar.html', title='Importar datos', form=form, informe=None)
+        
+        conn = conexion()
+        if conn is None:
+            handle_db_error()
+            return render_template('importar.html', title='Importar datos', form=form, informe=None)
+        
+        try:
+            informe = ejecutar_importacion(conn, form.tipo.data, archivo.stream, formato)
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(informe.como_dict())
+            flash(f'✅ Importación terminada: {informe.guardadas} guardadas, {informe.con_error} con error',
+                  'success' if not informe.con_error else 'warning')
+        except Exception as e:
+            handle_db_error(e)
+        finally:
+            cerrar_conexion(conn)
+    
+    return render_template('importar.html', title='Importar datos', form=form, informe=informe)
+
+# --- Trabajos en segundo plano (exportaciones y reportes, ver trabajos.py) ---
+TRABAJOS_LISTA = 50
+
+def describir_trabajo(fila):
+    datos = resumen_trabajo(fila)
+    datos['url'] = url_for('estado_trabajo', trabajo_id=fila['id'])
+    if fila['estado'] == 'terminado':
+        datos['descarga'] = url_for('descargar_trabajo', trabajo_id=fila['id'])
+    return datos
+
+@app.route('/trabajos', methods=['GET', 'POST'])
+@login_required
+def listar_trabajos():
+    """GET: trabajos recientes. POST (formulario o JSON): tipo, formato y, para reportes, desde/hasta/limite/producto_id"""
+    quiere_json = request.is_json or request.accept_mimetypes.best == 'application/json'
     conn = conexion()
     if conn is None:
+        if quiere_json:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 503
         handle_db_error()
-        return redirect(url_for('listar_productos'))
+        return render_template('trabajos.html', title='Trabajos', trabajos=[], tipos=TIPOS_TRABAJO)
     
     try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY nombre")
-        productos_raw = cur.fetchall()
-        
-        # 🔧 CONVERTIR TIPOS DE DATOS
-        productos = [convertir_tipos_producto(p) for p in productos_raw]
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"productos_{timestamp}.csv"
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            # Encabezado
-            writer.writerow(['ID', 'Nombre', 'Cantidad', 'Precio'])
-            # Datos
-            for producto in productos:
-                writer.writerow([
-                    producto['id'],
-                    producto['nombre'],
-                    producto['cantidad'],
-                    producto['precio']
-                ])
+        if request.method == 'POST':
+            datos = request.get_json(silent=True) if request.is_json else request.form
+            if not hasattr(datos, 'get'):
+                datos = {}
+            try:
+                fila, nuevo = trabajos.encolar(conn, datos.get('tipo', ''), datos.get('formato', ''), datos,
+                                               current_user.id)
+            except TrabajoInvalido as e:
+                if quiere_json:
+                    return jsonify({'error': str(e)}), 400
+                flash(f'❌ {e}', 'error')
+                return redirect(url_for('listar_trabajos'))
+            except TrabajosSaturados as e:
+                if quiere_json:
+                    return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+                flash(f'⚠️ {e}. Intente de nuevo en unos segundos.', 'warning')
+                return redirect(url_for('listar_trabajos'))
+            if quiere_json:
+                return jsonify(describir_trabajo(fila)), 202 if nuevo else 200, {
+                    'Location': url_for('estado_trabajo', trabajo_id=fila['id'])}
+            flash('✅ Exportación en curso.' if nuevo else 'ℹ️ Ya había una exportación igual; se reutiliza.', 'success')
+            return redirect(url_for('listar_trabajos'))
         
-        flash(f'✅ Productos exportados a {filename}', 'success')
+        trabajos.marcar_sin_conexion(conn)
+        lista = [describir_trabajo(f) for f in repos(conn).trabajos.recientes(TRABAJOS_LISTA)]
+        if quiere_json:
+            return jsonify({'trabajos': lista})
+        return render_template('trabajos.html', title='Trabajos', trabajos=lista, tipos=TIPOS_TRABAJO)
     except Exception as e:
-        flash(f'❌ Error al exportar CSV: {str(e)}', 'error')
+        conn.rollback()
+        handle_db_error(e)
+        if quiere_json:
+            return jsonify({'error': str(e)}), 500
+        return render_template('trabajos.html', title='Trabajos', trabajos=[], tipos=TIPOS_TRABAJO)
+    finally:
+        cerrar_conexion(conn)
+
+@app.route('/trabajos/<int:trabajo_id>')
+@login_required
+def estado_trabajo(trabajo_id):
+    """Estado y progreso de un trabajo en JSON"""
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    try:
+        trabajos.marcar_sin_conexion(conn)
+        fila = repos(conn).trabajos.por_id(trabajo_id)
+        if fila is None:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        return jsonify(describir_trabajo(fila))
+    except Exception as e:
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
+    finally:
+        cerrar_conexion(conn)
+
+@app.route('/trabajos/<int:trabajo_id>/descarga')
+@login_required
+def descargar_trabajo(trabajo_id):
+    """Archivo de un trabajo terminado (404 si no existe o ya se borró por la retención)"""
+    conn = conexion()
+    if conn is None:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 503
+    try:
+        fila = repos(conn).trabajos.por_id(trabajo_id)
+    except Exception as e:
+        handle_db_error(e)
+        return jsonify({'error': str(e)}), 500
     finally:
         cerrar_conexion(conn)
     
-    return redirect(url_for('listar_productos'))
+    if fila is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if fila['estado'] != 'terminado':
+        return jsonify({'error': f"El trabajo está {fila['estado'].replace('_', ' ')}"}), 409
+    ruta = trabajos.ruta(fila)
+    if ruta is None:
+        return jsonify({'error': 'El archivo ya no está disponible; vuelva a pedir la exportación'}), 404
+    return send_file(ruta, mimetype=FORMATOS[fila['formato']][1].split(';')[0], as_attachment=True,
+                     download_name=f"{fila['tipo']}_{fila['id']}.{fila['formato']}", conditional=True)
 
 # --- Ruta para diagnóstico ---
 @app.route('/diagnostico')
 def diagnostico():
-    """Página de diagnóstico del sistema"""
-    resultado = {
-        'tabla_usuarios_existe': verificar_tabla_usuarios(),
-        'usuario_autenticado': current_user.is_authenticated,
-        'base_datos_conectable': conexion() is not None,
-        'fecha_servidor': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
-    
-    conn = conexion()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SHOW TABLES")
-            tablas = [tabla[0] for tabla in cursor.fetchall()]
-            resultado['tablas_existentes'] = tablas
-            
-            # Contar registros
-            cursor.execute("SELECT COUNT(*) as total FROM usuarios")
-            resultado['total_usuarios'] = int(cursor.fetchone()[0])
-            
-            cursor.execute("SELECT COUNT(*) as total FROM productos")
-            resultado['total_productos'] = int(cursor.fetchone()[0])
-            
-            cursor.execute("SELECT COUNT(*) as total FROM clientes")
-            resultado['total_clientes'] = int(cursor.fetchone()[0])
-            
-        except Exception as e:
-            resultado['error'] = str(e)
-        finally:
-            cerrar_conexion(conn)
+    """Página de diagnóstico del sistema (foto refrescada en segundo plano)"""
+    resultado = sondas.foto()
+    if resultado is None:
+        resultado = {'error': 'El diagnóstico se está calculando; recargue la página en unos segundos'}
+    resultado['usuario_autenticado'] = current_user.is_authenticated
+    resultado['fecha_servidor'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     return render_template('diagnostico.html', title='Diagnóstico del Sistema', resultado=resultado)
 
@@ -992,16 +1243,17 @@ def unauthorized_error(error):
 # --- Health check para monitoreo ---
 @app.route('/health')
 def health_check():
-    """Endpoint para verificar el estado del servicio"""
-    try:
-        conn = conexion()
-        if conn and conn.is_connected():
-            cerrar_conexion(conn)
-            return {'status': 'healthy', 'timestamp': datetime.now().isoformat()}, 200
-        else:
-            return {'status': 'unhealthy', 'error': 'Database connection failed'}, 503
-    except Exception as e:
-        return {'status': 'unhealthy', 'error': str(e)}, 503
+    """Endpoint para verificar el estado del servicio (ping cacheado HEALTH_CACHE_TTL segundos)"""
+    ok, error, antiguedad = sondas.salud()
+    if ok:
+        return {'status': 'healthy', 'timestamp': datetime.now().isoformat(), 'antiguedad': antiguedad,
+                'pool': metricas_pool(), 'cache_usuarios': Usuario.estadisticas_cache()}, 200
+    return {'status': 'unhealthy', 'error': error, 'antiguedad': antiguedad, 'pool': metricas_pool()}, 503
+
+@app.route('/metrics')
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(metricas.exportar_prometheus(), mimetype='text/plain; version=0.0.4')
 
 # --- Ruta de prueba para verificar CRUD básico ---
 @app.route('/test-crud')
@@ -1023,6 +1275,139 @@ def test_crud():
         'timestamp': datetime.now().isoformat()
     })
 
+# --- Comandos de mantenimiento (flask --app app <comando>) ---
+@app.cli.command('db-migrar')
+@click.option('--hasta', type=int, help='Aplicar solo hasta esta versión')
+def db_migrar(hasta):
+    """Aplica las migraciones pendientes del esquema"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        aplicadas = migraciones.migrar(conn, hasta=hasta)
+        print(f"✅ {len(aplicadas)} migraciones aplicadas" if aplicadas else "✅ El esquema ya está al día")
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('db-estado')
+def db_estado():
+    """Muestra la versión del esquema y las migraciones pendientes"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        actual, ultima = migraciones.estado(conn)
+        print(f"Versión del esquema: {actual} (última disponible: {ultima})")
+        for version, nombre, _ in migraciones.listar_migraciones(dialecto(conn)):
+            print(f"  [{'x' if version <= actual else ' '}] {nombre}")
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('estadisticas-recalcular')
+def estadisticas_recalcular():
+    """Reconstruye el resumen del dashboard desde las tablas base"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        estadisticas.recalcular(conn)
+        print("✅ Estadísticas recalculadas")
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('reportes-recalcular')
+def reportes_recalcular():
+    """Reconstruye los agregados de ventas de los reportes desde ventas y detalle_ventas"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        reportes.recalcular(conn)
+        print("✅ Agregados de ventas recalculados")
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('stock-umbral')
+@click.argument('categoria', required=False)
+@click.argument('stock_minimo', type=click.IntRange(min=0), required=False)
+@click.option('--quitar', is_flag=True, help='Elimina el umbral de la categoría')
+def stock_umbral(categoria, stock_minimo, quitar):
+    """Fija el umbral de reposición de una categoría (sin argumentos, lista los umbrales)"""
+    if categoria and stock_minimo is None and not quitar:
+        raise click.UsageError('Indique el stock mínimo o --quitar')
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        if categoria:
+            alertas.fijar_umbral_categoria(conn, categoria, None if quitar else stock_minimo)
+            conn.commit()
+        print(f"Umbral general: {estadisticas.STOCK_BAJO}")
+        for fila in repos(conn).alertas.umbrales_categoria():
+            print(f"  {fila['categoria']}: {fila['stock_minimo']}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('stock-cortes')
+def stock_cortes():
+    """Guarda un corte de stock por producto para acotar las consultas de stock por fecha"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        print(f"✅ {movimientos.tomar_cortes(conn)} cortes de stock guardados")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('trabajos-limpiar')
+def trabajos_limpiar():
+    """Aplica la retención de los trabajos en segundo plano y sus archivos"""
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        resultado = trabajos.limpiar(conn)
+        print(f"✅ Trabajos borrados: {resultado['vencidos']} vencidos, {resultado['por_espacio']} por espacio; "
+              f"{resultado['abandonados']} abandonados; {resultado['archivos']} archivos eliminados")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cerrar_conexion(conn)
+
+@app.cli.command('importar')
+@click.argument('tipo', type=click.Choice(['productos', 'clientes']))
+@click.argument('ruta', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'json', 'ndjson']), help='Por defecto según la extensión')
+def importar_cli(tipo, ruta, formato):
+    """Importa productos o clientes desde un archivo CSV, JSON o NDJSON"""
+    formato = formato or detectar_formato(ruta)
+    if formato is None:
+        raise click.UsageError('No se reconoce la extensión; indique --formato')
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return
+    try:
+        with open(ruta, 'rb') as archivo:
+            informe = ejecutar_importacion(conn, tipo, archivo, formato)
+        print(json.dumps(informe.como_dict(), ensure_ascii=False, indent=2))
+    finally:
+        cerrar_conexion(conn)
+
 if __name__ == '__main__':
     print("🚀 Iniciando aplicación Flask...")
     print("📊 Dashboard disponible en: /dashboard")
@@ -0,0 +1,2 @@
+# benchmark/__init__.py
+# Benchmarks de rutas con datos sintéticos (ver benchmark/__main__.py)
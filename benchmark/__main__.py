@@ -0,0 +1,148 @@
+# benchmark/__main__.py
+# Uso:
+#   python -m benchmark sembrar [--escala 1.0] [--reiniciar]
+#   python -m benchmark correr [--hilos 4] [--duracion 10] [--escenarios a,b] [--salida archivo.json]
+#   python -m benchmark comparar base.json nuevo.json [--tolerancia 0.10]
+# Por defecto usa el backend SQLite en instance/benchmark.db (DB_BACKEND y
+# DB_SQLITE_PATH lo cambian), así no hace falta un servidor MySQL.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(RAIZ, 'instance', 'benchmark.db'))
+
+
+def _conectar():
+    from conexion.conexion import conexion_exclusiva
+    conn = conexion_exclusiva()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        sys.exit(1)
+    return conn
+
+
+def sembrar(args):
+    from conexion.conexion import cerrar_conexion
+    from migraciones import migrar
+    from benchmark import datos
+
+    conn = _conectar()
+    try:
+        migrar(conn)
+        if args.reiniciar:
+            datos.vaciar(conn)
+        print(f"Sembrando {datos.volumenes(args.escala)} en {os.environ['DB_BACKEND']}...")
+        tiempos = datos.sembrar(conn, escala=args.escala, semilla=args.semilla)
+        print(f"✅ Datos generados en {round(sum(tiempos.values()), 1)} s")
+    finally:
+        cerrar_conexion(conn)
+    return 0
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def correr(args):
+    from conexion.conexion import cerrar_conexion
+    from repositorios import repos
+    from benchmark import carga
+    from app import app
+
+    conn = _conectar()
+    try:
+        r = repos(conn)
+        volumen = {'productos': r.productos.contar(), 'clientes': r.clientes.contar(),
+                   'ventas': r.ventas.contar(), 'compras': r.compras.contar()}
+    finally:
+        cerrar_conexion(conn)
+    if not volumen['productos'] or not volumen['clientes']:
+        print("✗ La base está vacía: ejecute primero `python -m benchmark sembrar`")
+        return 1
+
+    escenarios = args.escenarios.split(',') if args.escenarios else None
+    print(f"Volumen: {volumen} | {args.hilos} hilos, {args.duracion} s por escenario")
+    resultados = carga.correr(app, volumen, escenarios=escenarios, hilos=args.hilos, duracion=args.duracion,
+                              max_peticiones=args.max_peticiones, calentamiento=args.calentamiento)
+    informe = {
+        'meta': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_actual(),
+            'backend': os.environ['DB_BACKEND'],
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'hilos': args.hilos,
+            'duracion': args.duracion,
+            'volumen': volumen,
+        },
+        'escenarios': resultados,
+        'rss_max_mb': carga.rss_max_mb(),
+    }
+    salida = args.salida or os.path.join(RAIZ, 'instance', f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"✅ Resultados en {salida}")
+    return 0
+
+
+def comparar(args):
+    from benchmark import carga
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding='utf-8') as f:
+        nuevo = json.load(f)
+    for nombre, antes in base['escenarios'].items():
+        despues = nuevo['escenarios'].get(nombre)
+        if despues:
+            print(f"  {nombre:<28} p95 {antes['p95_ms']} -> {despues['p95_ms']} ms   "
+                  f"pet/s {antes['rps']} -> {despues['rps']}")
+    regresiones = carga.comparar(base, nuevo, args.tolerancia)
+    for r in regresiones:
+        print(f"⚠️ Regresión en {r['escenario']}: p95 {r['p95']:+.1%}, pet/s {r['rps']:+.1%}")
+    if not regresiones:
+        print("✅ Sin regresiones")
+    return 1 if regresiones else 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmark')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p = comandos.add_parser('sembrar', help='Genera datos sintéticos')
+    p.add_argument('--escala', type=float, default=1.0, help='1.0 = 100k productos, 50k clientes, 1M ventas, 200k compras')
+    p.add_argument('--semilla', type=int, default=42)
+    p.add_argument('--reiniciar', action='store_true', help='Vacía las tablas antes de sembrar')
+    p.set_defaults(funcion=sembrar)
+
+    p = comandos.add_parser('correr', help='Ejecuta los escenarios de carga')
+    p.add_argument('--hilos', type=int, default=4)
+    p.add_argument('--duracion', type=float, default=10.0, help='Segundos por escenario')
+    p.add_argument('--max-peticiones', type=int, default=None, help='Tope de peticiones por escenario')
+    p.add_argument('--calentamiento', type=int, default=1, help='Peticiones sin medir por hilo')
+    p.add_argument('--escenarios', help='Lista separada por comas (por defecto todos)')
+    p.add_argument('--salida', help='Archivo JSON de resultados')
+    p.set_defaults(funcion=correr)
+
+    p = comandos.add_parser('comparar', help='Compara dos archivos de resultados')
+    p.add_argument('base')
+    p.add_argument('nuevo')
+    p.add_argument('--tolerancia', type=float, default=0.10)
+    p.set_defaults(funcion=comparar)
+
+    args = parser.parse_args(argv[1:])
+    return args.funcion(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
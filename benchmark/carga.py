@@ -0,0 +1,186 @@
+# benchmark/carga.py
+# Generador de carga con hilos sobre el cliente de pruebas de Flask: cada hilo
+# tiene su propia sesión iniciada y repite la petición del escenario durante
+# `duracion` segundos. Se mide la latencia de cada petición (incluida la
+# lectura completa del cuerpo, también en las descargas en streaming).
+import math
+import random
+import resource
+import sys
+import threading
+import time
+
+from benchmark.datos import USUARIO_EMAIL, USUARIO_PASSWORD
+
+_BUSQUEDAS = ('lapiz', 'cuaderno norma', 'boligrafo azul', 'marc', 'calculadora casio', 'a4', 'pelikan')
+_BUSQUEDAS_CLIENTES = ('perez', 'maria gonzalez', 'lucia', 'torres', 'jorge.diaz')
+
+
+class Escenario:
+    def __init__(self, nombre, ruta, metodo='GET', json=None, esperado=200, cabeceras=None):
+        self.nombre = nombre
+        # ruta y json pueden ser funciones (rnd, volumen) para variar cada petición
+        self.ruta = ruta
+        self.metodo = metodo
+        self.json = json
+        self.esperado = esperado
+        self.cabeceras = cabeceras
+
+    def peticion(self, cliente, rnd, volumen):
+        ruta = self.ruta(rnd, volumen) if callable(self.ruta) else self.ruta
+        datos = self.json(rnd, volumen) if callable(self.json) else self.json
+        respuesta = cliente.open(ruta, method=self.metodo, json=datos, headers=self.cabeceras)
+        respuesta.get_data()
+        respuesta.close()
+        return respuesta.status_code
+
+
+def _venta(rnd, volumen):
+    lineas = [{'producto_id': rnd.randint(1, volumen['productos']), 'cantidad': 1}
+              for _ in range(rnd.randint(1, 3))]
+    return {'cliente_id': rnd.randint(1, volumen['clientes']), 'lineas': lineas}
+
+
+def _compra(rnd, volumen):
+    # Entrega típica de un proveedor: 200 líneas
+    lineas = [{'producto_id': rnd.randint(1, volumen['productos']), 'cantidad': rnd.randint(1, 50),
+               'precio_compra': round(rnd.uniform(0.1, 40), 2)} for _ in range(200)]
+    return {'proveedor_nombre': 'Distribuidora Benchmark', 'lineas': lineas}
+
+
+ESCENARIOS = [
+    Escenario('listar_productos', '/productos/lista'),
+    Escenario('listar_productos_busqueda', lambda rnd, v: f"/productos/lista?q={rnd.choice(_BUSQUEDAS)}"),
+    Escenario('listar_productos_total', '/productos/lista?total=1'),
+    Escenario('listar_clientes', '/clientes'),
+    Escenario('listar_clientes_busqueda', lambda rnd, v: f"/clientes?q={rnd.choice(_BUSQUEDAS_CLIENTES)}"),
+    Escenario('dashboard', '/dashboard'),
+    Escenario('stock_bajo', '/productos/stock-bajo'),
+    Escenario('listar_ventas', '/ventas'),
+    Escenario('listar_compras', '/compras'),
+    Escenario('crear_venta', '/api/ventas', metodo='POST', json=_venta, esperado=201),
+    Escenario('crear_compra_200_lineas', '/api/compras', metodo='POST', json=_compra, esperado=201),
+    Escenario('exportar_csv', '/guardar_csv'),
+    Escenario('exportar_json', '/guardar_json'),
+    Escenario('exportar_txt', '/guardar_txt'),
+    Escenario('reporte_ventas_dia', '/reportes/ventas/dia?desde=2000-01-01'),
+    Escenario('reporte_ventas_producto', '/reportes/ventas/producto'),
+    Escenario('reporte_ventas_mes', '/reportes/ventas/mes?desde=2000-01'),
+    Escenario('api_productos', '/api/v1/productos?por_pagina=100'),
+    # '*' coincide con cualquier ETag vigente: mide el camino del 304 (solo lee versiones_tabla)
+    Escenario('api_productos_304', '/api/v1/productos?por_pagina=100', cabeceras={'If-None-Match': '*'},
+              esperado=304),
+    Escenario('health', '/health'),
+]
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return None
+    rango = math.ceil(p / 100 * len(valores_ordenados))
+    return valores_ordenados[max(0, rango - 1)]
+
+
+def rss_max_mb():
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KiB y macOS en bytes
+    return round(maximo / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 3) if segundos is not None else None
+
+
+def resumir(latencias, errores, segundos):
+    latencias = sorted(latencias)
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'segundos': round(segundos, 3),
+        'rps': round(len(latencias) / segundos, 2) if segundos else 0.0,
+        'media_ms': _ms(sum(latencias) / len(latencias)) if latencias else None,
+        'p50_ms': _ms(percentil(latencias, 50)),
+        'p95_ms': _ms(percentil(latencias, 95)),
+        'p99_ms': _ms(percentil(latencias, 99)),
+        'max_ms': _ms(latencias[-1]) if latencias else None,
+        'rss_max_mb': rss_max_mb(),
+    }
+
+
+def _cliente(app):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'email': USUARIO_EMAIL, 'password': USUARIO_PASSWORD})
+    if respuesta.status_code != 302:
+        raise RuntimeError('No se pudo iniciar sesión con el usuario del benchmark: ejecute primero `sembrar`')
+    return cliente
+
+
+def correr_escenario(clientes, escenario, volumen, duracion, max_peticiones=None, calentamiento=1, semilla=0):
+    for cliente in clientes:
+        for _ in range(calentamiento):
+            escenario.peticion(cliente, random.Random(semilla), volumen)
+
+    latencias, errores = [], [0]
+    lock = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def trabajador(cliente, rnd):
+        propias, fallidas = [], 0
+        while time.perf_counter() < fin:
+            with lock:
+                if max_peticiones is not None and len(latencias) + len(propias) >= max_peticiones:
+                    break
+            inicio = time.perf_counter()
+            try:
+                ok = escenario.peticion(cliente, rnd, volumen) == escenario.esperado
+            except Exception:
+                ok = False
+            propias.append(time.perf_counter() - inicio)
+            fallidas += 0 if ok else 1
+            if len(propias) >= 100:
+                with lock:
+                    latencias.extend(propias)
+                propias = []
+        with lock:
+            latencias.extend(propias)
+            errores[0] += fallidas
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajador, args=(cliente, random.Random(semilla + i)))
+             for i, cliente in enumerate(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resumir(latencias, errores[0], time.perf_counter() - inicio)
+
+
+def correr(app, volumen, escenarios=None, hilos=4, duracion=10.0, max_peticiones=None, calentamiento=1,
+           informar=print):
+    """Ejecuta los escenarios indicados (todos por defecto) y devuelve {nombre: resumen}"""
+    app.config['WTF_CSRF_ENABLED'] = False
+    seleccion = [e for e in ESCENARIOS if escenarios is None or e.nombre in escenarios]
+    clientes = [_cliente(app) for _ in range(hilos)]
+    resultados = {}
+    for escenario in seleccion:
+        resumen = correr_escenario(clientes, escenario, volumen, duracion, max_peticiones, calentamiento)
+        resultados[escenario.nombre] = resumen
+        informar(f"  {escenario.nombre:<28} {resumen['peticiones']:>7} pet. {resumen['rps']:>9} pet/s "
+                 f"p50 {resumen['p50_ms']} ms  p95 {resumen['p95_ms']} ms  p99 {resumen['p99_ms']} ms "
+                 f"errores {resumen['errores']}  RSS {resumen['rss_max_mb']} MB")
+    return resultados
+
+
+def comparar(base, nuevo, tolerancia=0.10):
+    """Regresiones de `nuevo` frente a `base` (p95 más alto o menos pet/s que la tolerancia)"""
+    regresiones = []
+    for nombre, antes in base['escenarios'].items():
+        despues = nuevo['escenarios'].get(nombre)
+        if not despues or not antes.get('p95_ms') or not despues.get('p95_ms'):
+            continue
+        cambio_p95 = despues['p95_ms'] / antes['p95_ms'] - 1
+        cambio_rps = despues['rps'] / antes['rps'] - 1 if antes['rps'] else 0.0
+        if cambio_p95 > tolerancia or cambio_rps < -tolerancia:
+            regresiones.append({'escenario': nombre, 'p95': round(cambio_p95, 3), 'rps': round(cambio_rps, 3)})
+    return regresiones
@@ -0,0 +1,177 @@
+# benchmark/datos.py
+# Generador de datos sintéticos con volúmenes realistas. Inserta por lotes con
+# executemany e ids explícitos (la base debe estar vacía), de forma
+# determinista según la semilla, y al final reconstruye las estadísticas y
+# los agregados de los reportes.
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from werkzeug.security import generate_password_hash
+import estadisticas
+import movimientos
+import reportes
+from repositorios import repos
+
+# Volúmenes con escala 1.0
+VOLUMENES = {
+    'productos': 100_000,
+    'clientes': 50_000,
+    'ventas': 1_000_000,
+    'compras': 200_000,
+}
+LOTE = 5000
+LINEAS_POR_VENTA = (1, 3)
+DIAS_HISTORIA = 730
+
+_SQL_VENTAS = ("INSERT INTO ventas (id, cliente_id, usuario_id, fecha_venta, total, estado) "
+               "VALUES (%s, %s, %s, %s, %s, %s)")
+_SQL_DETALLE = ("INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) "
+                "VALUES (%s, %s, %s, %s, %s)")
+
+USUARIO_EMAIL = 'benchmark@cueva.com'
+USUARIO_PASSWORD = 'benchmark'
+
+_ARTICULOS = ('Lápiz', 'Bolígrafo', 'Cuaderno', 'Carpeta', 'Regla', 'Borrador', 'Marcador',
+              'Resaltador', 'Tijeras', 'Pegamento', 'Grapadora', 'Sacapuntas', 'Cartulina',
+              'Compás', 'Calculadora', 'Agenda', 'Archivador', 'Sobre', 'Cinta', 'Corrector')
+_VARIANTES = ('HB', '2B', 'azul', 'negro', 'rojo', 'A4', 'A5', 'oficio', 'espiral', 'cuadriculado',
+              'rayado', 'metálico', 'escolar', 'profesional', 'pequeño', 'grande', 'pack x3', 'pack x12')
+_MARCAS = ('Norma', 'Faber', 'Pelikan', 'Bic', 'Stabilo', 'Maped', 'Staedtler', 'Pilot', 'Casio', 'Artesco')
+_NOMBRES = ('Juan', 'María', 'José', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Lucía', 'Jorge', 'Sofía',
+            'Andrés', 'Valeria', 'Diego', 'Camila', 'Pedro', 'Gabriela', 'Miguel', 'Daniela')
+_APELLIDOS = ('Pérez', 'González', 'Rodríguez', 'López', 'Martínez', 'Sánchez', 'Ramírez', 'Torres',
+              'Flores', 'Rivera', 'Gómez', 'Díaz', 'Cruz', 'Morales', 'Ortiz', 'Gutiérrez', 'Chávez')
+_PROVEEDORES = ('Distribuidora Andina', 'Papelera del Sur', 'Útiles Quito', 'Importadora Central',
+                'Comercial Pichincha', 'Suministros Guayas')
+
+
+def volumenes(escala):
+    return {tabla: max(1, int(n * escala)) for tabla, n in VOLUMENES.items()}
+
+
+def _sin_tildes(texto):
+    return texto.translate(str.maketrans('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN')).lower()
+
+
+def _insertar(conn, sql, filas):
+    """Inserta un iterable de tuplas en lotes de LOTE filas; devuelve cuántas"""
+    cur = conn.cursor()
+    lote, total = [], 0
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            cur.executemany(sql, lote)
+            conn.commit()
+            total += len(lote)
+            lote = []
+    if lote:
+        cur.executemany(sql, lote)
+        conn.commit()
+        total += len(lote)
+    return total
+
+
+def _fecha(rnd, ahora):
+    return (ahora - timedelta(seconds=rnd.randrange(DIAS_HISTORIA * 86400))).replace(microsecond=0)
+
+
+def base_vacia(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM productos")
+    return cur.fetchone()[0] == 0
+
+
+def vaciar(conn):
+    """Borra los datos de negocio (en orden de claves foráneas)"""
+    cur = conn.cursor()
+    for tabla in ('detalle_ventas', 'ventas', 'compras', 'alertas_stock', 'movimientos_stock', 'stock_cortes',
+                  'productos', 'clientes', 'usuarios',
+                  'estadisticas_resumen', 'estadisticas_clientes_mes',
+                  'ventas_dia_producto', 'ventas_dia_usuario', 'ventas_mes'):
+        cur.execute(f"DELETE FROM {tabla}")
+    repos(conn).versiones.incrementar(('productos', 'productos_recarga', 'productos_nombres', 'clientes', 'ventas', 'compras'))
+    conn.commit()
+
+
+def sembrar(conn, escala=1.0, semilla=42, informar=print):
+    """Carga productos, clientes, ventas (con detalle) y compras. Devuelve los tiempos por tabla."""
+    if not base_vacia(conn):
+        raise RuntimeError('La base ya tiene productos: use --reiniciar para vaciarla antes de sembrar')
+    n = volumenes(escala)
+    rnd = random.Random(semilla)
+    ahora = datetime.now()
+    tiempos = {}
+
+    def medir(tabla, sql, filas):
+        inicio = time.perf_counter()
+        total = _insertar(conn, sql, filas)
+        tiempos[tabla] = round(time.perf_counter() - inicio, 3)
+        informar(f"  {tabla}: {total} filas en {tiempos[tabla]} s")
+
+    # Usuario con el que el benchmark inicia sesión
+    cur = conn.cursor()
+    cur.execute("INSERT INTO usuarios (id, nombre, email, password) VALUES (%s, %s, %s, %s)",
+                (1, 'Benchmark', USUARIO_EMAIL, generate_password_hash(USUARIO_PASSWORD)))
+    conn.commit()
+
+    precios = [Decimal(rnd.randrange(25, 15000)) / 100 for _ in range(n['productos'])]
+
+    def productos():
+        for i in range(n['productos']):
+            nombre = f"{rnd.choice(_ARTICULOS)} {rnd.choice(_MARCAS)} {rnd.choice(_VARIANTES)} {i + 1}"
+            yield (i + 1, nombre, rnd.randrange(0, 500), precios[i])
+    medir('productos', "INSERT INTO productos (id, nombre, cantidad, precio) VALUES (%s, %s, %s, %s)",
+          productos())
+
+    def clientes():
+        for i in range(n['clientes']):
+            nombre, apellido = rnd.choice(_NOMBRES), rnd.choice(_APELLIDOS)
+            email = f"{_sin_tildes(nombre)}.{_sin_tildes(apellido)}{i + 1}@ejemplo.com"
+            telefono = '09' + ''.join(rnd.choice('0123456789') for _ in range(8))
+            yield (i + 1, nombre, apellido, telefono, email, _fecha(rnd, ahora))
+    medir('clientes', "INSERT INTO clientes (id, nombre, apellido, telefono, email, fecha_registro) "
+                      "VALUES (%s, %s, %s, %s, %s, %s)", clientes())
+
+    # Ventas y detalle se generan juntos: el total de cada venta es la suma de sus líneas
+    inicio = time.perf_counter()
+    ventas, detalle = [], []
+    for i in range(n['ventas']):
+        venta_id, total = i + 1, Decimal(0)
+        lineas = min(rnd.randint(*LINEAS_POR_VENTA), n['productos'])
+        for producto_id in rnd.sample(range(1, n['productos'] + 1), lineas):
+            cantidad = rnd.randint(1, 5)
+            precio = precios[producto_id - 1]
+            detalle.append((venta_id, producto_id, cantidad, precio, precio * cantidad))
+            total += precio * cantidad
+        ventas.append((venta_id, rnd.randint(1, n['clientes']), 1, _fecha(rnd, ahora), total, 'completada'))
+        if len(ventas) >= LOTE or i == n['ventas'] - 1:
+            cur.executemany(_SQL_VENTAS, ventas)
+            cur.executemany(_SQL_DETALLE, detalle)
+            conn.commit()
+            ventas, detalle = [], []
+    tiempos['ventas'] = round(time.perf_counter() - inicio, 3)
+    informar(f"  ventas (con detalle): {n['ventas']} filas en {tiempos['ventas']} s")
+
+    def compras():
+        for i in range(n['compras']):
+            producto_id = rnd.randint(1, n['productos'])
+            precio = (precios[producto_id - 1] * Decimal('0.6')).quantize(Decimal('0.01'))
+            yield (i + 1, rnd.choice(_PROVEEDORES), producto_id, rnd.randint(1, 100), precio,
+                   _fecha(rnd, ahora), 1)
+    medir('compras', "INSERT INTO compras (id, proveedor_nombre, producto_id, cantidad, precio_compra, "
+                     "fecha_compra, usuario_id) VALUES (%s, %s, %s, %s, %s, %s, %s)", compras())
+
+    # Las cargas directas no pasan por los repositorios: se avanzan los contadores de la API
+    repos(conn).versiones.incrementar(('productos', 'productos_recarga', 'productos_nombres', 'clientes', 'ventas', 'compras'))
+    # El stock sembrado entra al libro como un movimiento inicial por producto
+    movimientos.conciliar(conn, 'inicial')
+
+    inicio = time.perf_counter()
+    estadisticas.recalcular(conn)
+    tiempos['estadisticas'] = round(time.perf_counter() - inicio, 3)
+
+    inicio = time.perf_counter()
+    reportes.recalcular(conn)
+    tiempos['reportes'] = round(time.perf_counter() - inicio, 3)
+    return tiempos
@@ -0,0 +1,136 @@
+# bitacora.py
+# Registro estructurado sobre el módulo logging. Los módulos usan
+# logging.getLogger('papeleria.<modulo>'); los mensajes pasan por una cola
+# (QueueHandler) y un hilo (QueueListener) los escribe, así la petición nunca
+# espera a stderr. Cada registro lleva el id de correlación de la petición.
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+# Fracción de los mensajes DEBUG/INFO de los registradores ruidosos que se conserva
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+# Registradores de alto volumen (abrir/cerrar conexiones, búsquedas de usuario)
+RUIDOSOS = ('papeleria.conexion.pool', 'papeleria.usuarios')
+
+RAIZ = 'papeleria'
+_ID_VALIDO = re.compile(r'^[\w.-]{1,64}$')
+# Atributos estándar de LogRecord: el resto son campos de `extra`
+_ESTANDAR = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'peticion_id'}
+
+_listener = None
+
+
+class FiltroContexto(logging.Filter):
+    """Añade el id de la petición en curso (se evalúa en el hilo que registra)"""
+
+    def filter(self, record):
+        record.peticion_id = g.get('peticion_id') if has_request_context() else None
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar 1 de cada N mensajes por debajo de WARNING; los avisos y errores siempre"""
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.cada = max(1, round(1 / tasa)) if tasa > 0 else None
+        self._contador = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.cada is None:
+            return False
+        return next(self._contador) % self.cada == 0
+
+
+class FormateadorJSON(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'peticion_id', None):
+            datos['peticion_id'] = record.peticion_id
+        for clave, valor in vars(record).items():
+            if clave not in _ESTANDAR and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info:
+            datos['exc'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(peticion_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'peticion_id'):
+            record.peticion_id = None
+        return super().format(record)
+
+
+def configurar(nivel=LOG_LEVEL, formato=LOG_FORMAT, tasa_muestreo=LOG_SAMPLE_RATE, destino=None):
+    """Instala la cola y el hilo escritor en el registrador 'papeleria' (idempotente)"""
+    global _listener
+    raiz = logging.getLogger(RAIZ)
+    raiz.setLevel(nivel)
+    if _listener is not None:
+        return raiz
+
+    salida = logging.StreamHandler(destino or sys.stderr)
+    salida.setFormatter(FormateadorJSON() if formato == 'json' else FormateadorTexto())
+
+    cola = queue.SimpleQueue()
+    encolador = logging.handlers.QueueHandler(cola)
+    # El id de petición se toma antes de encolar, en el hilo de la petición
+    encolador.addFilter(FiltroContexto())
+    raiz.addHandler(encolador)
+    raiz.propagate = False
+
+    for nombre in RUIDOSOS:
+        logging.getLogger(nombre).addFilter(FiltroMuestreo(tasa_muestreo))
+
+    _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener)
+    return raiz
+
+
+def detener():
+    """Vacía la cola y detiene el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _asignar_id():
+    propuesto = request.headers.get('X-Request-ID', '')
+    g.peticion_id = propuesto if _ID_VALIDO.match(propuesto) else uuid.uuid4().hex
+
+
+def _devolver_id(respuesta):
+    peticion_id = g.get('peticion_id')
+    if peticion_id:
+        respuesta.headers['X-Request-ID'] = peticion_id
+    return respuesta
+
+
+def init_app(app):
+    configurar()
+    app.before_request(_asignar_id)
+    app.after_request(_devolver_id)
@@ -0,0 +1,235 @@
+# busqueda.py
+import bisect
+import heapq
+import itertools
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from repositorios import repos
+
+# Máximo de resultados que devuelve una búsqueda (se paginan después)
+BUSQUEDA_MAX = int(os.environ.get('SEARCH_MAX_RESULTS', '500'))
+# Edad máxima del índice: recoge también cambios hechos directamente en la base
+BUSQUEDA_REFRESCO = float(os.environ.get('SEARCH_REFRESH', '300'))
+# Si la versión de los textos indexados (versiones_tabla) cambió, se recarga como
+# mucho una vez cada tantos segundos; entre medias las rutas lo mantienen con agregar()
+BUSQUEDA_RECARGA_MIN = float(os.environ.get('SEARCH_RELOAD_MIN', '5'))
+# Entradas de la lista de trigramas más corta que revisa como mucho una búsqueda
+BUSQUEDA_REVISION = int(os.environ.get('SEARCH_MAX_CANDIDATES', '5000'))
+# Sugerencias por defecto y máximas del autocompletado, y palabras que revisa como mucho
+AUTOCOMPLETAR_LIMITE = 10
+AUTOCOMPLETAR_MAX = 50
+AUTOCOMPLETAR_REVISION = 2000
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Lápiz HB' -> 'lapiz hb'"""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.casefold().split())
+
+
+def _claves(texto):
+    """Trigramas del texto con un espacio a cada lado, más los inicios de palabra"""
+    relleno = f" {texto} "
+    claves = {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+    claves.update(f" {palabra[0]}" for palabra in texto.split())
+    return claves
+
+
+def _claves_consulta(termino):
+    # Términos cortos solo pueden buscarse como inicio de palabra
+    if len(termino) < 3:
+        return {f" {termino}"}
+    return {termino[i:i + 3] for i in range(len(termino) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice invertido de trigramas en memoria para búsqueda por subcadena.
+
+    Se carga con `sql` (id seguido de las columnas de texto) la primera vez
+    que se usa. Con `tabla` (la clave de versiones_tabla que avanzan solo los
+    cambios de los textos indexados, no los de stock) se recarga cuando cambia
+    su versión (como mucho cada BUSQUEDA_RECARGA_MIN segundos) y, en
+    cualquier caso, cada BUSQUEDA_REFRESCO; entre recargas las rutas lo
+    mantienen al día con agregar() y eliminar(). Guarda además la lista
+    ordenada de (palabra, id) para autocompletar por prefijo.
+    """
+
+    def __init__(self, sql, tabla=None, refresco=BUSQUEDA_REFRESCO, recarga_min=BUSQUEDA_RECARGA_MIN):
+        self.sql = sql
+        self.tabla = tabla
+        self.refresco = refresco
+        self.recarga_min = recarga_min
+        self._textos = {}
+        self._postings = defaultdict(set)
+        self._palabras = []  # (palabra, id) ordenada: búsqueda por prefijo con bisect
+        self._lock = threading.RLock()
+        self._carga_lock = threading.Lock()
+        self._cargado_en = None
+        self._version = None  # versión de la tabla leída antes de la última carga
+        self._pendientes = None  # cambios recibidos durante una recarga
+        self.recargas = 0
+
+    def asegurar_cargado(self, conn):
+        version = repos(conn).versiones.leer([self.tabla])[self.tabla] if self.tabla else None
+        if self._vigente(version):
+            return
+        # Si ya hay un índice (aunque viejo) no se espera a otra recarga en curso
+        if not self._carga_lock.acquire(blocking=self._cargado_en is None):
+            return
+        try:
+            if self._vigente(version):
+                return
+            with self._lock:
+                self._pendientes = []
+
+            textos, postings, palabras = {}, defaultdict(set), []
+            cur = conn.cursor()
+            cur.execute(self.sql)
+            for fila in cur.fetchall():
+                texto = normalizar(' '.join(str(c) for c in fila[1:] if c))
+                textos[fila[0]] = texto
+                for clave in _claves(texto):
+                    postings[clave].add(fila[0])
+                palabras.extend((palabra, fila[0]) for palabra in set(texto.split()))
+            palabras.sort()
+
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, None
+                self._textos, self._postings, self._palabras = textos, postings, palabras
+                self._cargado_en = time.monotonic()
+                self._version = version
+                self.recargas += 1
+                for doc_id, texto in pendientes:
+                    self._aplicar(doc_id, texto)
+        finally:
+            with self._lock:
+                self._pendientes = None
+            self._carga_lock.release()
+
+    def _vigente(self, version):
+        cargado_en = self._cargado_en
+        if cargado_en is None:
+            return False
+        edad = time.monotonic() - cargado_en
+        return edad < self.refresco and (version == self._version or edad < self.recarga_min)
+
+    def agregar(self, doc_id, *campos):
+        """Alta o modificación de un registro"""
+        self._registrar(doc_id, normalizar(' '.join(str(c) for c in campos if c)))
+
+    def eliminar(self, doc_id):
+        self._registrar(doc_id, None)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+    def _registrar(self, doc_id, texto):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((doc_id, texto))
+            self._aplicar(doc_id, texto)
+
+    def _aplicar(self, doc_id, texto):
+        anterior = self._textos.pop(doc_id, None)
+        if anterior is not None:
+            for clave in _claves(anterior):
+                ids = self._postings.get(clave)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[clave]
+            for palabra in set(anterior.split()):
+                i = bisect.bisect_left(self._palabras, (palabra, doc_id))
+                if i < len(self._palabras) and self._palabras[i] == (palabra, doc_id):
+                    del self._palabras[i]
+        if texto is not None:
+            self._textos[doc_id] = texto
+            for clave in _claves(texto):
+                self._postings[clave].add(doc_id)
+            for palabra in set(texto.split()):
+                bisect.insort(self._palabras, (palabra, doc_id))
+
+    def buscar(self, conn, consulta, limite=BUSQUEDA_MAX):
+        """Ids que contienen todos los términos de la consulta, por relevancia.
+
+        Bajo el bloqueo se revisan como mucho BUSQUEDA_REVISION entradas de la
+        lista de trigramas más corta, comprobando las demás; la verificación
+        y la puntuación se hacen después, sin bloquear, guardando solo los
+        `limite` mejores a medida que se puntúan.
+        """
+        consulta = normalizar(consulta)
+        terminos = consulta.split()
+        if not terminos:
+            return []
+        self.asegurar_cargado(conn)
+
+        with self._lock:
+            listas = []
+            for termino in terminos:
+                for clave in _claves_consulta(termino):
+                    ids = self._postings.get(clave)
+                    if not ids:
+                        return []
+                    listas.append(ids)
+            listas.sort(key=len)
+            candidatos = [
+                (doc_id, self._textos[doc_id]) for doc_id in itertools.islice(listas[0], BUSQUEDA_REVISION)
+                if all(doc_id in ids for ids in listas[1:])
+            ]
+
+        resultados = (
+            (self._puntuar(texto, consulta), doc_id) for doc_id, texto in candidatos
+            if all((f" {t}" in f" {texto}") if len(t) < 3 else (t in texto) for t in terminos)
+        )
+        return [doc_id for _, doc_id in heapq.nsmallest(limite, resultados)]
+
+    def autocompletar(self, conn, consulta, limite=AUTOCOMPLETAR_LIMITE):
+        """Ids con alguna palabra que empieza por cada término, los mejores primero.
+
+        Recorre con bisect el tramo de palabras del término más largo (el más
+        selectivo), revisando como mucho AUTOCOMPLETAR_REVISION entradas.
+        """
+        consulta = normalizar(consulta)
+        terminos = consulta.split()
+        if not terminos:
+            return []
+        self.asegurar_cargado(conn)
+        guia = max(terminos, key=len)
+
+        with self._lock:
+            candidatos = {}
+            i = bisect.bisect_left(self._palabras, (guia,))
+            for palabra, doc_id in self._palabras[i:i + AUTOCOMPLETAR_REVISION]:
+                if not palabra.startswith(guia):
+                    break
+                candidatos[doc_id] = self._textos[doc_id]
+
+        resultados = (
+            (self._puntuar(texto, consulta), doc_id) for doc_id, texto in candidatos.items()
+            if all(f" {t}" in f" {texto}" for t in terminos)
+        )
+        return [doc_id for _, doc_id in heapq.nsmallest(limite, resultados)]
+
+    @staticmethod
+    def _puntuar(texto, consulta):
+        # Menor es mejor: coincidencia exacta, prefijo, inicio de palabra, posición, longitud
+        posicion = texto.find(consulta)
+        return (
+            texto != consulta,
+            not texto.startswith(consulta),
+            f" {consulta}" not in f" {texto}",
+            posicion if posicion >= 0 else len(texto),
+            len(texto),
+        )
+
+
+# Las ventas y compras avanzan 'productos' (stock) pero no 'productos_nombres'
+indice_productos = IndiceTrigramas("SELECT id, nombre FROM productos", tabla='productos_nombres')
+indice_clientes = IndiceTrigramas("SELECT id, nombre, apellido, email FROM clientes", tabla='clientes')
@@ -0,0 +1,65 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+
+_SIN_VALOR = object()
+
+
+class CacheLRU:
+    """Caché en memoria acotada por número de entradas (LRU) y por antigüedad (TTL).
+
+    Es segura entre hilos y lleva contadores de aciertos y fallos para
+    poder exponer la tasa de acierto.
+    """
+
+    def __init__(self, max_entradas=1000, ttl=None):
+        self.max_entradas = max(1, int(max_entradas))
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (valor, expira_en)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is not _SIN_VALOR:
+                valor, expira_en = entrada
+                if expira_en is None or expira_en > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+            self.fallos += 1
+            return defecto
+
+    def guardar(self, clave, valor):
+        expira_en = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira_en)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self, clave=_SIN_VALOR):
+        """Elimina una clave, o todo el contenido si no se indica ninguna"""
+        with self._lock:
+            if clave is _SIN_VALOR:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+                'tasa_acierto': round(self.aciertos / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,181 @@
+# catalogo.py
+# Foto compacta del catálogo de productos en memoria, una por proceso. Ids,
+# cantidades y precios (en centavos) viven en arreglos tipados paralelos y
+# los nombres en una lista, con mapas id -> posición y nombre -> posición;
+# así listados, exportaciones y ventas no crean un dict por fila leída de la
+# base. Antes de usarla se compara su versión con versiones_tabla (una fila
+# por clave primaria): si solo cambió 'productos' se releen las filas con
+# version_fila mayor; si cambió 'productos_recarga' (bajas, cargas masivas)
+# se recarga entera. Como respaldo (un avance de versión perdido, ver
+# repositorios/base.py) también se recarga entera pasada una edad máxima.
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from busqueda import normalizar
+from paginacion import Pagina, PAGINA_TAMANO, codificar_cursor, decodificar_cursor
+from repositorios import repos
+
+TABLAS = ('productos', 'productos_recarga')
+# Segundos tras los que la foto se recarga entera aunque las versiones no cambien
+CATALOGO_EDAD_MAX = float(os.environ.get('CATALOG_MAX_AGE', '300'))
+
+
+def _centavos(precio):
+    return int((Decimal(str(precio)) * 100).to_integral_value())
+
+
+class Catalogo:
+    def __init__(self, edad_max=CATALOGO_EDAD_MAX):
+        self._lock = threading.Lock()
+        self.edad_max = edad_max
+        self.recargas = 0
+        self.parciales = 0
+        self._vaciar()
+
+    def _vaciar(self):
+        self.ids = array('q')
+        self.nombres = []
+        self.cantidades = array('q')
+        self.precios = array('q')
+        self._posicion = {}
+        self._por_nombre = {}
+        self._orden = None  # posiciones en el orden de ids_ordenados(), se calcula al pedirla
+        self._claves = None  # (nombre normalizado, id) en ese mismo orden, para buscar cursores
+        self.version = None
+        self.recarga = None
+        self._cargada_en = None
+
+    def invalidar(self):
+        with self._lock:
+            self._vaciar()
+
+    def sincronizar(self, conn):
+        """Pone la foto al día con la base y la devuelve"""
+        versiones = repos(conn).versiones.leer(TABLAS)
+        with self._lock:
+            if (self.version is None or versiones['productos_recarga'] != self.recarga
+                    or versiones['productos'] < self.version
+                    or time.monotonic() - self._cargada_en > self.edad_max):
+                self._cargar(conn, versiones)
+            elif versiones['productos'] != self.version:
+                self._aplicar(repos(conn).productos.cambios(self.version))
+                self.version = versiones['productos']
+                self.parciales += 1
+        return self
+
+    def _cargar(self, conn, versiones):
+        self._vaciar()
+        for pid, nombre, cantidad, precio in repos(conn).productos.catalogo():
+            self._agregar(pid, nombre, cantidad, precio)
+        self.version, self.recarga = versiones['productos'], versiones['productos_recarga']
+        self._cargada_en = time.monotonic()
+        self.recargas += 1
+
+    def _agregar(self, pid, nombre, cantidad, precio):
+        self._posicion[pid] = len(self.ids)
+        self._por_nombre[nombre] = len(self.ids)
+        self.ids.append(pid)
+        self.nombres.append(nombre)
+        self.cantidades.append(int(cantidad))
+        self.precios.append(_centavos(precio))
+
+    def _aplicar(self, filas):
+        for fila in filas:
+            i = self._posicion.get(fila['id'])
+            if i is None:
+                self._agregar(fila['id'], fila['nombre'], fila['cantidad'], fila['precio'])
+                self._orden = None
+                continue
+            if self.nombres[i] != fila['nombre']:
+                if self._por_nombre.get(self.nombres[i]) == i:
+                    del self._por_nombre[self.nombres[i]]
+                self._por_nombre[fila['nombre']] = i
+                self.nombres[i] = fila['nombre']
+                self._orden = None
+            self.cantidades[i] = int(fila['cantidad'])
+            self.precios[i] = _centavos(fila['precio'])
+
+    def _fila(self, i):
+        return {
+            'id': self.ids[i],
+            'nombre': self.nombres[i],
+            'cantidad': self.cantidades[i],
+            'precio': Decimal(self.precios[i]).scaleb(-2),
+        }
+
+    def filas(self, ids):
+        """Productos de los ids indicados (los que existan), en el orden de la lista"""
+        with self._lock:
+            return [self._fila(self._posicion[pid]) for pid in ids if pid in self._posicion]
+
+    def producto(self, pid):
+        with self._lock:
+            i = self._posicion.get(pid)
+            return self._fila(i) if i is not None else None
+
+    def id_por_nombre(self, nombre):
+        with self._lock:
+            i = self._por_nombre.get(nombre)
+            return self.ids[i] if i is not None else None
+
+    def _ordenar(self):
+        if self._orden is None:
+            self._claves = sorted((normalizar(nombre), pid) for pid, nombre in zip(self.ids, self.nombres))
+            self._orden = array('q', (self._posicion[pid] for _, pid in self._claves))
+
+    def ids_ordenados(self):
+        """Ids por nombre (sin tildes ni mayúsculas) e id: el orden de listados y exportaciones"""
+        with self._lock:
+            self._ordenar()
+            return [self.ids[i] for i in self._orden]
+
+    def pagina(self, despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+        """Página de ids por cursor (nombre, id), como ProductoRepo.pagina() pero sobre la foto.
+
+        El inicio se busca por bisección en el orden de ids_ordenados(), así
+        un cursor sigue siendo válido aunque se agreguen o quiten productos.
+        """
+        valores = decodificar_cursor(despues or antes, 2)
+        if valores is not None and not (isinstance(valores[0], str) and isinstance(valores[1], int)):
+            valores = None
+        hacia_atras = valores is not None and not despues
+        with self._lock:
+            self._ordenar()
+            total = len(self._orden)
+            if valores is None:
+                inicio, fin = 0, min(total, por_pagina)
+            elif hacia_atras:
+                fin = bisect_left(self._claves, (normalizar(valores[0]), valores[1]))
+                inicio = max(0, fin - por_pagina)
+            else:
+                inicio = bisect_right(self._claves, (normalizar(valores[0]), valores[1]))
+                fin = min(total, inicio + por_pagina)
+            posiciones = self._orden[inicio:fin]
+            ids = [self.ids[i] for i in posiciones]
+            cursores = [codificar_cursor([self.nombres[i], self.ids[i]]) for i in posiciones[:1] + posiciones[-1:]]
+        siguiente = anterior = None
+        if ids:
+            anterior = cursores[0] if inicio > 0 else None
+            siguiente = cursores[-1] if fin < total else None
+        return Pagina(ids, siguiente=siguiente, anterior=anterior, total=total)
+
+    def lotes(self, tamano):
+        """Listas de como mucho `tamano` productos en orden de nombre (exportaciones)"""
+        ids = self.ids_ordenados()
+        for inicio in range(0, len(ids), tamano):
+            yield self.filas(ids[inicio:inicio + tamano])
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'productos': len(self.ids),
+                'version': self.version or 0,
+                'recargas': self.recargas,
+                'parciales': self.parciales,
+            }
+
+
+catalogo = Catalogo()
@@ -0,0 +1,71 @@
+# compras.py
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from repositorios import repos
+import alertas
+import estadisticas
+import movimientos
+
+# Largo máximo del nombre del proveedor (como en CompraForm)
+PROVEEDOR_MAX = 120
+
+
+class CompraInvalida(Exception):
+    """Error de validación de una compra (proveedor, productos, cantidades o precios)"""
+
+
+def normalizar_lineas(lineas):
+    """Valida las líneas (producto_id, cantidad, precio_compra) y las devuelve con sus tipos"""
+    normalizadas = []
+    for producto_id, cantidad, precio in lineas:
+        try:
+            producto_id, cantidad, precio = int(producto_id), int(cantidad), Decimal(str(precio))
+        except (TypeError, ValueError, InvalidOperation):
+            raise CompraInvalida('Cada línea necesita un producto, una cantidad y un precio numéricos')
+        if producto_id < 1 or cantidad < 1 or not precio.is_finite() or precio < 0:
+            raise CompraInvalida('Cada línea necesita un producto válido, una cantidad mayor que cero '
+                                 'y un precio no negativo')
+        normalizadas.append((producto_id, cantidad, precio.quantize(Decimal('0.01'))))
+    if not normalizadas:
+        raise CompraInvalida('La compra no tiene productos')
+    return normalizadas
+
+
+def registrar_compra(conn, proveedor_nombre, usuario_id, lineas):
+    """Registra un pedido de N líneas de un proveedor en una sola transacción.
+
+    `lineas` es un iterable de tuplas (producto_id, cantidad, precio_compra);
+    un mismo producto puede repetirse con precios distintos. Valida todos los
+    productos con una única consulta, inserta las compras con executemany y
+    suma el stock de todos los productos con un único UPDATE. Devuelve el
+    número de líneas registradas.
+    """
+    proveedor_nombre = str(proveedor_nombre or '').strip()
+    if not 2 <= len(proveedor_nombre) <= PROVEEDOR_MAX:
+        raise CompraInvalida(f'El proveedor debe tener entre 2 y {PROVEEDOR_MAX} caracteres')
+    lineas = normalizar_lineas(lineas)
+
+    # Unidades recibidas por producto, en el orden de aparición
+    incrementos = OrderedDict()
+    for producto_id, cantidad, _ in lineas:
+        incrementos[producto_id] = incrementos.get(producto_id, 0) + cantidad
+
+    r = repos(conn)
+    try:
+        # Todos los productos en una sola consulta (bloqueados hasta el commit en MySQL)
+        existentes = {p['id'] for p in r.productos.por_ids(list(incrementos))}
+        faltantes = [str(pid) for pid in incrementos if pid not in existentes]
+        if faltantes:
+            raise CompraInvalida(f"Producto no encontrado: {', '.join(faltantes)}")
+
+        r.compras.crear_lote(proveedor_nombre, usuario_id, lineas)
+        r.productos.sumar_stock_lote(incrementos)
+        movimientos.registrar(conn, 'compra', incrementos, usuario_id=usuario_id)
+        estadisticas.compra_registrada(conn, len(lineas), unidades=sum(incrementos.values()))
+        alertas.evaluar(conn, list(incrementos))
+
+        conn.commit()
+        return len(lineas)
+    except Exception:
+        conn.rollback()
+        raise
@@ -1,179 +1,196 @@
 # conexion.py
+import logging
+import os
+import sqlite3
+import threading
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
+from conexion.pool import PoolConexiones, PoolAgotado
+from conexion.instrumentacion import ConexionInstrumentada
+from conexion.sqlite import ConexionSQLite
+
+# Motor de base de datos: 'mysql' (producción) o 'sqlite' (local, sin servidor)
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql').lower()
+DB_SQLITE_PATH = os.environ.get(
+    'DB_SQLITE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'papeleria.db')
+)
+
+# Configuración tomada del entorno (con los valores de desarrollo por defecto)
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', '3306')),
+    'database': os.environ.get('DB_NAME', 'papeleria_cueva'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', 'uea2025'),
+    'autocommit': False,  # Desactivar autocommit para controlar manualmente
+    # Cursores con buffer: varias consultas comparten la conexión de la petición
+    'buffered': True,
+}
+
+POOL_TAMANO = int(os.environ.get('DB_POOL_SIZE', '5'))
+POOL_ESPERA_MAX = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+POOL_PING_INACTIVIDAD = float(os.environ.get('DB_POOL_PING_AFTER', '30'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+log = logging.getLogger('papeleria.conexion')
+# Abrir/cerrar conexiones es muy frecuente: bitacora muestrea este registrador
+log_pool = logging.getLogger('papeleria.conexion.pool')
+
+def _crear_conexion_mysql():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    log_pool.debug("Conexión abierta a la base de datos")
+    # Los cursores de esta conexión informan tiempo y filas a metricas.py
+    return ConexionInstrumentada(conn)
+
+def _crear_conexion_sqlite():
+    directorio = os.path.dirname(DB_SQLITE_PATH)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    return ConexionInstrumentada(ConexionSQLite(DB_SQLITE_PATH))
+
+def _cerrar_conexion(conn):
+    if conn.is_connected():
+        conn.close()
+        log_pool.debug("Conexión a la base de datos cerrada")
+
+def dialecto(conn):
+    """'mysql' o 'sqlite' según el tipo de conexión"""
+    return getattr(conn, 'dialecto', 'mysql')
+
+def obtener_pool():
+    """Pool de conexiones del proceso (se crea la primera vez que se usa)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones(
+                    _crear_conexion_sqlite if DB_BACKEND == 'sqlite' else _crear_conexion_mysql,
+                    tamano=POOL_TAMANO,
+                    espera_max=POOL_ESPERA_MAX,
+                    ping_inactividad=POOL_PING_INACTIVIDAD,
+                    validar=lambda conn: conn.is_connected(),
+                    cerrar=_cerrar_conexion,
+                )
+    return _pool
 
 def conexion():
+    """Devuelve una conexión del pool.
+
+    Dentro de un contexto Flask todas las llamadas de la misma petición
+    reciben la misma conexión (guardada en `g`), que se devuelve al pool
+    en el teardown. Fuera de Flask hay que devolverla con cerrar_conexion().
+    """
+    en_flask = has_app_context()
+    if en_flask and g.get('_db_conn') is not None:
+        return g._db_conn
+
+    try:
+        conn = obtener_pool().obtener()
+    except (Error, sqlite3.Error, PoolAgotado) as e:
+        log.error("Error al conectar a la base de datos (%s): %s", DB_BACKEND, e)
+        return None
+
+    if en_flask:
+        g._db_conn = conn
+    return conn
+
+def conexion_exclusiva():
+    """Conexión del pool no ligada a la petición (p. ej. para respuestas en streaming).
+
+    Debe devolverse siempre con cerrar_conexion().
+    """
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            database='papeleria_cueva',
-            user='root',
-            password='uea2025',
-            autocommit=False  # Desactivar autocommit para controlar manualmente
-        )
-        if conn.is_connected():
-            print("✓ Conexión exitosa a la base de datos")
-            return conn
-    except Error as e:
-        print(f"✗ Error al conectar a MySQL: {e}")
+        return obtener_pool().obtener()
+    except (Error, sqlite3.Error, PoolAgotado) as e:
+        log.error("Error al conectar a la base de datos (%s): %s", DB_BACKEND, e)
         return None
 
 def cerrar_conexion(conn):
-    if conn and conn.is_connected():
-        conn.close()
-        print("✓ Conexión a la base de datos cerrada.")
+    """Devuelve la conexión al pool; la de la petición actual espera al teardown"""
+    if conn is None:
+        return
+    if has_app_context() and g.get('_db_conn') is conn:
+        return
+    obtener_pool().devolver(conn)
+
+def liberar_conexion_peticion(exc=None):
+    """Teardown de Flask: devuelve al pool la conexión usada por la petición"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        obtener_pool().devolver(conn)
+
+def metricas_pool():
+    return obtener_pool().metricas()
+
+def init_app(app):
+    app.teardown_appcontext(liberar_conexion_peticion)
 
 def crear_tablas():
+    """Aplica las migraciones pendientes (ver migraciones/)"""
+    from migraciones import migrar
+
     conn = None
     try:
         conn = conexion()
         if conn is None:
-            print("✗ No se pudo conectar a la base de datos")
+            log.error("No se pudo conectar a la base de datos para migrar")
             return False
-            
-        cursor = conn.cursor()
-        
-        # Primero verificar si la base de datos existe, si no crearla
-        cursor.execute("CREATE DATABASE IF NOT EXISTS papeleria_cueva")
-        cursor.execute("USE papeleria_cueva")
-        
-        # Tabla de productos (actualizada según tu estructura)
-        sql_productos = """
-        CREATE TABLE IF NOT EXISTS productos (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nombre VARCHAR(120) NOT NULL UNIQUE,
-            cantidad INT NOT NULL DEFAULT 0,
-            precio DECIMAL(10, 2) NOT NULL DEFAULT 0.0,
-            categoria VARCHAR(50) DEFAULT 'general',
-            activo TINYINT(1) DEFAULT 1
-        );
-        """
-        
-        # Tabla de clientes (ya existe)
-        sql_clientes = """
-        CREATE TABLE IF NOT EXISTS clientes (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nombre VARCHAR(120) NOT NULL,
-            apellido VARCHAR(120) NOT NULL,
-            telefono VARCHAR(20) NOT NULL,
-            email VARCHAR(120) UNIQUE,
-            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        
-        # Tabla de usuarios (ya existe)
-        sql_usuarios = """
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nombre VARCHAR(120) NOT NULL,
-            email VARCHAR(120) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL,
-            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        
-        # Tabla de ventas (nueva)
-        sql_ventas = """
-        CREATE TABLE IF NOT EXISTS ventas (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            cliente_id INT NOT NULL,
-            usuario_id INT NOT NULL,
-            fecha_venta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total DECIMAL(10,2) NOT NULL,
-            estado ENUM('pendiente','completada','cancelada') DEFAULT 'completada',
-            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-        );
-        """
-        
-        # Tabla de detalle_ventas (nueva)
-        sql_detalle_ventas = """
-        CREATE TABLE IF NOT EXISTS detalle_ventas (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            venta_id INT NOT NULL,
-            producto_id INT NOT NULL,
-            cantidad INT NOT NULL,
-            precio_unitario DECIMAL(5,2) NOT NULL,
-            subtotal DECIMAL(10,2) NOT NULL,
-            FOREIGN KEY (venta_id) REFERENCES ventas(id) ON DELETE CASCADE,
-            FOREIGN KEY (producto_id) REFERENCES productos(id)
-        );
-        """
-        
-        # Tabla de compras (nueva)
-        sql_compras = """
-        CREATE TABLE IF NOT EXISTS compras (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            proveedor_nombre VARCHAR(120) NOT NULL,
-            producto_id INT NOT NULL,
-            cantidad INT NOT NULL,
-            precio_compra DECIMAL(5,2) NOT NULL,
-            fecha_compra TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            usuario_id INT NOT NULL,
-            FOREIGN KEY (producto_id) REFERENCES productos(id),
-            FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
-        );
-        """
-        
-        print("Verificando/Creando tablas...")
-        cursor.execute(sql_productos)
-        cursor.execute(sql_clientes)
-        cursor.execute(sql_usuarios)
-        cursor.execute(sql_ventas)
-        cursor.execute(sql_detalle_ventas)
-        cursor.execute(sql_compras)
-        
-        conn.commit()
-        print("Todas las tablas verificadas/creadas correctamente.")
-        
-        # Verificar que las tablas existen
-        cursor.execute("SHOW TABLES")
-        tablas = cursor.fetchall()
-        print("Tablas en la base de datos:", [tabla[0] for tabla in tablas])
-        
+        aplicadas = migrar(conn)
+        if aplicadas:
+            log.info("Migraciones aplicadas: %s", aplicadas)
+        else:
+            log.info("El esquema ya está al día")
         return True
-        
-    except Error as e:
-        print(f"Error al crear tablas: {e}")
-        if conn:
-            conn.rollback()
+    except Exception as e:
+        log.exception("Error al migrar el esquema: %s", e)
         return False
     finally:
         if conn:
             cerrar_conexion(conn)
 
+def verificar_esquema():
+    """Una sola consulta: devuelve (versión aplicada, última disponible) o None sin conexión"""
+    from migraciones import version_actual, ultima_version
+
+    conn = conexion()
+    if conn is None:
+        return None
+    try:
+        return version_actual(conn.cursor()), ultima_version(dialecto(conn))
+    finally:
+        cerrar_conexion(conn)
+
 # Función para verificar específicamente la tabla usuarios
 def verificar_tabla_usuarios():
+    from repositorios import repos
+
     conn = None
     try:
         conn = conexion()
         if conn is None:
             return False
             
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM information_schema.tables 
-            WHERE table_schema = 'papeleria_cueva' 
-            AND table_name = 'usuarios'
-        """)
-        existe = cursor.fetchone()[0] > 0
+        existe = 'usuarios' in repos(conn).esquema.tablas()
         
-        if existe:
-            print("La tabla 'usuarios' existe")
-        else:
-            print("La tabla 'usuarios' NO existe")
+        if not existe:
+            log.warning("La tabla 'usuarios' NO existe")
             
         return existe
         
-    except Error as e:
-        print(f"Error al verificar tabla usuarios: {e}")
+    except (Error, sqlite3.Error) as e:
+        log.error("Error al verificar tabla usuarios: %s", e)
         return False
     finally:
         if conn:
             cerrar_conexion(conn)
 
 if __name__ == '__main__':
+    from bitacora import configurar
+    configurar(formato='texto')
     print("=== EJECUTANDO CREACIÓN DE TABLAS ===")
     crear_tablas()
     verificar_tabla_usuarios()
\ No newline at end of file
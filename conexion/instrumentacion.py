@@ -0,0 +1,83 @@
+# instrumentacion.py
+# Envoltorios transparentes de conexión y cursor que miden cada consulta.
+# Las rutas siguen usando conn.cursor(...) / cur.execute(...) sin cambios; los
+# observadores registrados reciben (segundos, filas_leidas, es_consulta) por
+# cada execute/executemany (es_consulta=True) y por cada fetch* (False).
+import time
+from conexion.transaccion import TareasTrasConfirmar
+
+observadores = []
+
+
+def _notificar(duracion, filas, es_consulta):
+    for observador in observadores:
+        try:
+            observador(duracion, filas, es_consulta)
+        except Exception:
+            pass
+
+
+class CursorInstrumentado:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _ejecutar(self, funcion, args, kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _notificar(time.perf_counter() - inicio, 0, True)
+
+    def _leer(self, funcion, args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        if resultado is None:
+            filas = 0
+        elif isinstance(resultado, list):
+            filas = len(resultado)
+        else:
+            filas = 1
+        _notificar(time.perf_counter() - inicio, filas, False)
+        return resultado
+
+    def execute(self, *args, **kwargs):
+        return self._ejecutar(self._cursor.execute, args, kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._ejecutar(self._cursor.executemany, args, kwargs)
+
+    def fetchone(self):
+        return self._leer(self._cursor.fetchone, ())
+
+    def fetchmany(self, *args):
+        return self._leer(self._cursor.fetchmany, args)
+
+    def fetchall(self):
+        return self._leer(self._cursor.fetchall, ())
+
+
+class ConexionInstrumentada(TareasTrasConfirmar):
+    """Proxy de una conexión cuyo cursor() devuelve cursores instrumentados"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        self._conn.commit()
+        self._ejecutar_tras_confirmar()
+
+    def rollback(self):
+        self._descartar_tras_confirmar()
+        self._conn.rollback()
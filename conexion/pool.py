@@ -0,0 +1,125 @@
+# pool.py
+import threading
+import time
+
+
+class PoolAgotado(Exception):
+    """No hubo conexión libre dentro del tiempo de espera configurado"""
+
+
+class PoolConexiones:
+    """Pool de conexiones con tamaño máximo, espera acotada y métricas.
+
+    Las conexiones se crean de forma perezosa con `fabrica()` hasta llegar a
+    `tamano`; a partir de ahí `obtener()` espera a que otra petición devuelva
+    una. Las conexiones inactivas más de `ping_inactividad` segundos se
+    validan con `validar(conn)` antes de entregarlas.
+    """
+
+    def __init__(self, fabrica, tamano=5, espera_max=10.0, ping_inactividad=30.0,
+                 validar=None, cerrar=None):
+        self._fabrica = fabrica
+        self._validar = validar or (lambda conn: True)
+        self._cerrar = cerrar or (lambda conn: conn.close())
+        self.tamano = max(1, int(tamano))
+        self.espera_max = float(espera_max)
+        self.ping_inactividad = float(ping_inactividad)
+
+        self._cond = threading.Condition()
+        self._inactivas = []  # pila LIFO de (conexion, instante_devolucion)
+        self._creadas = 0
+        self._en_uso = 0
+        self._checkouts = 0
+        self._agotado = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    def obtener(self):
+        """Entrega una conexión, creando una nueva si hay hueco libre"""
+        inicio = time.perf_counter()
+        conn, devuelta_en = None, None
+        with self._cond:
+            while True:
+                if self._inactivas:
+                    conn, devuelta_en = self._inactivas.pop()
+                    break
+                if self._creadas < self.tamano:
+                    self._creadas += 1
+                    break
+                restante = self.espera_max - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    self._agotado += 1
+                    raise PoolAgotado(
+                        f"Sin conexiones libres tras {self.espera_max:.1f}s (tamaño {self.tamano})"
+                    )
+                self._cond.wait(restante)
+
+            espera = time.perf_counter() - inicio
+            self._en_uso += 1
+            self._checkouts += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+
+        # La creación y la validación se hacen fuera del candado
+        try:
+            if conn is None:
+                conn = self._fabrica()
+            elif time.monotonic() - devuelta_en > self.ping_inactividad and not self._validar(conn):
+                self._cerrar_silencioso(conn)
+                conn = self._fabrica()
+        except Exception:
+            with self._cond:
+                self._creadas -= 1
+                self._en_uso -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        """Devuelve una conexión al pool deshaciendo cualquier transacción abierta"""
+        if conn is None:
+            return
+        if not descartar:
+            try:
+                conn.rollback()
+            except Exception:
+                descartar = True
+
+        with self._cond:
+            self._en_uso -= 1
+            if descartar:
+                self._creadas -= 1
+            else:
+                self._inactivas.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if descartar:
+            self._cerrar_silencioso(conn)
+
+    def cerrar_todas(self):
+        """Cierra las conexiones inactivas (las prestadas se cierran al devolverse)"""
+        with self._cond:
+            inactivas, self._inactivas = self._inactivas, []
+            self._creadas -= len(inactivas)
+        for conn, _ in inactivas:
+            self._cerrar_silencioso(conn)
+
+    def metricas(self):
+        with self._cond:
+            return {
+                'tamano': self.tamano,
+                'creadas': self._creadas,
+                'en_uso': self._en_uso,
+                'inactivas': len(self._inactivas),
+                'checkouts': self._checkouts,
+                'agotado': self._agotado,
+                'espera_total_ms': round(self._espera_total * 1000, 3),
+                'espera_promedio_ms': round(self._espera_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'espera_max_ms': round(self._espera_maxima * 1000, 3),
+            }
+
+    def _cerrar_silencioso(self, conn):
+        try:
+            self._cerrar(conn)
+        except Exception:
+            pass
@@ -0,0 +1,120 @@
+# sqlite.py
+# Adaptador de sqlite3 con la interfaz de mysql.connector que usa el resto de
+# la aplicación: cursor(dictionary=True), marcadores %s, lastrowid, rowcount,
+# is_connected() y consume_results(). Permite ejecutar la aplicación sin MySQL.
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+from conexion.transaccion import TareasTrasConfirmar
+
+
+def _convertir_fecha(valor):
+    texto = valor.decode('utf-8')
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        return texto
+
+
+def _convertir_decimal(valor):
+    return Decimal(valor.decode('utf-8'))
+
+
+# Tipos declarados en las migraciones de SQLite -> tipos de Python de MySQL
+sqlite3.register_converter('TIMESTAMP', _convertir_fecha)
+sqlite3.register_converter('DECIMAL', _convertir_decimal)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=' '))
+
+
+def _traducir(sql, params):
+    # Solo hay sustitución de %s (y %% -> %) cuando se pasan parámetros, como en MySQL
+    if params is None:
+        return sql
+    return sql.replace('%s', '?').replace('%%', '%')
+
+
+class CursorSQLite:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _fila(self, fila):
+        if fila is None or not self._dictionary:
+            return fila
+        return dict(zip([d[0] for d in self._cursor.description], fila))
+
+    def execute(self, sql, params=None):
+        if params is None:
+            self._cursor.execute(_traducir(sql, params))
+        else:
+            self._cursor.execute(_traducir(sql, params), tuple(params))
+        return None
+
+    def executemany(self, sql, filas):
+        self._cursor.executemany(_traducir(sql, ()), [tuple(f) for f in filas])
+        return None
+
+    def fetchone(self):
+        return self._fila(self._cursor.fetchone())
+
+    def fetchmany(self, tamano=1):
+        return [self._fila(f) for f in self._cursor.fetchmany(tamano)]
+
+    def fetchall(self):
+        return [self._fila(f) for f in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionSQLite(TareasTrasConfirmar):
+    dialecto = 'sqlite'
+
+    def __init__(self, ruta):
+        self._conn = sqlite3.connect(
+            ruta,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            # El pool entrega la conexión a un solo hilo cada vez
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._abierta = True
+
+    def cursor(self, dictionary=False, buffered=None):
+        return CursorSQLite(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+        self._ejecutar_tras_confirmar()
+
+    def rollback(self):
+        self._descartar_tras_confirmar()
+        self._conn.rollback()
+
+    def is_connected(self):
+        return self._abierta
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self._abierta = False
+        self._conn.close()
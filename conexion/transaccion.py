@@ -0,0 +1,40 @@
+# transaccion.py
+# Tareas aplazadas hasta el commit. Los repositorios anotan aquí el trabajo que
+# no debe alargar la transacción de negocio (p. ej. avanzar versiones_tabla,
+# una fila que comparten todas las escrituras): se ejecuta en una transacción
+# corta justo después de cada commit y un rollback lo descarta.
+import logging
+
+log = logging.getLogger('papeleria.conexion')
+
+
+class TareasTrasConfirmar:
+    """Mezcla para las conexiones que admiten tareas después del commit"""
+
+    def tras_confirmar(self, clave, tarea):
+        """Programa tarea(conn, estado) para el próximo commit y devuelve su estado (un dict).
+
+        Varias llamadas con la misma clave en una transacción comparten el
+        estado y la tarea se ejecuta una sola vez.
+        """
+        pendientes = self.__dict__.setdefault('_tras_confirmar', {})
+        if clave not in pendientes:
+            pendientes[clave] = (tarea, {})
+        return pendientes[clave][1]
+
+    def _ejecutar_tras_confirmar(self):
+        pendientes = self.__dict__.pop('_tras_confirmar', None)
+        for clave, (tarea, estado) in (pendientes or {}).items():
+            try:
+                tarea(self, estado)
+            except Exception:
+                # Ya se confirmó lo importante: la tarea fallida solo se registra
+                # (quien la use debe tolerar perderla; ver repositorios/base.py)
+                log.exception("Falló la tarea '%s' posterior al commit", clave)
+                try:
+                    self.rollback()
+                except Exception:
+                    pass
+
+    def _descartar_tras_confirmar(self):
+        self.__dict__.pop('_tras_confirmar', None)
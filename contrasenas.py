@@ -0,0 +1,147 @@
+# contrasenas.py
+# Cifrado y verificación de contraseñas fuera del hilo de la petición. Los
+# hashes son deliberadamente costosos, así que se calculan en un pool de
+# procesos acotado: como mucho PASSWORD_POOL_WORKERS en paralelo y
+# PASSWORD_POOL_QUEUE esperando. Si el pool está lleno se rechaza al momento
+# (PoolSaturado) en lugar de bloquear al worker web. Tras un login correcto,
+# un hash con parámetros distintos de PASSWORD_HASH_METHOD se recalcula en
+# la misma tarea para actualizarlo.
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+HASH_METODO = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+POOL_PROCESOS = int(os.environ.get('PASSWORD_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+POOL_COLA = int(os.environ.get('PASSWORD_POOL_QUEUE', str(POOL_PROCESOS * 8)))
+POOL_TIMEOUT = float(os.environ.get('PASSWORD_POOL_TIMEOUT', '10'))
+
+log = logging.getLogger('papeleria.contrasenas')
+
+
+class PoolSaturado(RuntimeError):
+    """No hay hueco en el pool de contraseñas; reintentar más tarde"""
+
+
+def necesita_rehash(password_hash, metodo=HASH_METODO):
+    """True si el hash se generó con otro método o coste que el configurado"""
+    return password_hash.split('$', 1)[0] != metodo
+
+
+# Tareas del pool: funciones de módulo para que puedan serializarse
+def _cifrar(password, metodo):
+    return generate_password_hash(password, method=metodo)
+
+
+def _verificar(password_hash, password, metodo):
+    """(válida, hash nuevo o None)"""
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if necesita_rehash(password_hash, metodo):
+        return True, generate_password_hash(password, method=metodo)
+    return True, None
+
+
+class PoolContrasenas:
+    def __init__(self, procesos=POOL_PROCESOS, cola=POOL_COLA, timeout=POOL_TIMEOUT, metodo=HASH_METODO):
+        self.procesos = max(0, procesos)
+        self.cola = max(0, cola)
+        self.timeout = timeout
+        self.metodo = metodo
+        # Tareas en curso + en espera; procesos=0 calcula en el propio hilo (desarrollo y tests)
+        self._huecos = threading.BoundedSemaphore(max(1, self.procesos + self.cola))
+        self._lock = threading.Lock()
+        self._ejecutor = None
+        self.pendientes = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.rehashes = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._ejecutor is None:
+                # spawn: el worker web tiene hilos y un fork podría heredar locks tomados
+                self._ejecutor = ProcessPoolExecutor(max_workers=self.procesos,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._ejecutor
+
+    def _ejecutar(self, funcion, *args):
+        if self.procesos == 0:
+            return funcion(*args)
+        if not self._huecos.acquire(blocking=False):
+            with self._lock:
+                self.rechazadas += 1
+            log.warning("Pool de contraseñas saturado (%s tareas pendientes)", self.pendientes)
+            raise PoolSaturado('Demasiadas operaciones de contraseña en curso')
+        with self._lock:
+            self.pendientes += 1
+        ejecutor = self._pool()
+        try:
+            futuro = ejecutor.submit(funcion, *args)
+        except BrokenProcessPool:
+            self._terminada(None)
+            self._descartar(ejecutor)
+            raise PoolSaturado('El pool de contraseñas se está reiniciando')
+        except Exception:
+            self._terminada(None)
+            raise
+        # El hueco se libera cuando la tarea acaba de verdad, aunque la petición ya no espere
+        futuro.add_done_callback(self._terminada)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TiempoAgotado:
+            raise PoolSaturado('La operación de contraseña tardó demasiado')
+        except BrokenProcessPool:
+            # Un proceso murió (OOM, kill): el pool no se recupera solo, se crea otro en la próxima tarea
+            log.error("Pool de contraseñas roto; se recreará")
+            self._descartar(ejecutor)
+            raise PoolSaturado('El pool de contraseñas se está reiniciando')
+
+    def _terminada(self, futuro):
+        with self._lock:
+            self.pendientes -= 1
+            self.completadas += 1
+        self._huecos.release()
+
+    def cifrar(self, password):
+        return self._ejecutar(_cifrar, password, self.metodo)
+
+    def verificar(self, password_hash, password):
+        """(válida, hash nuevo o None si no hace falta actualizarlo)"""
+        valida, nuevo = self._ejecutar(_verificar, password_hash, password, self.metodo)
+        if nuevo is not None:
+            with self._lock:
+                self.rehashes += 1
+        return valida, nuevo
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'procesos': self.procesos,
+                'max_pendientes': self.procesos + self.cola,
+                'pendientes': self.pendientes,
+                'completadas': self.completadas,
+                'rechazadas': self.rechazadas,
+                'rehashes': self.rehashes,
+            }
+
+    def _descartar(self, ejecutor):
+        # Solo si sigue siendo el actual: otra tarea pudo haber creado ya el nuevo
+        with self._lock:
+            if self._ejecutor is ejecutor:
+                self._ejecutor = None
+        ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    def cerrar(self):
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = PoolContrasenas()
+atexit.register(pool.cerrar)
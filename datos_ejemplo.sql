@@ -0,0 +1,13 @@
+-- datos_ejemplo.sql
+-- Datos de ejemplo (ejecutar después de aplicar las migraciones)
+USE papeleria_cueva;
+
+INSERT IGNORE INTO productos (nombre, cantidad, precio) VALUES
+('Lápiz HB', 100, 1.00),
+('Borrador', 50, 0.50),
+('Cuaderno Universitario', 30, 3.50),
+('Bolígrafo Azul', 200, 1.25);
+
+INSERT IGNORE INTO clientes (nombre, apellido, telefono, email) VALUES
+('Juan', 'Pérez', '0987654321', 'juan@email.com'),
+('María', 'Gómez', '0991234567', 'maria@email.com');
@@ -0,0 +1,116 @@
+# diagnostico.py
+# Sondas baratas para /health y /diagnostico. La salud se resuelve con un
+# SELECT 1 sobre una conexión del pool y se reutiliza durante HEALTH_CACHE_TTL
+# segundos; la foto de diagnóstico (tablas y conteos) la calcula un hilo en
+# segundo plano cada DIAG_REFRESH segundos, nunca la petición.
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from conexion.conexion import conexion, conexion_exclusiva, cerrar_conexion, DB_BACKEND
+from repositorios import repos
+
+HEALTH_CACHE_TTL = float(os.environ.get('HEALTH_CACHE_TTL', '1'))
+DIAG_REFRESH = float(os.environ.get('DIAG_REFRESH', '60'))
+
+log = logging.getLogger('papeleria.diagnostico')
+
+
+def ping(conn):
+    """(ok, error) tras una consulta trivial sobre la conexión"""
+    if conn is None:
+        return False, 'Database connection failed'
+    try:
+        repos(conn).esquema.ping()
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+class Sondas:
+    def __init__(self, ttl_salud=HEALTH_CACHE_TTL, intervalo=DIAG_REFRESH):
+        self.ttl_salud = ttl_salud
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._salud = None  # (instante, ok, error)
+        self._foto = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._primera = threading.Event()
+
+    def salud(self):
+        """(ok, error, antigüedad en segundos); consulta la base como mucho una vez por TTL"""
+        ahora = time.monotonic()
+        with self._lock:
+            if self._salud is not None and ahora - self._salud[0] < self.ttl_salud:
+                instante, ok, error = self._salud
+                return ok, error, round(ahora - instante, 3)
+        # Dentro de una petición es la misma conexión que usará el resto de la vista
+        ok, error = ping(conexion())
+        with self._lock:
+            self._salud = (time.monotonic(), ok, error)
+        return ok, error, 0.0
+
+    def calcular_foto(self):
+        """Tablas y conteos de la base (costoso: solo desde el hilo de fondo)"""
+        foto = {
+            'base_datos_conectable': False,
+            'tabla_usuarios_existe': False,
+            'backend': DB_BACKEND,
+            'actualizado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        conn = conexion_exclusiva()
+        if conn is None:
+            foto['error'] = 'Error de conexión a la base de datos'
+            return foto
+        try:
+            r = repos(conn)
+            foto['tablas_existentes'] = r.esquema.tablas()
+            foto['base_datos_conectable'] = True
+            foto['tabla_usuarios_existe'] = 'usuarios' in foto['tablas_existentes']
+            foto['total_usuarios'] = r.usuarios.contar()
+            foto['total_productos'] = r.productos.contar()
+            foto['total_clientes'] = r.clientes.contar()
+        except Exception as e:
+            foto['error'] = str(e)
+        finally:
+            cerrar_conexion(conn)
+        return foto
+
+    def refrescar(self):
+        foto = self.calcular_foto()
+        with self._lock:
+            self._foto = foto
+        self._primera.set()
+        return foto
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                self.refrescar()
+            except Exception as e:
+                log.exception("Error refrescando el diagnóstico: %s", e)
+            self._detener.wait(self.intervalo)
+
+    def iniciar(self):
+        """Arranca el hilo de refresco (una vez por proceso)"""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='diagnostico', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def foto(self, espera=2.0):
+        """Última foto calculada; la primera vez espera hasta `espera` segundos (None si no llegó)"""
+        self.iniciar()
+        self._primera.wait(espera)
+        with self._lock:
+            return dict(self._foto) if self._foto is not None else None
+
+
+sondas = Sondas()
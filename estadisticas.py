@@ -0,0 +1,136 @@
+# estadisticas.py
+# Estadísticas del dashboard mantenidas al escribir: las rutas que crean o
+# eliminan productos, clientes, ventas y compras ajustan la fila única de
+# estadisticas_resumen (y el contador mensual de clientes), así el dashboard se
+# resuelve con una lectura por clave primaria. El contador bajo_stock lo ajusta
+# alertas.py al cambiar el conjunto de alertas. Los deltas de una transacción se
+# suman en memoria y se aplican con un solo UPDATE en una transacción corta
+# después del commit (ver conexion/transaccion.py): esa fila la comparten todas
+# las escrituras y no debe quedar bloqueada mientras dura la de negocio. Si ese
+# paso fallara, recalcular() (`flask --app app estadisticas-recalcular` o una importación) la rehace.
+import os
+from repositorios import repos
+
+# Umbral de reposición general, para productos sin umbral propio ni de su categoría
+STOCK_BAJO = int(os.environ.get('STOCK_MIN_DEFAULT', '10'))
+
+
+def _pendientes(conn):
+    """Deltas de la transacción en curso; sin tareas aplazadas se aplican enseguida"""
+    tras_confirmar = getattr(conn, 'tras_confirmar', None)
+    if tras_confirmar is None:
+        return None
+    return tras_confirmar('estadisticas', _tarea_resumen)
+
+
+def _aplicar(conn, estado):
+    repo = repos(conn).estadisticas
+    resumen = {c: v for c, v in estado.get('resumen', {}).items() if v}
+    if resumen:
+        repo.ajustar(resumen)
+    for anio_mes, delta in sorted(estado.get('meses', {}).items()):
+        if delta:
+            repo.ajustar_clientes_mes(anio_mes, delta)
+
+
+def _tarea_resumen(conn, estado):
+    _aplicar(conn, estado)
+    conn.commit()
+
+
+def _sumar(conn, grupo, deltas):
+    estado = _pendientes(conn)
+    acumulados = {} if estado is None else estado.setdefault(grupo, {})
+    for clave, valor in deltas.items():
+        acumulados[clave] = acumulados.get(clave, 0) + valor
+    if estado is None:
+        _aplicar(conn, {grupo: acumulados})
+
+
+def ajustar(conn, **deltas):
+    """Suma los deltas indicados a la fila de resumen (y avanza su versión) al confirmar"""
+    columnas = repos(conn).estadisticas.COLUMNAS
+    _sumar(conn, 'resumen', {c: v for c, v in deltas.items() if v and c in columnas})
+
+
+def _ajustar_mes(conn, anio_mes, delta):
+    _sumar(conn, 'meses', {anio_mes: delta})
+
+
+def producto_creado(conn, cantidad, precio):
+    ajustar(conn, productos_total=1, stock_total=cantidad, suma_precios=float(precio))
+
+
+def producto_modificado(conn, cantidad_antes, precio_antes, cantidad, precio):
+    ajustar(conn, stock_total=cantidad - cantidad_antes,
+            suma_precios=float(precio) - float(precio_antes))
+
+
+def producto_eliminado(conn, cantidad, precio):
+    ajustar(conn, productos_total=-1, stock_total=-cantidad, suma_precios=-float(precio))
+
+
+def stock_modificado(conn, cantidad_antes, cantidad):
+    ajustar(conn, stock_total=cantidad - cantidad_antes)
+
+
+def cliente_creado(conn, cliente_id):
+    """El mes del alta sale de fecha_registro (reloj de la base), como en recalcular()"""
+    ajustar(conn, clientes_total=1)
+    cliente = repos(conn).clientes.por_id(cliente_id)
+    if cliente and cliente['fecha_registro']:
+        _ajustar_mes(conn, cliente['fecha_registro'].strftime('%Y-%m'), 1)
+
+
+def cliente_eliminado(conn, fecha_registro):
+    ajustar(conn, clientes_total=-1)
+    if fecha_registro:
+        _ajustar_mes(conn, fecha_registro.strftime('%Y-%m'), -1)
+
+
+def venta_registrada(conn, total, unidades=0):
+    """Una venta y las unidades que salieron del stock, en un solo UPDATE del resumen"""
+    ajustar(conn, ventas_total=1, ingresos=float(total), stock_total=-unidades)
+
+
+def compra_registrada(conn, lineas=1, unidades=0):
+    """Las líneas de una compra y las unidades que entraron al stock"""
+    ajustar(conn, compras_total=lineas, stock_total=unidades)
+
+
+def recalcular(conn):
+    """Reconstruye las alertas de stock y el resumen desde las tablas base (arranque o reparación)"""
+    r = repos(conn)
+    estado = _pendientes(conn)
+    if estado is not None:
+        estado.clear()  # el resumen reconstruido ya incluye los deltas de esta transacción
+    r.alertas.reconstruir(STOCK_BAJO)
+    r.estadisticas.reemplazar(r.estadisticas.calcular())
+    conn.commit()
+
+
+def leer(conn):
+    """Estadísticas del dashboard con una única consulta por clave primaria"""
+    repo = repos(conn).estadisticas
+    fila = repo.leer()
+    if fila is None:
+        recalcular(conn)
+        fila = repo.leer()
+
+    productos_total = int(fila['productos_total'])
+    return {
+        'productos': {
+            'total': productos_total,
+            'stock_total': int(fila['stock_total']),
+            'precio_promedio': float(fila['suma_precios']) / productos_total if productos_total else 0.0,
+        },
+        'bajo_stock': int(fila['bajo_stock']),
+        'clientes': int(fila['clientes_total']),
+        'clientes_este_mes': int(fila['este_mes']),
+        'ventas': {
+            'total': int(fila['ventas_total']),
+            'ingresos': float(fila['ingresos']),
+        },
+        'compras': int(fila['compras_total']),
+        'version': int(fila['version']),
+    }
@@ -0,0 +1,143 @@
+# exportacion.py
+import csv
+import io
+import json
+import lzma
+import os
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from repositorios import repos
+
+# Filas que se leen del cursor (y se envían al cliente) en cada bloque
+EXPORT_LOTE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+
+EMPRESA = "Librería y Papelería Cueva"
+
+# Nivel de gzip (1-9) y preset de xz (0-9; los altos piden decenas de MB por descarga)
+GZIP_NIVEL = int(os.environ.get('EXPORT_GZIP_LEVEL', '6'))
+XZ_PRESET = int(os.environ.get('EXPORT_XZ_PRESET', '2'))
+
+# Columnas (clave de la fila, encabezado CSV) de cada recurso exportable
+COLUMNAS = {
+    'productos': (('id', 'ID'), ('nombre', 'Nombre'), ('cantidad', 'Cantidad'), ('precio', 'Precio')),
+    'ventas': (('id', 'ID'), ('fecha_venta', 'Fecha'), ('cliente_id', 'Cliente'), ('usuario_id', 'Usuario'),
+               ('total', 'Total'), ('estado', 'Estado')),
+    'detalle_ventas': (('id', 'ID'), ('venta_id', 'Venta'), ('producto_id', 'Producto'), ('cantidad', 'Cantidad'),
+                       ('precio_unitario', 'Precio unitario'), ('subtotal', 'Subtotal')),
+    'compras': (('id', 'ID'), ('fecha_compra', 'Fecha'), ('proveedor_nombre', 'Proveedor'),
+                ('producto_id', 'Producto'), ('cantidad', 'Cantidad'), ('precio_compra', 'Precio compra'),
+                ('usuario_id', 'Usuario')),
+}
+
+
+def leer_en_lotes(cur, tamano=EXPORT_LOTE, convertir=None):
+    """Recorre un cursor sin buffer devolviendo listas de como mucho `tamano` filas"""
+    while True:
+        lote = cur.fetchmany(tamano)
+        if not lote:
+            break
+        if convertir is not None:
+            lote = [convertir(fila) for fila in lote]
+        yield lote
+
+
+def lotes_tabla(conn, recurso, tamano=EXPORT_LOTE):
+    """Lotes de ventas, detalle_ventas o compras leídos por id (los productos salen del catálogo en memoria)"""
+    r = repos(conn)
+    if recurso == 'ventas':
+        return r.ventas.lotes_exportacion(tamano)
+    if recurso == 'detalle_ventas':
+        return r.ventas.lotes_detalle(tamano)
+    if recurso == 'compras':
+        return r.compras.lotes_exportacion(tamano)
+    raise ValueError(f'Recurso no exportable por tabla: {recurso}')
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def generar_csv(lotes, recurso='productos'):
+    claves = [clave for clave, _ in COLUMNAS[recurso]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Encabezado
+    writer.writerow([titulo for _, titulo in COLUMNAS[recurso]])
+    for lote in lotes:
+        for fila in lote:
+            writer.writerow([fila[clave] for clave in claves])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def generar_json(lotes, recurso='productos'):
+    """JSON escrito de forma incremental: el arreglo de filas se emite por bloques"""
+    cabecera = json.dumps({"empresa": EMPRESA, "fecha_exportacion": datetime.now().isoformat()},
+                          ensure_ascii=False, indent=2)
+    yield cabecera[:-2] + f',\n  "{recurso}": ['
+    total = 0
+    for lote in lotes:
+        partes = []
+        for p in lote:
+            partes.append(('\n    ' if total == 0 else ',\n    ')
+                          + json.dumps(p, ensure_ascii=False, default=_json_default))
+            total += 1
+        yield ''.join(partes)
+    yield ('\n  ' if total else '') + f'],\n  "total_{recurso}": {total}\n}}\n'
+
+
+def generar_ndjson(lotes, recurso='productos'):
+    """Una fila JSON compacta por línea, sin cabecera: se puede leer (y cortar) línea a línea"""
+    for lote in lotes:
+        yield ''.join(json.dumps(fila, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+                      for fila in lote)
+
+
+def generar_txt(lotes, recurso='productos'):
+    # Listado de inventario: solo para productos
+    yield ("=" * 60 + "\n"
+           + f"INVENTARIO DE PRODUCTOS - {EMPRESA}\n"
+           + f"Exportado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n"
+           + "=" * 60 + "\n\n"
+           + f"{'ID':<5} {'NOMBRE':<30} {'CANTIDAD':<10} {'PRECIO':<10}\n"
+           + "-" * 60 + "\n")
+    total = 0
+    for lote in lotes:
+        total += len(lote)
+        yield ''.join(f"{p['id']:<5} {p['nombre']:<30} {p['cantidad']:<10} ${p['precio']:<10.2f}\n" for p in lote)
+    yield "-" * 60 + "\n" + f"Total de productos: {total}\n"
+
+
+FORMATOS = {
+    'csv': (generar_csv, 'text/csv; charset=utf-8'),
+    'json': (generar_json, 'application/json; charset=utf-8'),
+    'ndjson': (generar_ndjson, 'application/x-ndjson; charset=utf-8'),
+    'txt': (generar_txt, 'text/plain; charset=utf-8'),
+}
+
+# Formatos que admite cada recurso
+FORMATOS_RECURSO = {recurso: ('csv', 'json', 'ndjson') for recurso in COLUMNAS}
+FORMATOS_RECURSO['productos'] += ('txt',)
+
+# Codificación -> (extensión, tipo MIME del archivo comprimido, fábrica del compresor)
+CODIFICACIONES = {
+    'gzip': ('gz', 'application/gzip', lambda: zlib.compressobj(GZIP_NIVEL, zlib.DEFLATED, 31)),
+    'xz': ('xz', 'application/x-xz', lambda: lzma.LZMACompressor(preset=XZ_PRESET)),
+}
+
+
+def comprimir(fragmentos, codificacion):
+    """Comprime al vuelo los fragmentos de texto; emite lo que el compresor va soltando"""
+    compresor = CODIFICACIONES[codificacion][2]()
+    for fragmento in fragmentos:
+        datos = compresor.compress(fragmento.encode('utf-8'))
+        if datos:
+            yield datos
+    yield compresor.flush()
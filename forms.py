@@ -1,12 +1,16 @@
 # forms.py
 from flask_wtf import FlaskForm
-from wtforms import StringField, IntegerField, DecimalField, SubmitField, PasswordField
-from wtforms.validators import DataRequired, Email, Length, NumberRange, EqualTo
+from flask_wtf.file import FileField, FileRequired
+from wtforms import Form, StringField, IntegerField, DecimalField, SubmitField, PasswordField, FieldList, FormField, SelectField
+from wtforms.validators import DataRequired, Email, Length, NumberRange, EqualTo, Optional
 
 class ProductoForm(FlaskForm):
     nombre = StringField('Nombre', validators=[DataRequired(), Length(min=2, max=100)])
     cantidad = IntegerField('Cantidad', validators=[DataRequired(), NumberRange(min=0)])
     precio = DecimalField('Precio', validators=[DataRequired(), NumberRange(min=0)], places=2)
+    categoria = StringField('Categoría', validators=[Optional(), Length(max=50)], default='general')
+    # Vacío: se usa el umbral de la categoría (o el general)
+    stock_minimo = IntegerField('Stock mínimo', validators=[Optional(), NumberRange(min=0)])
     submit = SubmitField('Guardar')
 
 class ClienteForm(FlaskForm):
@@ -30,15 +34,29 @@ class RegistroForm(FlaskForm):
     submit = SubmitField('Registrarse')
 
 # Nuevos formularios para ventas y compras
-class VentaForm(FlaskForm):
-    cliente_id = IntegerField('ID Cliente', validators=[DataRequired(), NumberRange(min=1)])
+class LineaVentaForm(Form):
+    # Subformulario sin CSRF propio: lo aporta VentaForm
     producto_id = IntegerField('ID Producto', validators=[DataRequired(), NumberRange(min=1)])
     cantidad = IntegerField('Cantidad', validators=[DataRequired(), NumberRange(min=1)])
+
+class VentaForm(FlaskForm):
+    cliente_id = IntegerField('ID Cliente', validators=[DataRequired(), NumberRange(min=1)])
+    lineas = FieldList(FormField(LineaVentaForm), min_entries=1, max_entries=100)
     submit = SubmitField('Realizar Venta')
 
-class CompraForm(FlaskForm):
-    proveedor_nombre = StringField('Proveedor', validators=[DataRequired(), Length(min=2, max=120)])
+class LineaCompraForm(Form):
+    # Subformulario sin CSRF propio: lo aporta CompraForm
     producto_id = IntegerField('ID Producto', validators=[DataRequired(), NumberRange(min=1)])
     cantidad = IntegerField('Cantidad', validators=[DataRequired(), NumberRange(min=1)])
     precio_compra = DecimalField('Precio Compra', validators=[DataRequired(), NumberRange(min=0)], places=2)
-    submit = SubmitField('Registrar Compra')
\ No newline at end of file
+
+class CompraForm(FlaskForm):
+    proveedor_nombre = StringField('Proveedor', validators=[DataRequired(), Length(min=2, max=120)])
+    lineas = FieldList(FormField(LineaCompraForm), min_entries=1, max_entries=500)
+    submit = SubmitField('Registrar Compra')
+
+# Importación masiva de productos o clientes
+class ImportarForm(FlaskForm):
+    tipo = SelectField('Tipo de datos', choices=[('productos', 'Productos'), ('clientes', 'Clientes')])
+    archivo = FileField('Archivo (CSV, JSON o NDJSON)', validators=[FileRequired()])
+    submit = SubmitField('Importar')
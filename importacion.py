@@ -0,0 +1,194 @@
+# importacion.py
+import csv
+import io
+import json
+import os
+from werkzeug.datastructures import MultiDict
+from forms import ProductoForm, ClienteForm
+from repositorios import repos
+
+# Filas por cada upsert (INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT)
+IMPORT_LOTE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+# Errores por fila que se incluyen en el informe (el total se cuenta siempre)
+IMPORT_MAX_ERRORES = 1000
+
+FORMATOS_IMPORTACION = ('csv', 'json', 'ndjson')
+
+
+def _normalizar_producto(form):
+    # categoria y stock_minimo vacíos o ausentes (None) conservan los del producto existente
+    # (raw_data vacío: la columna no venía y el formulario puso su valor por defecto)
+    categoria = (form.categoria.data or '').strip() if form.categoria.raw_data else ''
+    categoria = categoria or None
+    return (form.nombre.data.strip(), form.cantidad.data, float(form.precio.data), categoria, form.stock_minimo.data)
+
+
+def _normalizar_cliente(form):
+    return (form.nombre.data.strip(), form.apellido.data.strip(),
+            form.telefono.data.strip(), form.email.data.strip().lower())
+
+
+# Cada tipo valida con el mismo formulario que usan las rutas crear_* y se
+# guarda con el upsert de su repositorio (clave única: nombre o email)
+TIPOS = {
+    'productos': {
+        'formulario': ProductoForm,
+        'normalizar': _normalizar_producto,
+    },
+    'clientes': {
+        'formulario': ClienteForm,
+        'normalizar': _normalizar_cliente,
+    },
+}
+
+
+class LineaInvalida:
+    """Línea de NDJSON que no es JSON válido: _validar la informa como error de esa fila"""
+
+    def __init__(self, numero, mensaje):
+        self.numero = numero
+        self.mensaje = mensaje
+
+
+def detectar_formato(nombre_archivo):
+    extension = os.path.splitext(nombre_archivo or '')[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        return 'ndjson'
+    return extension if extension in FORMATOS_IMPORTACION else None
+
+
+def _leer_json_arreglo(texto, tamano_bloque=64 * 1024):
+    """Recorre un arreglo JSON objeto a objeto sin cargar el archivo completo"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    inicio_visto = False
+    fin = False
+    while not fin:
+        bloque = texto.read(tamano_bloque)
+        fin = not bloque
+        buffer += bloque
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not inicio_visto:
+                if buffer[pos] != '[':
+                    raise ValueError('Se esperaba un arreglo JSON de objetos')
+                inicio_visto = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                objeto, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fin:
+                    raise
+                break  # objeto incompleto: leer otro bloque
+            yield objeto
+        buffer = buffer[pos:]
+
+
+def leer_filas(archivo, formato):
+    """Genera diccionarios desde un archivo binario CSV, JSON (arreglo) o NDJSON"""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    if formato == 'csv':
+        for fila in csv.DictReader(texto):
+            # Encabezados en minúsculas: el CSV exportado usa 'Nombre', 'Cantidad'...
+            yield {(k or '').strip().lower(): v for k, v in fila.items()}
+    elif formato == 'json':
+        yield from _leer_json_arreglo(texto)
+    elif formato == 'ndjson':
+        # Cada línea es independiente: una mal formada no corta el resto del archivo
+        for numero, linea in enumerate(texto, start=1):
+            if linea.strip():
+                try:
+                    yield json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield LineaInvalida(numero, str(e))
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def _validar(tipo, fila):
+    if isinstance(fila, LineaInvalida):
+        return None, {'fila': [f'JSON inválido en la línea {fila.numero}: {fila.mensaje}']}
+    if not isinstance(fila, dict):
+        return None, {'fila': ['Se esperaba un objeto con los campos del registro']}
+    datos = MultiDict({k: '' if v is None else str(v) for k, v in fila.items()})
+    form = tipo['formulario'](formdata=datos, meta={'csrf': False})
+    if not form.validate():
+        return None, {campo: errores for campo, errores in form.errors.items() if campo != 'submit'}
+    return tipo['normalizar'](form), None
+
+
+class InformeImportacion:
+    def __init__(self):
+        self.procesadas = 0
+        self.guardadas = 0
+        self.con_error = 0
+        self.errores = []
+
+    def error(self, numero, errores):
+        self.con_error += 1
+        if len(self.errores) < IMPORT_MAX_ERRORES:
+            self.errores.append({'fila': numero, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'procesadas': self.procesadas,
+            'guardadas': self.guardadas,
+            'con_error': self.con_error,
+            'errores': self.errores,
+        }
+
+
+def _escribir_lote(conn, repo, lote, informe):
+    """Escribe un lote con executemany; si falla, reintenta fila a fila para aislar errores"""
+    try:
+        repo.guardar_lote([valores for _, valores in lote])
+        conn.commit()
+        informe.guardadas += len(lote)
+        return
+    except Exception:
+        conn.rollback()
+
+    for numero, valores in lote:
+        try:
+            repo.guardar_lote([valores])
+            conn.commit()
+            informe.guardadas += 1
+        except Exception as e:
+            conn.rollback()
+            informe.error(numero, {'base_datos': [str(e)]})
+
+
+def importar(conn, tipo_nombre, filas, tamano_lote=IMPORT_LOTE):
+    """Valida y guarda (upsert) las filas en lotes. Requiere contexto de aplicación.
+
+    Las filas inválidas se informan y se omiten sin abortar el resto.
+    """
+    tipo = TIPOS[tipo_nombre]
+    repo = getattr(repos(conn), tipo_nombre)
+    informe = InformeImportacion()
+    lote = []
+    try:
+        for numero, fila in enumerate(filas, start=1):
+            informe.procesadas += 1
+            valores, errores = _validar(tipo, fila)
+            if errores:
+                informe.error(numero, errores)
+                continue
+            lote.append((numero, valores))
+            if len(lote) >= tamano_lote:
+                _escribir_lote(conn, repo, lote, informe)
+                lote = []
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        # Archivo mal formado: se guarda lo ya leído y se informa dónde se cortó
+        informe.error(informe.procesadas + 1, {'archivo': [str(e)]})
+
+    if lote:
+        _escribir_lote(conn, repo, lote, informe)
+    return informe
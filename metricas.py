@@ -0,0 +1,140 @@
+# metricas.py
+# Métricas por endpoint (latencia, consultas, tiempo y filas de BD por petición)
+# expuestas en formato de texto de Prometheus.
+import threading
+import time
+from flask import g, request, has_request_context
+from conexion import instrumentacion
+
+# Límites (en segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites del histograma de consultas por petición
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+
+
+class MetricasEndpoint:
+    def __init__(self):
+        self.latencia = Histograma(BUCKETS_LATENCIA)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.tiempo_db = 0.0
+        self.filas = 0
+        self.errores = 0
+
+
+_lock = threading.Lock()
+_por_endpoint = {}
+# Fuentes adicionales de indicadores: nombre -> función que devuelve un dict numérico
+_fuentes = {}
+
+
+def registrar_fuente(prefijo, funcion):
+    _fuentes[prefijo] = funcion
+
+
+def _observar_consulta(duracion, filas, es_consulta):
+    if not has_request_context():
+        return
+    acumulado = g.get('_metricas_db')
+    if acumulado is None:
+        return
+    if es_consulta:
+        acumulado[0] += 1
+    acumulado[1] += duracion
+    acumulado[2] += filas
+
+
+def _inicio_peticion():
+    g._metricas_inicio = time.perf_counter()
+    g._metricas_db = [0, 0.0, 0]  # consultas, segundos en BD, filas leídas
+
+
+def _fin_peticion(exc=None):
+    inicio = g.pop('_metricas_inicio', None)
+    consultas, tiempo_db, filas = g.pop('_metricas_db', None) or (0, 0.0, 0)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    endpoint = request.endpoint or 'desconocido'
+    with _lock:
+        metricas = _por_endpoint.get(endpoint)
+        if metricas is None:
+            metricas = _por_endpoint[endpoint] = MetricasEndpoint()
+        metricas.latencia.observar(duracion)
+        metricas.consultas.observar(consultas)
+        metricas.tiempo_db += tiempo_db
+        metricas.filas += filas
+        if exc is not None:
+            metricas.errores += 1
+
+
+def _histograma_texto(lineas, nombre, endpoint, histograma):
+    for limite, cuenta in zip(histograma.limites, histograma.cuentas):
+        lineas.append(f'{nombre}_bucket{{endpoint="{endpoint}",le="{limite}"}} {cuenta}')
+    lineas.append(f'{nombre}_bucket{{endpoint="{endpoint}",le="+Inf"}} {histograma.total}')
+    lineas.append(f'{nombre}_sum{{endpoint="{endpoint}"}} {histograma.suma:.6f}')
+    lineas.append(f'{nombre}_count{{endpoint="{endpoint}"}} {histograma.total}')
+
+
+def exportar_prometheus():
+    lineas = []
+    with _lock:
+        endpoints = sorted(_por_endpoint.items())
+
+        lineas.append('# HELP http_request_duration_seconds Latencia de las peticiones por endpoint')
+        lineas.append('# TYPE http_request_duration_seconds histogram')
+        for endpoint, m in endpoints:
+            _histograma_texto(lineas, 'http_request_duration_seconds', endpoint, m.latencia)
+
+        lineas.append('# HELP db_queries_per_request Consultas a la base de datos por petición')
+        lineas.append('# TYPE db_queries_per_request histogram')
+        for endpoint, m in endpoints:
+            _histograma_texto(lineas, 'db_queries_per_request', endpoint, m.consultas)
+
+        lineas.append('# HELP db_time_seconds_total Tiempo total en la base de datos')
+        lineas.append('# TYPE db_time_seconds_total counter')
+        for endpoint, m in endpoints:
+            lineas.append(f'db_time_seconds_total{{endpoint="{endpoint}"}} {m.tiempo_db:.6f}')
+
+        lineas.append('# HELP db_rows_fetched_total Filas leídas de la base de datos')
+        lineas.append('# TYPE db_rows_fetched_total counter')
+        for endpoint, m in endpoints:
+            lineas.append(f'db_rows_fetched_total{{endpoint="{endpoint}"}} {m.filas}')
+
+        lineas.append('# HELP http_request_errors_total Peticiones terminadas con excepción')
+        lineas.append('# TYPE http_request_errors_total counter')
+        for endpoint, m in endpoints:
+            lineas.append(f'http_request_errors_total{{endpoint="{endpoint}"}} {m.errores}')
+
+    for prefijo, funcion in sorted(_fuentes.items()):
+        try:
+            valores = funcion()
+        except Exception:
+            continue
+        for clave, valor in sorted(valores.items()):
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                lineas.append(f'# TYPE {prefijo}_{clave} gauge')
+                lineas.append(f'{prefijo}_{clave} {valor}')
+
+    return '\n'.join(lineas) + '\n'
+
+
+def init_app(app):
+    if _observar_consulta not in instrumentacion.observadores:
+        instrumentacion.observadores.append(_observar_consulta)
+    app.before_request(_inicio_peticion)
+    app.teardown_request(_fin_peticion)
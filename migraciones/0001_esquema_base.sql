@@ -0,0 +1,84 @@
+-- 0001_esquema_base.sql
+-- Esquema que antes creaba conexion.crear_tablas() en cada arranque.
+-- Usa IF NOT EXISTS para poder aplicarse sobre bases ya existentes.
+
+CREATE TABLE IF NOT EXISTS productos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(120) NOT NULL UNIQUE,
+    cantidad INT NOT NULL DEFAULT 0,
+    precio DECIMAL(10, 2) NOT NULL DEFAULT 0.0,
+    categoria VARCHAR(50) DEFAULT 'general',
+    activo TINYINT(1) DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(120) NOT NULL,
+    apellido VARCHAR(120) NOT NULL,
+    telefono VARCHAR(20) NOT NULL,
+    email VARCHAR(120) UNIQUE,
+    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_clientes_fecha_registro (fecha_registro, id)
+);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(120) NOT NULL,
+    email VARCHAR(120) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ventas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    cliente_id INT NOT NULL,
+    usuario_id INT NOT NULL,
+    fecha_venta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    total DECIMAL(10,2) NOT NULL,
+    estado ENUM('pendiente','completada','cancelada') DEFAULT 'completada',
+    FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+);
+
+CREATE TABLE IF NOT EXISTS detalle_ventas (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    venta_id INT NOT NULL,
+    producto_id INT NOT NULL,
+    cantidad INT NOT NULL,
+    precio_unitario DECIMAL(5,2) NOT NULL,
+    subtotal DECIMAL(10,2) NOT NULL,
+    FOREIGN KEY (venta_id) REFERENCES ventas(id) ON DELETE CASCADE,
+    FOREIGN KEY (producto_id) REFERENCES productos(id)
+);
+
+CREATE TABLE IF NOT EXISTS compras (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    proveedor_nombre VARCHAR(120) NOT NULL,
+    producto_id INT NOT NULL,
+    cantidad INT NOT NULL,
+    precio_compra DECIMAL(5,2) NOT NULL,
+    fecha_compra TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    usuario_id INT NOT NULL,
+    FOREIGN KEY (producto_id) REFERENCES productos(id),
+    FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
+);
+
+-- Estadísticas del dashboard mantenidas al escribir (ver estadisticas.py)
+CREATE TABLE IF NOT EXISTS estadisticas_resumen (
+    id TINYINT PRIMARY KEY,
+    productos_total INT NOT NULL DEFAULT 0,
+    stock_total BIGINT NOT NULL DEFAULT 0,
+    suma_precios DECIMAL(14,2) NOT NULL DEFAULT 0,
+    bajo_stock INT NOT NULL DEFAULT 0,
+    clientes_total INT NOT NULL DEFAULT 0,
+    ventas_total INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14,2) NOT NULL DEFAULT 0,
+    compras_total INT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_clientes_mes (
+    anio_mes CHAR(7) PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0
+);
@@ -0,0 +1,32 @@
+# 0002_reconciliar_esquema.py
+# Las bases creadas con database.sql no tenían productos.categoria ni
+# productos.activo, y las anteriores a la paginación por cursor no tienen el
+# índice de clientes. MySQL no admite ADD COLUMN IF NOT EXISTS, así que se
+# consulta information_schema antes de cada cambio.
+
+
+def _existe_columna(cursor, tabla, columna):
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (tabla, columna))
+    return cursor.fetchone()[0] > 0
+
+
+def _existe_indice(cursor, tabla, indice):
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (tabla, indice))
+    return cursor.fetchone()[0] > 0
+
+
+def aplicar(cursor):
+    if not _existe_columna(cursor, 'productos', 'categoria'):
+        cursor.execute("ALTER TABLE productos ADD COLUMN categoria VARCHAR(50) DEFAULT 'general'")
+    if not _existe_columna(cursor, 'productos', 'activo'):
+        cursor.execute("ALTER TABLE productos ADD COLUMN activo TINYINT(1) DEFAULT 1")
+    if not _existe_indice(cursor, 'clientes', 'idx_clientes_fecha_registro'):
+        cursor.execute("CREATE INDEX idx_clientes_fecha_registro ON clientes (fecha_registro, id)")
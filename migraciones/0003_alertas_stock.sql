@@ -0,0 +1,25 @@
+-- 0003_alertas_stock.sql
+-- Umbrales de reposición por producto (productos.stock_minimo) y por
+-- categoría (categorias_stock), y conjunto de productos en alerta mantenido
+-- al escribir (ver alertas.py).
+
+ALTER TABLE productos ADD COLUMN stock_minimo INT NULL;
+
+-- Reevaluar las alertas al cambiar el umbral de una categoría
+CREATE INDEX idx_productos_categoria ON productos (categoria);
+
+CREATE TABLE IF NOT EXISTS categorias_stock (
+    categoria VARCHAR(50) PRIMARY KEY,
+    stock_minimo INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS alertas_stock (
+    producto_id INT PRIMARY KEY,
+    umbral INT NOT NULL,
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+);
+
+-- Carga inicial con el umbral general por defecto (10, el que usaba el
+-- dashboard); `flask --app app estadisticas-recalcular` la rehace con STOCK_MIN_DEFAULT
+INSERT INTO alertas_stock (producto_id, umbral)
+SELECT id, 10 FROM productos WHERE cantidad < 10 AND COALESCE(activo, 1) = 1;
@@ -0,0 +1,50 @@
+-- 0004_reportes_ventas.sql
+-- Agregados de ventas completadas para los reportes (ver reportes.py):
+-- por día y producto, por día y usuario, y por mes. Se cargan aquí desde el
+-- histórico y después los mantiene registrar_venta.
+
+CREATE TABLE IF NOT EXISTS ventas_dia_producto (
+    fecha DATE NOT NULL,
+    producto_id INT NOT NULL,
+    unidades INT NOT NULL DEFAULT 0,
+    importe DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, producto_id),
+    INDEX idx_ventas_dia_producto_producto (producto_id, fecha)
+);
+
+CREATE TABLE IF NOT EXISTS ventas_dia_usuario (
+    fecha DATE NOT NULL,
+    usuario_id INT NOT NULL,
+    ventas INT NOT NULL DEFAULT 0,
+    importe DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, usuario_id)
+);
+
+CREATE TABLE IF NOT EXISTS ventas_mes (
+    anio_mes CHAR(7) PRIMARY KEY,
+    ventas INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    importe DECIMAL(14,2) NOT NULL DEFAULT 0
+);
+
+INSERT INTO ventas_dia_producto (fecha, producto_id, unidades, importe)
+SELECT DATE(v.fecha_venta), d.producto_id, SUM(d.cantidad), SUM(d.subtotal)
+FROM ventas v JOIN detalle_ventas d ON d.venta_id = v.id
+WHERE v.estado = 'completada'
+GROUP BY DATE(v.fecha_venta), d.producto_id;
+
+INSERT INTO ventas_dia_usuario (fecha, usuario_id, ventas, importe)
+SELECT DATE(fecha_venta), usuario_id, COUNT(*), SUM(total)
+FROM ventas
+WHERE estado = 'completada'
+GROUP BY DATE(fecha_venta), usuario_id;
+
+-- Los meses salen de los dos agregados diarios (ventas e importe, y unidades)
+INSERT INTO ventas_mes (anio_mes, ventas, unidades, importe)
+SELECT anio_mes, SUM(ventas), SUM(unidades), SUM(importe)
+FROM (
+    SELECT DATE_FORMAT(fecha, '%Y-%m') AS anio_mes, ventas, 0 AS unidades, importe FROM ventas_dia_usuario
+    UNION ALL
+    SELECT DATE_FORMAT(fecha, '%Y-%m'), 0, unidades, 0 FROM ventas_dia_producto
+) t
+GROUP BY anio_mes;
@@ -0,0 +1,12 @@
+-- 0005_versiones_tabla.sql
+-- Contador de cambios por tabla. Los repositorios lo avanzan en una
+-- transacción corta justo después del commit de cada escritura (no dentro de
+-- ella, para no retener el bloqueo de la fila); la API lo usa para sus ETag
+-- (ver api.py).
+
+CREATE TABLE IF NOT EXISTS versiones_tabla (
+    tabla VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos', 1), ('clientes', 1), ('ventas', 1), ('compras', 1);
@@ -0,0 +1,12 @@
+-- 0006_catalogo_version_fila.sql
+-- Versión de la última escritura de cada producto, sellada junto con el
+-- avance del contador tras el commit: el catálogo en memoria
+-- (ver catalogo.py) relee solo las filas con version_fila mayor que la suya.
+-- Las bajas y las cargas masivas avanzan 'productos_recarga', que fuerza una
+-- recarga completa.
+
+ALTER TABLE productos ADD COLUMN version_fila BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX idx_productos_version_fila ON productos (version_fila);
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos_recarga', 1);
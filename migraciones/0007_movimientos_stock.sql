@@ -0,0 +1,29 @@
+-- 0007_movimientos_stock.sql
+-- Libro de movimientos de stock de solo inserción (ventas, compras, ajustes,
+-- importaciones) y cortes periódicos por producto (ver movimientos.py). El
+-- stock en una fecha es el último corte anterior más los movimientos que le
+-- siguen. Sin claves foráneas: el historial se conserva aunque se borre el
+-- producto.
+
+CREATE TABLE IF NOT EXISTS movimientos_stock (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    producto_id INT NOT NULL,
+    delta INT NOT NULL,
+    motivo VARCHAR(20) NOT NULL,
+    referencia_id INT NULL,
+    usuario_id INT NULL,
+    fecha DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_movimientos_stock_producto (producto_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS stock_cortes (
+    producto_id INT NOT NULL,
+    movimiento_id BIGINT NOT NULL,
+    cantidad INT NOT NULL,
+    fecha DATETIME NOT NULL,
+    PRIMARY KEY (producto_id, movimiento_id)
+);
+
+-- El stock actual de cada producto abre su libro
+INSERT INTO movimientos_stock (producto_id, delta, motivo)
+SELECT id, cantidad, 'inicial' FROM productos WHERE cantidad <> 0;
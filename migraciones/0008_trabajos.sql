@@ -0,0 +1,25 @@
+-- 0008_trabajos.sql
+-- Trabajos en segundo plano (exportaciones y reportes, ver trabajos.py). La
+-- clave resume tipo, formato, parámetros y versión de los datos: un pedido
+-- igual a uno vigente reutiliza ese trabajo. Los archivos se guardan en
+-- EXPORT_DIR con el SHA-256 de su contenido como nombre, así dos trabajos
+-- con el mismo resultado comparten archivo.
+
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(40) NOT NULL,
+    formato VARCHAR(10) NOT NULL,
+    parametros VARCHAR(500) NOT NULL DEFAULT '{}',
+    clave CHAR(64) NOT NULL,
+    estado VARCHAR(12) NOT NULL DEFAULT 'pendiente',
+    progreso INT NOT NULL DEFAULT 0,
+    total INT NULL,
+    archivo VARCHAR(80) NULL,
+    tamano BIGINT NULL,
+    error VARCHAR(500) NULL,
+    usuario_id INT NULL,
+    creado DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    actualizado DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_trabajos_clave (clave),
+    INDEX idx_trabajos_archivo (archivo)
+);
@@ -0,0 +1,5 @@
+-- 0009_stock_cortes_por_movimiento.sql
+-- Los cortes de stock se toman a partir del último movimiento incluido en el
+-- corte anterior (MAX(movimiento_id)); este índice evita recorrer los cortes.
+
+CREATE INDEX idx_stock_cortes_movimiento ON stock_cortes (movimiento_id);
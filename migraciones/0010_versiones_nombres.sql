@@ -0,0 +1,6 @@
+-- 0010_versiones_nombres.sql
+-- Contador que avanzan solo las altas, ediciones, bajas y cargas masivas de
+-- productos (no las ventas ni las compras, que solo cambian el stock): el
+-- índice de búsqueda en memoria (ver busqueda.py) se recarga con él.
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos_nombres', 1);
@@ -0,0 +1,129 @@
+# migraciones/__init__.py
+# Migraciones versionadas del esquema. Cada archivo NNNN_nombre.sql (sentencias
+# separadas por ';') o NNNN_nombre.py (con una función aplicar(cursor)) se
+# aplica una sola vez, en orden, y queda registrado en schema_version.
+# Las migraciones de MySQL están en este directorio y las de SQLite en sqlite/.
+import importlib.util
+import logging
+import os
+import re
+from conexion.conexion import dialecto
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIOS = {
+    'mysql': DIRECTORIO,
+    'sqlite': os.path.join(DIRECTORIO, 'sqlite'),
+}
+_PATRON = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+# Evita que dos procesos migren a la vez
+_NOMBRE_LOCK = 'papeleria_cueva_migraciones'
+
+log = logging.getLogger('papeleria.migraciones')
+
+SQL_TABLA_VERSION = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    nombre VARCHAR(200) NOT NULL,
+    aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def listar_migraciones(dialecto='mysql'):
+    """Lista ordenada de (version, nombre, ruta) de los archivos de migración"""
+    directorio = DIRECTORIOS[dialecto]
+    migraciones = []
+    for archivo in os.listdir(directorio):
+        m = _PATRON.match(archivo)
+        if m:
+            migraciones.append((int(m.group(1)), archivo, os.path.join(directorio, archivo)))
+    migraciones.sort()
+    versiones = [v for v, _, _ in migraciones]
+    if len(versiones) != len(set(versiones)):
+        raise RuntimeError('Hay dos migraciones con el mismo número de versión')
+    return migraciones
+
+
+def ultima_version(dialecto='mysql'):
+    migraciones = listar_migraciones(dialecto)
+    return migraciones[-1][0] if migraciones else 0
+
+
+def version_actual(cursor):
+    """Versión aplicada en la base (0 si nunca se migró). Una sola consulta."""
+    try:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    except Exception as e:
+        # La tabla schema_version todavía no existe (1146 en MySQL)
+        if getattr(e, 'errno', None) == 1146 or 'no such table' in str(e):
+            return 0
+        raise
+    return int(cursor.fetchone()[0])
+
+
+def dividir_sentencias(sql):
+    """Separa un script en sentencias (terminadas en ';' al final de línea)"""
+    sentencias, actual = [], []
+    for linea in sql.splitlines():
+        if linea.strip().startswith('--') and not actual:
+            continue
+        actual.append(linea)
+        if linea.rstrip().endswith(';'):
+            sentencia = '\n'.join(actual).strip().rstrip(';').strip()
+            if sentencia:
+                sentencias.append(sentencia)
+            actual = []
+    resto = '\n'.join(actual).strip()
+    if resto:
+        sentencias.append(resto)
+    return sentencias
+
+
+def _aplicar(cursor, ruta):
+    if ruta.endswith('.sql'):
+        with open(ruta, encoding='utf-8') as f:
+            for sentencia in dividir_sentencias(f.read()):
+                cursor.execute(sentencia)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migraciones.m_{os.path.basename(ruta)[:4]}", ruta)
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        modulo.aplicar(cursor)
+
+
+def migrar(conn, hasta=None):
+    """Aplica las migraciones pendientes y devuelve la lista de archivos aplicados"""
+    motor = dialecto(conn)
+    cursor = conn.cursor()
+    # En SQLite la clave primaria de schema_version basta: una segunda migración concurrente falla al registrarse
+    bloquear = motor == 'mysql'
+    if bloquear:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (_NOMBRE_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError('Otro proceso está aplicando migraciones')
+    aplicadas = []
+    try:
+        cursor.execute(SQL_TABLA_VERSION)
+        actual = version_actual(cursor)
+        for version, nombre, ruta in listar_migraciones(motor):
+            if version <= actual or (hasta is not None and version > hasta):
+                continue
+            log.info("Aplicando migración %s", nombre)
+            # El DDL de MySQL confirma implícitamente: cada migración se registra al terminar
+            _aplicar(cursor, ruta)
+            cursor.execute("INSERT INTO schema_version (version, nombre) VALUES (%s, %s)", (version, nombre))
+            conn.commit()
+            aplicadas.append(nombre)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if bloquear:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_NOMBRE_LOCK,))
+            cursor.fetchone()
+    return aplicadas
+
+
+def estado(conn):
+    """(versión aplicada, última versión disponible)"""
+    return version_actual(conn.cursor()), ultima_version(dialecto(conn))
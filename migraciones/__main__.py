@@ -0,0 +1,32 @@
+# migraciones/__main__.py
+# Uso: python -m migraciones [migrar|estado]
+import sys
+from bitacora import configurar
+from conexion.conexion import conexion, cerrar_conexion
+from migraciones import migrar, estado
+
+
+def main(argv):
+    comando = argv[1] if len(argv) > 1 else 'migrar'
+    if comando not in ('migrar', 'estado'):
+        print("Uso: python -m migraciones [migrar|estado]")
+        return 2
+
+    configurar(formato='texto')
+    conn = conexion()
+    if conn is None:
+        print("✗ No se pudo conectar a la base de datos")
+        return 1
+    try:
+        if comando == 'migrar':
+            aplicadas = migrar(conn)
+            print(f"✅ {len(aplicadas)} migraciones aplicadas" if aplicadas else "✅ El esquema ya está al día")
+        actual, ultima = estado(conn)
+        print(f"Versión del esquema: {actual} (última disponible: {ultima})")
+        return 0 if actual == ultima else 1
+    finally:
+        cerrar_conexion(conn)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,80 @@
+-- sqlite/0001_esquema_base.sql
+-- Mismo esquema que ../0001_esquema_base.sql y ../0002_reconciliar_esquema.py
+-- para el backend SQLite (DB_BACKEND=sqlite). Los tipos DECIMAL y TIMESTAMP
+-- se declaran igual para que conexion/sqlite.py devuelva Decimal y datetime.
+-- Las fechas por defecto usan la hora local, como CURRENT_TIMESTAMP en MySQL.
+
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(120) NOT NULL UNIQUE,
+    cantidad INTEGER NOT NULL DEFAULT 0,
+    precio DECIMAL(10, 2) NOT NULL DEFAULT 0.0,
+    categoria VARCHAR(50) DEFAULT 'general',
+    activo INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(120) NOT NULL,
+    apellido VARCHAR(120) NOT NULL,
+    telefono VARCHAR(20) NOT NULL,
+    email VARCHAR(120) UNIQUE,
+    fecha_registro TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_clientes_fecha_registro ON clientes (fecha_registro, id);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre VARCHAR(120) NOT NULL,
+    email VARCHAR(120) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    fecha_registro TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS ventas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id),
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+    fecha_venta TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    total DECIMAL(10, 2) NOT NULL,
+    estado VARCHAR(20) DEFAULT 'completada' CHECK (estado IN ('pendiente', 'completada', 'cancelada'))
+);
+
+CREATE TABLE IF NOT EXISTS detalle_ventas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    venta_id INTEGER NOT NULL REFERENCES ventas(id) ON DELETE CASCADE,
+    producto_id INTEGER NOT NULL REFERENCES productos(id),
+    cantidad INTEGER NOT NULL,
+    precio_unitario DECIMAL(5, 2) NOT NULL,
+    subtotal DECIMAL(10, 2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS compras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proveedor_nombre VARCHAR(120) NOT NULL,
+    producto_id INTEGER NOT NULL REFERENCES productos(id),
+    cantidad INTEGER NOT NULL,
+    precio_compra DECIMAL(5, 2) NOT NULL,
+    fecha_compra TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id)
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_resumen (
+    id INTEGER PRIMARY KEY,
+    productos_total INTEGER NOT NULL DEFAULT 0,
+    stock_total INTEGER NOT NULL DEFAULT 0,
+    suma_precios DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    bajo_stock INTEGER NOT NULL DEFAULT 0,
+    clientes_total INTEGER NOT NULL DEFAULT 0,
+    ventas_total INTEGER NOT NULL DEFAULT 0,
+    ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    compras_total INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_clientes_mes (
+    anio_mes CHAR(7) PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0
+);
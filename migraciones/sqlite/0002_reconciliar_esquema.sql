@@ -0,0 +1,4 @@
+-- sqlite/0002_reconciliar_esquema.sql
+-- Sin cambios: las bases SQLite nacen con productos.categoria, productos.activo
+-- y el índice de clientes. Se mantiene para que las versiones de ambos motores
+-- avancen a la par.
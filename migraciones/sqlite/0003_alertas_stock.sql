@@ -0,0 +1,20 @@
+-- sqlite/0003_alertas_stock.sql
+-- Igual que ../0003_alertas_stock.sql para el backend SQLite.
+
+ALTER TABLE productos ADD COLUMN stock_minimo INTEGER NULL;
+
+CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos (categoria);
+
+CREATE TABLE IF NOT EXISTS categorias_stock (
+    categoria VARCHAR(50) PRIMARY KEY,
+    stock_minimo INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS alertas_stock (
+    producto_id INTEGER PRIMARY KEY,
+    umbral INTEGER NOT NULL,
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+);
+
+INSERT INTO alertas_stock (producto_id, umbral)
+SELECT id, 10 FROM productos WHERE cantidad < 10 AND COALESCE(activo, 1) = 1;
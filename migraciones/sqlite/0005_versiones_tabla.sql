@@ -0,0 +1,9 @@
+-- sqlite/0005_versiones_tabla.sql
+-- Igual que ../0005_versiones_tabla.sql para el backend SQLite.
+
+CREATE TABLE IF NOT EXISTS versiones_tabla (
+    tabla VARCHAR(64) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos', 1), ('clientes', 1), ('ventas', 1), ('compras', 1);
@@ -0,0 +1,8 @@
+-- sqlite/0006_catalogo_version_fila.sql
+-- Igual que ../0006_catalogo_version_fila.sql para el backend SQLite.
+
+ALTER TABLE productos ADD COLUMN version_fila INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_productos_version_fila ON productos (version_fila);
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos_recarga', 1);
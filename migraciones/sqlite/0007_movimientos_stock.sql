@@ -0,0 +1,25 @@
+-- sqlite/0007_movimientos_stock.sql
+-- Igual que ../0007_movimientos_stock.sql para el backend SQLite.
+
+CREATE TABLE IF NOT EXISTS movimientos_stock (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    producto_id INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    motivo VARCHAR(20) NOT NULL,
+    referencia_id INTEGER NULL,
+    usuario_id INTEGER NULL,
+    fecha DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_movimientos_stock_producto ON movimientos_stock (producto_id, id);
+
+CREATE TABLE IF NOT EXISTS stock_cortes (
+    producto_id INTEGER NOT NULL,
+    movimiento_id INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    fecha DATETIME NOT NULL,
+    PRIMARY KEY (producto_id, movimiento_id)
+);
+
+INSERT INTO movimientos_stock (producto_id, delta, motivo)
+SELECT id, cantidad, 'inicial' FROM productos WHERE cantidad <> 0;
@@ -0,0 +1,22 @@
+-- sqlite/0008_trabajos.sql
+-- Igual que ../0008_trabajos.sql para el backend SQLite.
+
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo VARCHAR(40) NOT NULL,
+    formato VARCHAR(10) NOT NULL,
+    parametros VARCHAR(500) NOT NULL DEFAULT '{}',
+    clave CHAR(64) NOT NULL,
+    estado VARCHAR(12) NOT NULL DEFAULT 'pendiente',
+    progreso INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NULL,
+    archivo VARCHAR(80) NULL,
+    tamano INTEGER NULL,
+    error VARCHAR(500) NULL,
+    usuario_id INTEGER NULL,
+    creado DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    actualizado DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_trabajos_clave ON trabajos (clave);
+CREATE INDEX IF NOT EXISTS idx_trabajos_archivo ON trabajos (archivo);
@@ -0,0 +1,4 @@
+-- sqlite/0009_stock_cortes_por_movimiento.sql
+-- Igual que ../0009_stock_cortes_por_movimiento.sql para el backend SQLite.
+
+CREATE INDEX IF NOT EXISTS idx_stock_cortes_movimiento ON stock_cortes (movimiento_id);
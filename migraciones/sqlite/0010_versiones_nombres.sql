@@ -0,0 +1,4 @@
+-- sqlite/0010_versiones_nombres.sql
+-- Igual que ../0010_versiones_nombres.sql para el backend SQLite.
+
+INSERT INTO versiones_tabla (tabla, version) VALUES ('productos_nombres', 1);
@@ -1,6 +1,18 @@
 # models_user.py
+import logging
+import os
 from flask_login import UserMixin
 from conexion.conexion import conexion, cerrar_conexion
+from repositorios import repos
+from cache import CacheLRU
+
+# Caché de identidad para el user_loader: evita un SELECT por petición autenticada
+_cache_usuarios = CacheLRU(
+    max_entradas=int(os.environ.get('USER_CACHE_SIZE', '1000')),
+    ttl=float(os.environ.get('USER_CACHE_TTL', '300')),
+)
+
+log = logging.getLogger('papeleria.usuarios')
 
 class Usuario(UserMixin):
     def __init__(self, id, nombre, email, password):
@@ -11,31 +23,51 @@ class Usuario(UserMixin):
     
     def get_id(self):
         return str(self.id)
+
+    @staticmethod
+    def _desde_fila(user_data):
+        usuario = Usuario(
+            id=user_data['id'],
+            nombre=user_data['nombre'],
+            email=user_data['email'],
+            password=user_data['password']
+        )
+        _cache_usuarios.guardar(str(usuario.id), usuario)
+        return usuario
+
+    @staticmethod
+    def invalidar_cache(user_id=None):
+        """Debe llamarse tras cualquier escritura en la tabla usuarios"""
+        if user_id is None:
+            _cache_usuarios.invalidar()
+        else:
+            _cache_usuarios.invalidar(str(user_id))
+
+    @staticmethod
+    def estadisticas_cache():
+        return _cache_usuarios.estadisticas()
     
     @staticmethod
     def get(user_id):
+        usuario = _cache_usuarios.obtener(str(user_id))
+        if usuario is not None:
+            return usuario
+
         conn = conexion()
         if conn is None:
-            print(f"No se pudo conectar para obtener usuario ID: {user_id}")
+            log.warning("No se pudo conectar para obtener el usuario %s", user_id)
             return None
         
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM usuarios WHERE id = %s", (user_id,))
-            user_data = cursor.fetchone()
+            user_data = repos(conn).usuarios.por_id(user_id)
             
             if user_data:
-                print(f"Usuario encontrado: ID {user_data['id']} - {user_data['email']}")
-                return Usuario(
-                    id=user_data['id'],
-                    nombre=user_data['nombre'],
-                    email=user_data['email'],
-                    password=user_data['password']
-                )
-            print(f"Usuario no encontrado ID: {user_id}")
+                log.debug("Usuario encontrado: ID %s", user_data['id'])
+                return Usuario._desde_fila(user_data)
+            log.debug("Usuario no encontrado: ID %s", user_id)
             return None
         except Exception as e:
-            print(f"Error al obtener usuario ID {user_id}: {e}")
+            log.exception("Error al obtener el usuario %s: %s", user_id, e)
             return None
         finally:
             cerrar_conexion(conn)
@@ -44,26 +76,19 @@ class Usuario(UserMixin):
     def get_by_email(email):
         conn = conexion()
         if conn is None:
-            print(f"No se pudo conectar para obtener usuario email: {email}")
+            log.warning("No se pudo conectar para buscar un usuario por email")
             return None
         
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM usuarios WHERE email = %s", (email,))
-            user_data = cursor.fetchone()
+            user_data = repos(conn).usuarios.por_email(email)
             
             if user_data:
-                print(f"Usuario encontrado por email: {user_data['email']}")
-                return Usuario(
-                    id=user_data['id'],
-                    nombre=user_data['nombre'],
-                    email=user_data['email'],
-                    password=user_data['password']
-                )
-            print(f"Usuario no encontrado email: {email}")
+                log.debug("Usuario encontrado por email: ID %s", user_data['id'])
+                return Usuario._desde_fila(user_data)
+            log.debug("Usuario no encontrado por email")
             return None
         except Exception as e:
-            print(f"Error al obtener usuario por email {email}: {e}")
+            log.exception("Error al buscar un usuario por email: %s", e)
             return None
         finally:
             cerrar_conexion(conn)
@@ -0,0 +1,43 @@
+# movimientos.py
+# Libro de movimientos de stock. Cada venta, compra, alta, ajuste, baja o
+# importación añade filas a movimientos_stock en la misma transacción que
+# cambia productos.cantidad; nunca se actualizan ni se borran. Para no
+# repasar todo el libro, `flask --app app stock-cortes` guarda cada cierto
+# tiempo un corte por producto (stock acumulado hasta un movimiento) y el
+# stock en una fecha se calcula como el último corte anterior más los
+# movimientos que le siguen. Los cortes avanzan por id de movimiento, no por
+# fecha. Como estadisticas.py, solo tomar_cortes confirma.
+from datetime import datetime
+from repositorios import repos
+
+MOTIVOS = ('inicial', 'alta', 'venta', 'compra', 'ajuste', 'baja', 'importacion')
+
+
+def _ahora():
+    return datetime.now().replace(microsecond=0)
+
+
+def registrar(conn, motivo, deltas, referencia_id=None, usuario_id=None):
+    """Anota los cambios de stock {producto_id: delta} (se omiten los nulos)"""
+    fecha = _ahora()
+    filas = [(producto_id, delta, motivo, referencia_id, usuario_id, fecha)
+             for producto_id, delta in deltas.items() if delta]
+    if filas:
+        repos(conn).movimientos.registrar(filas)
+
+
+def conciliar(conn, motivo='importacion'):
+    """Anota como movimientos lo que una carga masiva cambió en productos.cantidad"""
+    return repos(conn).movimientos.conciliar(motivo, _ahora())
+
+
+def stock_en(conn, producto_id, fecha=None):
+    """(stock, movimientos leídos después del corte) del producto en la fecha (por defecto, ahora)"""
+    return repos(conn).movimientos.stock_en(producto_id, fecha or _ahora())
+
+
+def tomar_cortes(conn):
+    """Guarda un corte por cada producto con movimientos posteriores al último corte; devuelve cuántos"""
+    cortes = repos(conn).movimientos.tomar_cortes(_ahora())
+    conn.commit()
+    return cortes
@@ -0,0 +1,159 @@
+# paginacion.py
+import base64
+import json
+import os
+from datetime import datetime
+
+PAGINA_TAMANO = int(os.environ.get('PAGE_SIZE', '25'))
+PAGINA_MAX = int(os.environ.get('PAGE_SIZE_MAX', '200'))
+# Límite del conteo exacto cuando hay filtro de búsqueda
+CONTEO_MAX = int(os.environ.get('PAGE_COUNT_MAX', '1000'))
+
+
+class Pagina:
+    """Resultado de una consulta paginada por cursor (keyset)"""
+
+    def __init__(self, filas, siguiente=None, anterior=None, total=None, total_exacto=True):
+        self.filas = filas
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.total = total
+        self.total_exacto = total_exacto
+
+
+def tamano_pagina(valor):
+    """Convierte el parámetro por_pagina a un entero dentro de los límites"""
+    try:
+        n = int(valor)
+    except (TypeError, ValueError):
+        return PAGINA_TAMANO
+    return max(1, min(n, PAGINA_MAX))
+
+
+def _a_json(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    return valor
+
+
+def _de_json(valor):
+    if isinstance(valor, dict) and 'dt' in valor:
+        return datetime.fromisoformat(valor['dt'])
+    return valor
+
+
+def codificar_cursor(valores):
+    """Convierte los valores de la clave de orden en un token opaco para la URL"""
+    crudo = json.dumps([_a_json(v) for v in valores], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token, n_columnas):
+    """Devuelve la lista de valores del token, o None si no es válido"""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno).decode('utf-8'))
+        if not isinstance(valores, list) or len(valores) != n_columnas:
+            return None
+        return [_de_json(v) for v in valores]
+    except (ValueError, TypeError):
+        return None
+
+
+def paginar_keyset(cur, select, orden, filtros=None, params=(), descendente=False,
+                   despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+    """Ejecuta `select` paginado por la clave compuesta `orden` (p. ej. ('nombre', 'id')).
+
+    `despues` y `antes` son tokens devueltos en una página anterior; como
+    mucho debe indicarse uno. Se pide una fila extra para saber si hay más.
+    """
+    filtros = list(filtros or [])
+    params = list(params)
+    columnas = ', '.join(orden)
+    marcadores = ', '.join(['%s'] * len(orden))
+
+    hacia_atras = False
+    cursor_valores = decodificar_cursor(despues, len(orden))
+    if cursor_valores is None:
+        cursor_valores = decodificar_cursor(antes, len(orden))
+        hacia_atras = cursor_valores is not None
+
+    # Al retroceder se recorre el índice en sentido contrario y luego se invierte
+    ascendente = descendente == hacia_atras
+    if cursor_valores is not None:
+        operador = '>' if ascendente else '<'
+        filtros.append(f"({columnas}) {operador} ({marcadores})")
+        params.extend(cursor_valores)
+
+    sentido = 'ASC' if ascendente else 'DESC'
+    sql = select
+    if filtros:
+        sql += " WHERE " + " AND ".join(f"({f})" for f in filtros)
+    sql += " ORDER BY " + ', '.join(f"{c} {sentido}" for c in orden)
+    sql += " LIMIT %s"
+    params.append(por_pagina + 1)
+
+    cur.execute(sql, tuple(params))
+    filas = cur.fetchall()
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+
+    siguiente = anterior = None
+    if filas:
+        primera = codificar_cursor([filas[0][c] for c in orden])
+        ultima = codificar_cursor([filas[-1][c] for c in orden])
+        if hacia_atras:
+            anterior = primera if hay_mas else None
+            siguiente = ultima
+        else:
+            anterior = primera if cursor_valores is not None else None
+            siguiente = ultima if hay_mas else None
+
+    return Pagina(filas, siguiente=siguiente, anterior=anterior)
+
+
+def paginar_lista(elementos, despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+    """Pagina una lista ya ordenada y acotada (p. ej. resultados por relevancia).
+
+    Los tokens guardan la posición, así que comparten formato con los de
+    paginar_keyset(). Devuelve una Pagina cuyas filas son los elementos.
+    """
+    valores = decodificar_cursor(despues or antes, 1)
+    posicion = valores[0] if valores and isinstance(valores[0], int) and valores[0] > 0 else 0
+    inicio = posicion if despues else max(0, posicion - por_pagina)
+
+    fin = inicio + por_pagina
+    return Pagina(
+        elementos[inicio:fin],
+        siguiente=codificar_cursor([fin]) if fin < len(elementos) else None,
+        anterior=codificar_cursor([inicio]) if inicio > 0 else None,
+        total=len(elementos),
+    )
+
+
+def contar_aproximado(cur, tabla, select_conteo=None, filtros=None, params=()):
+    """Total aproximado para mostrar junto a la paginación.
+
+    Sin filtros usa las estadísticas de InnoDB (sin recorrer la tabla); con
+    filtros cuenta como mucho CONTEO_MAX filas. Devuelve (total, es_exacto).
+    """
+    if not filtros:
+        cur.execute(
+            "SELECT TABLE_ROWS AS total FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (tabla,)
+        )
+        fila = cur.fetchone()
+        return (int(fila['total'] or 0) if fila else 0), False
+
+    sql = (select_conteo or f"SELECT 1 FROM {tabla}")
+    sql += " WHERE " + " AND ".join(f"({f})" for f in filtros)
+    cur.execute(f"SELECT COUNT(*) AS total FROM ({sql} LIMIT %s) AS t", tuple(params) + (CONTEO_MAX + 1,))
+    total = int(cur.fetchone()['total'])
+    if total > CONTEO_MAX:
+        return CONTEO_MAX, False
+    return total, True
@@ -0,0 +1,149 @@
+# reportes.py
+# Reportes de ventas servidos desde agregados precalculados: por día y
+# producto, por día y usuario, y por mes. registrar_venta los actualiza en su
+# propia transacción y `flask --app app reportes-recalcular` los reconstruye
+# desde ventas y detalle_ventas. Las consultas de /reportes/* solo leen estas
+# tablas, así su coste depende del rango pedido y no del histórico de ventas.
+import os
+from datetime import date, datetime, timedelta
+from repositorios import repos
+
+# Rango por defecto (días hasta hoy) y tope de filas del ranking de productos
+REPORTE_DIAS = int(os.environ.get('REPORT_DEFAULT_DAYS', '30'))
+REPORTE_LIMITE_MAX = 500
+
+
+class ReporteInvalido(ValueError):
+    """Parámetros de reporte no válidos (fechas, meses o límite)"""
+
+
+def venta_registrada(conn, venta_id, usuario_id, detalle, total):
+    """Suma una venta a los agregados. `detalle` como en VentaRepo.agregar_detalle.
+
+    El día sale de ventas.fecha_venta (reloj de la base), igual que en la
+    reconstrucción, y no del reloj de la aplicación.
+    """
+    repos(conn).reportes.sumar_venta(venta_id, usuario_id, detalle, total)
+
+
+def recalcular(conn):
+    """Reconstruye los agregados desde las ventas (tarea por lotes o reparación)"""
+    repos(conn).reportes.reconstruir()
+    conn.commit()
+
+
+def _fecha(texto, defecto):
+    if not texto:
+        return defecto
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise ReporteInvalido(f'Fecha no válida: {texto} (use AAAA-MM-DD)')
+
+
+def rango_fechas(desde=None, hasta=None):
+    """(desde, hasta) como date; por defecto los últimos REPORTE_DIAS días"""
+    hasta = _fecha(hasta, date.today())
+    desde = _fecha(desde, hasta - timedelta(days=REPORTE_DIAS - 1))
+    if desde > hasta:
+        raise ReporteInvalido('La fecha inicial es posterior a la final')
+    return desde, hasta
+
+
+def rango_meses(desde=None, hasta=None):
+    """('AAAA-MM', 'AAAA-MM'); por defecto los últimos 12 meses"""
+    def mes(texto, defecto):
+        if not texto:
+            return defecto
+        try:
+            return datetime.strptime(texto, '%Y-%m').strftime('%Y-%m')
+        except ValueError:
+            raise ReporteInvalido(f'Mes no válido: {texto} (use AAAA-MM)')
+
+    hoy = date.today()
+    hasta = mes(hasta, hoy.strftime('%Y-%m'))
+    anio, numero = divmod(int(hasta[:4]) * 12 + int(hasta[5:]) - 1 - 11, 12)
+    desde = mes(desde, f'{anio:04d}-{numero + 1:02d}')
+    if desde > hasta:
+        raise ReporteInvalido('El mes inicial es posterior al final')
+    return desde, hasta
+
+
+def limite(texto, defecto=20):
+    try:
+        valor = int(texto) if texto else defecto
+    except ValueError:
+        raise ReporteInvalido('El límite debe ser un número')
+    return max(1, min(valor, REPORTE_LIMITE_MAX))
+
+
+def _fila(fila):
+    """Fila JSON: fechas ISO e importes como float"""
+    resultado = {}
+    for clave, valor in fila.items():
+        if isinstance(valor, date):
+            valor = valor.isoformat()
+        elif clave == 'importe':
+            valor = float(valor or 0)
+        elif clave in ('ventas', 'unidades'):
+            valor = int(valor or 0)
+        resultado[clave] = valor
+    return resultado
+
+
+def ventas_por_dia(conn, desde, hasta):
+    return [_fila(f) for f in repos(conn).reportes.por_dia(desde.isoformat(), hasta.isoformat())]
+
+
+def ventas_por_producto(conn, desde, hasta, limite=20, producto_id=None):
+    """Ranking de productos, o la serie diaria de uno si se indica producto_id"""
+    repo = repos(conn).reportes
+    if producto_id is not None:
+        filas = repo.producto_por_dia(producto_id, desde.isoformat(), hasta.isoformat())
+    else:
+        filas = repo.por_producto(desde.isoformat(), hasta.isoformat(), limite)
+    return [_fila(f) for f in filas]
+
+
+def ventas_por_usuario(conn, desde, hasta):
+    return [_fila(f) for f in repos(conn).reportes.por_usuario(desde.isoformat(), hasta.isoformat())]
+
+
+def ventas_por_mes(conn, desde, hasta):
+    return [_fila(f) for f in repos(conn).reportes.por_mes(desde, hasta)]
+
+
+CONSULTAS = ('dia', 'producto', 'usuario', 'mes')
+
+
+def parametros(consulta, args):
+    """Parámetros validados de /reportes/ventas/<consulta>, con el rango ya resuelto"""
+    if consulta not in CONSULTAS:
+        raise ReporteInvalido(f'Reporte desconocido: {consulta}')
+    if consulta == 'mes':
+        desde, hasta = rango_meses(args.get('desde'), args.get('hasta'))
+        return {'desde': desde, 'hasta': hasta}
+    desde, hasta = rango_fechas(args.get('desde'), args.get('hasta'))
+    valores = {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}
+    if consulta == 'producto':
+        valores['limite'] = limite(args.get('limite'))
+        try:
+            valores['producto_id'] = int(args.get('producto_id'))
+        except (TypeError, ValueError):
+            valores['producto_id'] = None
+    return valores
+
+
+def consultar(conn, consulta, valores):
+    """Respuesta JSON de un reporte a partir de parametros()"""
+    if consulta == 'mes':
+        filas = ventas_por_mes(conn, valores['desde'], valores['hasta'])
+    else:
+        desde, hasta = date.fromisoformat(valores['desde']), date.fromisoformat(valores['hasta'])
+        if consulta == 'dia':
+            filas = ventas_por_dia(conn, desde, hasta)
+        elif consulta == 'producto':
+            filas = ventas_por_producto(conn, desde, hasta, valores['limite'], valores['producto_id'])
+        else:
+            filas = ventas_por_usuario(conn, desde, hasta)
+    return {'desde': valores['desde'], 'hasta': valores['hasta'], 'filas': filas}
@@ -0,0 +1,32 @@
+# repositorios/__init__.py
+# Capa de acceso a datos. Uso: r = repos(conn); r.productos.por_id(5)
+# La implementación (MySQL o SQLite) se elige según la conexión recibida.
+from conexion.conexion import dialecto
+from repositorios import mysql, sqlite
+
+_IMPLEMENTACIONES = {
+    'mysql': mysql,
+    'sqlite': sqlite,
+}
+
+
+class Repositorios:
+    def __init__(self, conn, modulo):
+        self.conn = conn
+        self.productos = modulo.ProductoRepo(conn)
+        self.clientes = modulo.ClienteRepo(conn)
+        self.ventas = modulo.VentaRepo(conn)
+        self.compras = modulo.CompraRepo(conn)
+        self.usuarios = modulo.UsuarioRepo(conn)
+        self.alertas = modulo.AlertaRepo(conn)
+        self.reportes = modulo.ReporteRepo(conn)
+        self.estadisticas = modulo.EstadisticasRepo(conn)
+        self.movimientos = modulo.MovimientoRepo(conn)
+        self.trabajos = modulo.TrabajoRepo(conn)
+        self.versiones = modulo.VersionRepo(conn)
+        self.esquema = modulo.EsquemaRepo(conn)
+
+
+def repos(conn):
+    """Repositorios que trabajan sobre la conexión (y la transacción) indicada"""
+    return Repositorios(conn, _IMPLEMENTACIONES[dialecto(conn)])
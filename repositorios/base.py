@@ -0,0 +1,827 @@
+# repositorios/base.py
+# SQL común a MySQL y SQLite. Los repositorios no confirman: la ruta o el
+# servicio que los usa decide cuándo hacer commit/rollback de la transacción.
+# Las diferencias entre motores se resuelven en repositorios/mysql.py y
+# repositorios/sqlite.py sobrescribiendo los atributos y métodos marcados.
+# Las escrituras de productos, clientes, ventas y compras anotan además un
+# cambio en su tabla: el contador (versiones_tabla) avanza en una transacción
+# corta después del commit, no dentro de la de negocio, para que esa fila
+# compartida no serialice todas las escrituras (ver conexion/transaccion.py).
+# Las filas de productos escritas sí se sellan (version_fila) dentro de la
+# transacción de negocio: si el avance posterior falla, la versión efectiva de
+# 'productos' (VersionRepo.leer, que toma también MAX(version_fila)) cambia
+# igual y el catálogo, la caché de listados y los ETag no quedan desfasados.
+from paginacion import paginar_keyset, PAGINA_TAMANO
+
+SQL_VERSION_FILA_MAX = "SELECT COALESCE(MAX(version_fila), 0) AS version FROM productos"
+
+
+def _sellar_productos(cur, ids, valor, params=()):
+    """Pone version_fila = valor (expresión SQL) en las filas de productos indicadas"""
+    marcadores = ', '.join(['%s'] * len(ids))
+    cur.execute(f"UPDATE productos SET version_fila = {valor} WHERE id IN ({marcadores})",
+                tuple(params) + tuple(sorted(ids)))
+
+
+def _avanzar_versiones(conn, cambios):
+    """Avanza los contadores de {tabla: ids} y vuelve a sellar con el nuevo las filas de productos anotadas.
+
+    Los contadores se bloquean siempre en el mismo orden. El de 'productos'
+    no queda nunca por debajo de los sellos ya puestos dentro de las
+    transacciones de negocio, así el nuevo sello tampoco retrocede.
+    """
+    cur = conn.cursor()
+    for tabla in sorted(cambios):
+        cur.execute("UPDATE versiones_tabla SET version = version + 1 WHERE tabla = %s", (tabla,))
+        if tabla == 'productos':
+            cur.execute(
+                f"UPDATE versiones_tabla SET version = ({SQL_VERSION_FILA_MAX}) "
+                f"WHERE tabla = 'productos' AND version < ({SQL_VERSION_FILA_MAX})"
+            )
+    ids = cambios.get('productos')
+    if ids:
+        _sellar_productos(cur, ids, "(SELECT version FROM versiones_tabla WHERE tabla = 'productos')")
+
+
+def _tarea_versiones(conn, cambios):
+    _avanzar_versiones(conn, cambios)
+    conn.commit()
+
+
+def _sin_tarea(conn, estado):
+    """Entrada que solo guarda estado de la transacción (el sello provisional)"""
+
+
+class Repo:
+    tabla = None
+    # Sufijo de bloqueo de filas para SELECT dentro de una transacción (' FOR UPDATE' en MySQL)
+    bloqueo = ''
+    # INSERT que actualiza la fila existente si choca con la clave única (según el motor)
+    sql_upsert = None
+    # Columnas que expone la API JSON y clave de orden de su paginación por cursor
+    CAMPOS = ()
+    ORDEN = ('id',)
+    DESCENDENTE = False
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _uno(self, sql, params=None):
+        cur = self.conn.cursor(dictionary=True)
+        cur.execute(sql, params)
+        return cur.fetchone()
+
+    def _todos(self, sql, params=None):
+        cur = self.conn.cursor(dictionary=True)
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+    def _ejecutar(self, sql, params=None):
+        """Ejecuta una escritura y devuelve el cursor (lastrowid, rowcount)"""
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        return cur
+
+    def _lotes_por_id(self, select, tamano):
+        """Listas de como mucho `tamano` filas por id creciente, una consulta corta por lista.
+
+        Entre lista y lista la conexión queda libre (a diferencia de un cursor sin buffer).
+        """
+        ultimo = 0
+        while True:
+            filas = self._todos(f"{select} WHERE id > %s ORDER BY id LIMIT %s", (ultimo, tamano))
+            if not filas:
+                return
+            yield filas
+            ultimo = filas[-1]['id']
+
+    def _por_ids(self, select, ids):
+        """Filas de los ids indicados conservando el orden de la lista"""
+        if not ids:
+            return []
+        marcadores = ', '.join(['%s'] * len(ids))
+        filas = self._todos(f"{select} WHERE id IN ({marcadores}){self.bloqueo}", tuple(ids))
+        por_id = {fila['id']: fila for fila in filas}
+        return [por_id[i] for i in ids if i in por_id]
+
+    def contar(self):
+        return int(self._uno(f"SELECT COUNT(*) AS total FROM {self.tabla}")['total'])
+
+    def contar_aproximado(self):
+        """(total, es_exacto) para mostrar junto a la paginación; cada motor puede estimarlo más barato"""
+        return self.contar(), True
+
+    def guardar_lote(self, filas):
+        """Inserta o actualiza (por la clave única) varias filas con executemany"""
+        self.conn.cursor().executemany(self.sql_upsert, filas)
+        self._tocar()
+
+    def _tocar(self, tabla=None, ids=()):
+        """Anota un cambio en la tabla para después del commit; las filas `ids` de productos se sellan ya"""
+        tabla = tabla or self.tabla
+        tras_confirmar = getattr(self.conn, 'tras_confirmar', None)
+        if tras_confirmar is None:
+            # Conexión sin tareas aplazadas: se avanza dentro de la transacción
+            _avanzar_versiones(self.conn, {tabla: set(ids)})
+            return
+        if ids and tabla == 'productos':
+            # Sello provisional, uno por transacción y mayor que la versión efectiva al calcularlo
+            sello = tras_confirmar('sello_productos', _sin_tarea)
+            if 'version' not in sello:
+                sello['version'] = VersionRepo(self.conn).leer(['productos'])['productos'] + 1
+            _sellar_productos(self.conn.cursor(), ids, '%s', (sello['version'],))
+        tras_confirmar('versiones', _tarea_versiones).setdefault(tabla, set()).update(ids)
+
+    def pagina_campos(self, campos=None, despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+        """Página por cursor sobre ORDEN leyendo solo las columnas pedidas (más las del orden)"""
+        columnas = list(campos or self.CAMPOS)
+        columnas += [c for c in self.ORDEN if c not in columnas]
+        return paginar_keyset(
+            self.conn.cursor(dictionary=True), f"SELECT {', '.join(columnas)} FROM {self.tabla}",
+            orden=self.ORDEN, descendente=self.DESCENDENTE, despues=despues, antes=antes, por_pagina=por_pagina
+        )
+
+
+class ProductoRepo(Repo):
+    tabla = 'productos'
+    SELECT = "SELECT id, nombre, cantidad, precio FROM productos"
+    # Ficha completa para el formulario de edición
+    SELECT_FICHA = "SELECT id, nombre, cantidad, precio, categoria, stock_minimo FROM productos"
+    CAMPOS = ('id', 'nombre', 'cantidad', 'precio', 'categoria', 'stock_minimo')
+    ORDEN = ('nombre', 'id')
+    # Las escrituras sueltas anotan sus ids: tras el commit se sellan con el
+    # nuevo contador (version_fila) y el catálogo en memoria relee solo esas
+
+    def por_id(self, producto_id, bloquear=False):
+        return self._uno(f"{self.SELECT_FICHA} WHERE id = %s{self.bloqueo if bloquear else ''}", (producto_id,))
+
+    def por_ids(self, ids):
+        return self._por_ids(self.SELECT, ids)
+
+    def id_por_nombre(self, nombre, excluir_id=None):
+        if excluir_id is None:
+            fila = self._uno("SELECT id FROM productos WHERE nombre = %s", (nombre,))
+        else:
+            fila = self._uno("SELECT id FROM productos WHERE nombre = %s AND id != %s", (nombre, excluir_id))
+        return fila['id'] if fila else None
+
+    def crear(self, nombre, cantidad, precio, categoria='general', stock_minimo=None):
+        cur = self._ejecutar(
+            "INSERT INTO productos (nombre, cantidad, precio, categoria, stock_minimo) VALUES (%s, %s, %s, %s, %s)",
+            (nombre, cantidad, float(precio), categoria, stock_minimo)
+        )
+        self._tocar(ids=(cur.lastrowid,))
+        self._tocar('productos_nombres')
+        return cur.lastrowid
+
+    def actualizar(self, producto_id, nombre, cantidad, precio, categoria='general', stock_minimo=None):
+        self._ejecutar(
+            "UPDATE productos SET nombre=%s, cantidad=%s, precio=%s, categoria=%s, stock_minimo=%s WHERE id=%s",
+            (nombre, cantidad, float(precio), categoria, stock_minimo, producto_id)
+        )
+        self._tocar(ids=(producto_id,))
+        self._tocar('productos_nombres')
+
+    def eliminar(self, producto_id):
+        """True si se borró la fila"""
+        borrada = self._ejecutar("DELETE FROM productos WHERE id = %s", (producto_id,)).rowcount > 0
+        if borrada:
+            self._tocar()
+            self._tocar('productos_recarga')
+            self._tocar('productos_nombres')
+        return borrada
+
+    def sumar_stock(self, producto_id, cantidad):
+        self._ejecutar("UPDATE productos SET cantidad = cantidad + %s WHERE id = %s", (cantidad, producto_id))
+        self._tocar(ids=(producto_id,))
+
+    def sumar_stock_lote(self, incrementos):
+        """Suma {producto_id: unidades} con un único UPDATE (CASE por id)"""
+        if not incrementos:
+            return
+        ids = tuple(incrementos)
+        casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+        marcadores = ', '.join(['%s'] * len(ids))
+        params = tuple(v for pid in ids for v in (pid, incrementos[pid])) + ids
+        self._ejecutar(
+            f"UPDATE productos SET cantidad = cantidad + CASE id {casos} ELSE 0 END WHERE id IN ({marcadores})",
+            params
+        )
+        self._tocar(ids=ids)
+
+    def restar_stock_lote(self, cantidades):
+        """Resta {producto_id: unidades} en un único UPDATE a los productos con stock suficiente.
+
+        La condición se evalúa fila a fila con el bloqueo del propio UPDATE.
+        Devuelve False si a alguno no le alcanzó; entonces el llamador debe
+        deshacer la transacción.
+        """
+        if not cantidades:
+            return True
+        ids = tuple(cantidades)
+        casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+        marcadores = ', '.join(['%s'] * len(ids))
+        pares = tuple(v for pid in ids for v in (pid, cantidades[pid]))
+        cur = self._ejecutar(
+            f"UPDATE productos SET cantidad = cantidad - CASE id {casos} ELSE 0 END "
+            f"WHERE id IN ({marcadores}) AND cantidad >= CASE id {casos} ELSE 0 END",
+            pares + ids + pares
+        )
+        self._tocar(ids=ids)
+        return cur.rowcount == len(ids)
+
+    def guardar_lote(self, filas):
+        """Upsert por nombre de (nombre, cantidad, precio[, categoria, stock_minimo]).
+
+        categoria y stock_minimo a None conservan el valor del producto (o el
+        de la tabla si es nuevo), así reimportar una exportación sin esas
+        columnas no borra umbrales. Carga masiva sin sellar filas: el
+        catálogo en memoria se recarga entero.
+        """
+        super().guardar_lote([fila[:3] for fila in filas])
+        extras = [(fila[3], fila[4], fila[0]) for fila in filas
+                  if len(fila) > 3 and (fila[3] is not None or fila[4] is not None)]
+        if extras:
+            self.conn.cursor().executemany(
+                "UPDATE productos SET categoria = COALESCE(%s, categoria), stock_minimo = COALESCE(%s, stock_minimo) "
+                "WHERE nombre = %s",
+                extras
+            )
+        self._tocar('productos_recarga')
+        self._tocar('productos_nombres')
+
+    def cambios(self, desde_version):
+        """Productos escritos después de la versión indicada (índice por version_fila)"""
+        return self._todos(f"{self.SELECT} WHERE version_fila > %s", (desde_version,))
+
+    def catalogo(self):
+        """(id, nombre, cantidad, precio) de todo el catálogo, para la foto en memoria"""
+        cur = self.conn.cursor()
+        cur.execute(self.SELECT)
+        return cur.fetchall()
+
+    def pagina(self, despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+        """Paginación por cursor sobre el índice (nombre, id)"""
+        return paginar_keyset(
+            self.conn.cursor(dictionary=True), self.SELECT, orden=('nombre', 'id'),
+            despues=despues, antes=antes, por_pagina=por_pagina
+        )
+
+
+class ClienteRepo(Repo):
+    tabla = 'clientes'
+    SELECT = "SELECT id, nombre, apellido, telefono, email, fecha_registro FROM clientes"
+    CAMPOS = ('id', 'nombre', 'apellido', 'telefono', 'email', 'fecha_registro')
+    ORDEN = ('fecha_registro', 'id')
+    DESCENDENTE = True
+
+    def por_id(self, cliente_id):
+        return self._uno(f"{self.SELECT} WHERE id = %s", (cliente_id,))
+
+    def por_ids(self, ids):
+        return self._por_ids(self.SELECT, ids)
+
+    def existe(self, cliente_id):
+        return self._uno("SELECT id FROM clientes WHERE id = %s", (cliente_id,)) is not None
+
+    def id_por_email(self, email, excluir_id=None):
+        if excluir_id is None:
+            fila = self._uno("SELECT id FROM clientes WHERE email = %s", (email,))
+        else:
+            fila = self._uno("SELECT id FROM clientes WHERE email = %s AND id != %s", (email, excluir_id))
+        return fila['id'] if fila else None
+
+    def crear(self, nombre, apellido, telefono, email):
+        cur = self._ejecutar(
+            "INSERT INTO clientes (nombre, apellido, telefono, email) VALUES (%s, %s, %s, %s)",
+            (nombre, apellido, telefono, email)
+        )
+        self._tocar()
+        return cur.lastrowid
+
+    def actualizar(self, cliente_id, nombre, apellido, telefono, email):
+        self._ejecutar(
+            "UPDATE clientes SET nombre=%s, apellido=%s, telefono=%s, email=%s WHERE id=%s",
+            (nombre, apellido, telefono, email, cliente_id)
+        )
+        self._tocar()
+
+    def eliminar(self, cliente_id):
+        borrada = self._ejecutar("DELETE FROM clientes WHERE id = %s", (cliente_id,)).rowcount > 0
+        if borrada:
+            self._tocar()
+        return borrada
+
+    def pagina(self, despues=None, antes=None, por_pagina=PAGINA_TAMANO):
+        """Paginación por cursor sobre el índice (fecha_registro, id), más recientes primero"""
+        return paginar_keyset(
+            self.conn.cursor(dictionary=True), self.SELECT, orden=('fecha_registro', 'id'),
+            descendente=True, despues=despues, antes=antes, por_pagina=por_pagina
+        )
+
+
+class VentaRepo(Repo):
+    tabla = 'ventas'
+    CAMPOS = ('id', 'cliente_id', 'usuario_id', 'fecha_venta', 'total', 'estado')
+    DESCENDENTE = True
+
+    def listar(self):
+        return self._todos("""
+            SELECT v.*, c.nombre as cliente_nombre, c.apellido as cliente_apellido,
+                   u.nombre as usuario_nombre
+            FROM ventas v
+            JOIN clientes c ON v.cliente_id = c.id
+            JOIN usuarios u ON v.usuario_id = u.id
+            ORDER BY v.fecha_venta DESC
+        """)
+
+    def crear(self, cliente_id, usuario_id, total):
+        cur = self._ejecutar(
+            "INSERT INTO ventas (cliente_id, usuario_id, total) VALUES (%s, %s, %s)",
+            (cliente_id, usuario_id, total)
+        )
+        self._tocar()
+        return cur.lastrowid
+
+    def agregar_detalle(self, venta_id, detalle):
+        """`detalle`: tuplas (producto_id, cantidad, precio_unitario, subtotal)"""
+        self.conn.cursor().executemany(
+            "INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, precio_unitario, subtotal) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(venta_id,) + tuple(linea) for linea in detalle]
+        )
+
+    def lotes_exportacion(self, tamano):
+        """Todas las ventas por id, en listas de como mucho `tamano`"""
+        return self._lotes_por_id("SELECT id, fecha_venta, cliente_id, usuario_id, total, estado FROM ventas", tamano)
+
+    def lotes_detalle(self, tamano):
+        """Las líneas de todas las ventas por id, en listas de como mucho `tamano`"""
+        return self._lotes_por_id(
+            "SELECT id, venta_id, producto_id, cantidad, precio_unitario, subtotal FROM detalle_ventas", tamano)
+
+
+class CompraRepo(Repo):
+    tabla = 'compras'
+    CAMPOS = ('id', 'proveedor_nombre', 'producto_id', 'cantidad', 'precio_compra', 'fecha_compra', 'usuario_id')
+    DESCENDENTE = True
+
+    def listar(self):
+        return self._todos("""
+            SELECT c.*, p.nombre as producto_nombre, u.nombre as usuario_nombre
+            FROM compras c
+            JOIN productos p ON c.producto_id = p.id
+            JOIN usuarios u ON c.usuario_id = u.id
+            ORDER BY c.fecha_compra DESC
+        """)
+
+    def crear(self, proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id):
+        cur = self._ejecutar(
+            "INSERT INTO compras (proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id)
+        )
+        self._tocar()
+        return cur.lastrowid
+
+    def crear_lote(self, proveedor_nombre, usuario_id, lineas):
+        """`lineas`: tuplas (producto_id, cantidad, precio_compra), insertadas con executemany"""
+        self.conn.cursor().executemany(
+            "INSERT INTO compras (proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(proveedor_nombre, producto_id, cantidad, precio, usuario_id) for producto_id, cantidad, precio in lineas]
+        )
+        self._tocar()
+
+    def lotes_exportacion(self, tamano):
+        """Todas las compras por id, en listas de como mucho `tamano`"""
+        return self._lotes_por_id(
+            "SELECT id, fecha_compra, proveedor_nombre, producto_id, cantidad, precio_compra, usuario_id FROM compras",
+            tamano)
+
+
+class UsuarioRepo(Repo):
+    tabla = 'usuarios'
+
+    def por_id(self, usuario_id):
+        return self._uno("SELECT * FROM usuarios WHERE id = %s", (usuario_id,))
+
+    def por_email(self, email):
+        return self._uno("SELECT * FROM usuarios WHERE email = %s", (email,))
+
+    def crear(self, nombre, email, password_hash):
+        cur = self._ejecutar(
+            "INSERT INTO usuarios (nombre, email, password) VALUES (%s, %s, %s)",
+            (nombre, email, password_hash)
+        )
+        return cur.lastrowid
+
+    def actualizar_password(self, usuario_id, password_hash):
+        self._ejecutar("UPDATE usuarios SET password = %s WHERE id = %s", (password_hash, usuario_id))
+
+
+class AlertaRepo(Repo):
+    """Productos por debajo de su umbral (alertas_stock) y umbrales por categoría"""
+    tabla = 'alertas_stock'
+    # Umbral efectivo: el del producto, si no el de su categoría, si no el general
+    _SQL_ALERTAS = """
+        INSERT INTO alertas_stock (producto_id, umbral)
+        SELECT p.id, COALESCE(p.stock_minimo, c.stock_minimo, %s)
+        FROM productos p
+        LEFT JOIN categorias_stock c ON c.categoria = p.categoria
+        WHERE {filtro} AND COALESCE(p.activo, 1) = 1
+          AND p.cantidad < COALESCE(p.stock_minimo, c.stock_minimo, %s)
+    """
+
+    def _insertar(self, filtro, params, umbral_general):
+        sql = self._SQL_ALERTAS.format(filtro=filtro)
+        return self._ejecutar(sql, (umbral_general,) + tuple(params) + (umbral_general,)).rowcount
+
+    def evaluar(self, producto_ids, umbral_general):
+        """Recalcula la alerta de los productos indicados; devuelve el cambio en el número de alertas"""
+        ids = tuple(producto_ids)
+        if not ids:
+            return 0
+        marcadores = ', '.join(['%s'] * len(ids))
+        quitadas = self._ejecutar(f"DELETE FROM alertas_stock WHERE producto_id IN ({marcadores})", ids).rowcount
+        return self._insertar(f"p.id IN ({marcadores})", ids, umbral_general) - quitadas
+
+    def evaluar_categoria(self, categoria, umbral_general):
+        """Como evaluar() para todos los productos de una categoría (índice idx_productos_categoria)"""
+        quitadas = self._ejecutar(
+            "DELETE FROM alertas_stock WHERE producto_id IN (SELECT id FROM productos WHERE categoria = %s)",
+            (categoria,)
+        ).rowcount
+        return self._insertar("p.categoria = %s", (categoria,), umbral_general) - quitadas
+
+    def descartar(self, producto_id):
+        """Quita la alerta del producto; devuelve el cambio en el número de alertas"""
+        return -self._ejecutar("DELETE FROM alertas_stock WHERE producto_id = %s", (producto_id,)).rowcount
+
+    def reconstruir(self, umbral_general):
+        """Recalcula el conjunto completo (recorre el catálogo: solo arranque o reparación)"""
+        self._ejecutar("DELETE FROM alertas_stock")
+        return self._insertar("1 = 1", (), umbral_general)
+
+    def listar(self):
+        return self._todos("""
+            SELECT p.id, p.nombre, p.cantidad, p.precio, p.categoria, a.umbral
+            FROM alertas_stock a
+            JOIN productos p ON p.id = a.producto_id
+            ORDER BY p.cantidad ASC, p.id ASC
+        """)
+
+    def umbrales_categoria(self):
+        return self._todos("SELECT categoria, stock_minimo FROM categorias_stock ORDER BY categoria")
+
+    def fijar_umbral_categoria(self, categoria, stock_minimo):
+        self._ejecutar(self.sql_upsert, (categoria, stock_minimo))
+
+    def quitar_umbral_categoria(self, categoria):
+        self._ejecutar("DELETE FROM categorias_stock WHERE categoria = %s", (categoria,))
+
+
+class ReporteRepo(Repo):
+    """Agregados de ventas completadas por día y producto, día y usuario, y mes"""
+    tabla = 'ventas_dia_producto'
+    # Upserts que suman a la fila existente (según el motor)
+    sql_upsert_dia_producto = None
+    sql_upsert_dia_usuario = None
+    sql_upsert_mes = None
+    # Expresión que convierte la columna indicada en 'AAAA-MM'
+    sql_anio_mes = None
+
+    def sumar_venta(self, venta_id, usuario_id, detalle, total):
+        """`detalle`: tuplas (producto_id, cantidad, precio_unitario, subtotal) de una venta.
+
+        El día es DATE(fecha_venta) de la venta guardada, como en reconstruir().
+        """
+        fecha = self._uno("SELECT DATE(fecha_venta) AS fecha FROM ventas WHERE id = %s", (venta_id,))['fecha']
+        fecha = fecha.isoformat() if hasattr(fecha, 'isoformat') else str(fecha)
+        cur = self.conn.cursor()
+        cur.executemany(self.sql_upsert_dia_producto,
+                        [(fecha, producto_id, cantidad, subtotal) for producto_id, cantidad, _, subtotal in detalle])
+        cur.execute(self.sql_upsert_dia_usuario, (fecha, usuario_id, 1, total))
+        cur.execute(self.sql_upsert_mes, (fecha[:7], 1, sum(linea[1] for linea in detalle), total))
+
+    def reconstruir(self):
+        """Recalcula los agregados desde ventas y detalle_ventas (recorre el histórico)"""
+        for tabla in ('ventas_dia_producto', 'ventas_dia_usuario', 'ventas_mes'):
+            self._ejecutar(f"DELETE FROM {tabla}")
+        self._ejecutar("""
+            INSERT INTO ventas_dia_producto (fecha, producto_id, unidades, importe)
+            SELECT DATE(v.fecha_venta), d.producto_id, SUM(d.cantidad), SUM(d.subtotal)
+            FROM ventas v JOIN detalle_ventas d ON d.venta_id = v.id
+            WHERE v.estado = 'completada'
+            GROUP BY DATE(v.fecha_venta), d.producto_id
+        """)
+        self._ejecutar("""
+            INSERT INTO ventas_dia_usuario (fecha, usuario_id, ventas, importe)
+            SELECT DATE(fecha_venta), usuario_id, COUNT(*), SUM(total)
+            FROM ventas
+            WHERE estado = 'completada'
+            GROUP BY DATE(fecha_venta), usuario_id
+        """)
+        mes = self.sql_anio_mes.format(columna='fecha')
+        self._ejecutar(f"""
+            INSERT INTO ventas_mes (anio_mes, ventas, unidades, importe)
+            SELECT anio_mes, SUM(ventas), SUM(unidades), SUM(importe)
+            FROM (
+                SELECT {mes} AS anio_mes, ventas, 0 AS unidades, importe FROM ventas_dia_usuario
+                UNION ALL
+                SELECT {mes}, 0, unidades, 0 FROM ventas_dia_producto
+            ) t
+            GROUP BY anio_mes
+        """)
+
+    def por_dia(self, desde, hasta):
+        return self._todos("""
+            SELECT fecha, SUM(ventas) AS ventas, SUM(importe) AS importe
+            FROM ventas_dia_usuario
+            WHERE fecha BETWEEN %s AND %s
+            GROUP BY fecha
+            ORDER BY fecha
+        """, (desde, hasta))
+
+    def por_producto(self, desde, hasta, limite):
+        """Productos más vendidos (por importe) en el rango"""
+        return self._todos("""
+            SELECT t.producto_id, p.nombre, t.unidades, t.importe
+            FROM (
+                SELECT producto_id, SUM(unidades) AS unidades, SUM(importe) AS importe
+                FROM ventas_dia_producto
+                WHERE fecha BETWEEN %s AND %s
+                GROUP BY producto_id
+                ORDER BY importe DESC, producto_id
+                LIMIT %s
+            ) t
+            LEFT JOIN productos p ON p.id = t.producto_id
+            ORDER BY t.importe DESC, t.producto_id
+        """, (desde, hasta, limite))
+
+    def producto_por_dia(self, producto_id, desde, hasta):
+        """Serie diaria de un producto (índice (producto_id, fecha))"""
+        return self._todos("""
+            SELECT fecha, unidades, importe
+            FROM ventas_dia_producto
+            WHERE producto_id = %s AND fecha BETWEEN %s AND %s
+            ORDER BY fecha
+        """, (producto_id, desde, hasta))
+
+    def por_usuario(self, desde, hasta):
+        return self._todos("""
+            SELECT t.usuario_id, u.nombre, t.ventas, t.importe
+            FROM (
+                SELECT usuario_id, SUM(ventas) AS ventas, SUM(importe) AS importe
+                FROM ventas_dia_usuario
+                WHERE fecha BETWEEN %s AND %s
+                GROUP BY usuario_id
+            ) t
+            LEFT JOIN usuarios u ON u.id = t.usuario_id
+            ORDER BY t.importe DESC, t.usuario_id
+        """, (desde, hasta))
+
+    def por_mes(self, desde, hasta):
+        return self._todos("""
+            SELECT anio_mes, ventas, unidades, importe
+            FROM ventas_mes
+            WHERE anio_mes BETWEEN %s AND %s
+            ORDER BY anio_mes
+        """, (desde, hasta))
+
+
+class EstadisticasRepo(Repo):
+    tabla = 'estadisticas_resumen'
+    COLUMNAS = ('productos_total', 'stock_total', 'suma_precios', 'bajo_stock',
+                'clientes_total', 'ventas_total', 'ingresos', 'compras_total')
+    # Expresión que convierte fecha_registro en 'AAAA-MM', y el mes en curso según el reloj de la base
+    sql_anio_mes = None
+    sql_mes_actual = None
+
+    def ajustar(self, deltas):
+        """Suma los deltas {columna: valor} a la fila de resumen y avanza su versión"""
+        asignaciones = ', '.join(f"{c} = {c} + %s" for c in deltas)
+        self._ejecutar(
+            f"UPDATE estadisticas_resumen SET {asignaciones}, version = version + 1 WHERE id = 1",
+            tuple(deltas.values())
+        )
+
+    def ajustar_clientes_mes(self, anio_mes, delta):
+        self._ejecutar(self.sql_upsert, (anio_mes, delta))
+
+    def calcular(self):
+        """Resumen calculado desde las tablas base (bajo_stock desde alertas_stock ya reconstruida)"""
+        resumen = self._uno("""
+            SELECT COUNT(*) AS productos_total, COALESCE(SUM(cantidad), 0) AS stock_total,
+                   COALESCE(SUM(precio), 0) AS suma_precios
+            FROM productos
+        """)
+        resumen['bajo_stock'] = self._uno("SELECT COUNT(*) AS total FROM alertas_stock")['total']
+        resumen['clientes_total'] = self._uno("SELECT COUNT(*) AS total FROM clientes")['total']
+        ventas = self._uno(
+            "SELECT COUNT(*) AS total, COALESCE(SUM(total), 0) AS ingresos FROM ventas WHERE estado = 'completada'"
+        )
+        resumen['ventas_total'], resumen['ingresos'] = ventas['total'], ventas['ingresos']
+        resumen['compras_total'] = self._uno("SELECT COUNT(*) AS total FROM compras")['total']
+        return resumen
+
+    def reemplazar(self, resumen):
+        """Sustituye la fila de resumen y reconstruye las altas por año y mes"""
+        self._ejecutar(
+            f"REPLACE INTO estadisticas_resumen (id, {', '.join(self.COLUMNAS)}, version) "
+            f"VALUES (1, {', '.join(['%s'] * len(self.COLUMNAS))}, 0)",
+            tuple(resumen[c] for c in self.COLUMNAS)
+        )
+        # Altas agrupadas por año y mes (MONTH() a secas mezclaba años distintos)
+        self._ejecutar("DELETE FROM estadisticas_clientes_mes")
+        self._ejecutar(f"""
+            INSERT INTO estadisticas_clientes_mes (anio_mes, total)
+            SELECT {self.sql_anio_mes}, COUNT(*)
+            FROM clientes
+            WHERE fecha_registro IS NOT NULL
+            GROUP BY {self.sql_anio_mes}
+        """)
+
+    def leer(self):
+        return self._uno(f"""
+            SELECT r.*, COALESCE((SELECT total FROM estadisticas_clientes_mes
+                                  WHERE anio_mes = {self.sql_mes_actual}), 0) AS este_mes
+            FROM estadisticas_resumen r
+            WHERE r.id = 1
+        """)
+
+
+class MovimientoRepo(Repo):
+    """Libro de movimientos de stock (solo inserción) y sus cortes por producto"""
+    tabla = 'movimientos_stock'
+    # Último corte de cada producto (p) y stock según el libro: corte + movimientos posteriores
+    _SQL_ULTIMO_CORTE = "(SELECT MAX(c.movimiento_id) FROM stock_cortes c WHERE c.producto_id = p.id)"
+    _SQL_STOCK_LIBRO = f"""
+        COALESCE((SELECT c.cantidad FROM stock_cortes c
+                  WHERE c.producto_id = p.id AND c.movimiento_id = {_SQL_ULTIMO_CORTE}), 0)
+        + COALESCE((SELECT SUM(m.delta) FROM movimientos_stock m
+                    WHERE m.producto_id = p.id AND m.id > COALESCE({_SQL_ULTIMO_CORTE}, 0)), 0)
+    """
+
+    def registrar(self, movimientos):
+        """`movimientos`: tuplas (producto_id, delta, motivo, referencia_id, usuario_id, fecha)"""
+        self.conn.cursor().executemany(
+            "INSERT INTO movimientos_stock (producto_id, delta, motivo, referencia_id, usuario_id, fecha) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            movimientos
+        )
+
+    def stock_en(self, producto_id, fecha):
+        """Stock del producto en la fecha: último corte anterior más los movimientos que le siguen"""
+        corte = self._uno(
+            "SELECT movimiento_id, cantidad FROM stock_cortes WHERE producto_id = %s AND fecha <= %s "
+            "ORDER BY movimiento_id DESC LIMIT 1",
+            (producto_id, fecha)
+        )
+        desde, cantidad = (corte['movimiento_id'], int(corte['cantidad'])) if corte else (0, 0)
+        fila = self._uno(
+            "SELECT COALESCE(SUM(delta), 0) AS total, COUNT(*) AS movimientos FROM movimientos_stock "
+            "WHERE producto_id = %s AND id > %s AND fecha <= %s",
+            (producto_id, desde, fecha)
+        )
+        return cantidad + int(fila['total']), int(fila['movimientos'])
+
+    def tomar_cortes(self, fecha):
+        """Un corte por producto con movimientos posteriores al último id ya cortado; devuelve cuántos.
+
+        Es una sola sentencia de escritura: en SQLite nadie más escribe mientras
+        tanto y en MySQL el INSERT ... SELECT lee con bloqueo, así que espera a
+        las inserciones del libro aún sin confirmar en vez de saltárselas.
+        """
+        return self._ejecutar("""
+            INSERT INTO stock_cortes (producto_id, movimiento_id, cantidad, fecha)
+            SELECT m.producto_id, MAX(m.id), COALESCE(c.cantidad, 0) + SUM(m.delta), %s
+            FROM movimientos_stock m
+            LEFT JOIN stock_cortes c ON c.producto_id = m.producto_id AND c.movimiento_id = (
+                SELECT MAX(c2.movimiento_id) FROM stock_cortes c2 WHERE c2.producto_id = m.producto_id)
+            WHERE m.id > (SELECT COALESCE(MAX(movimiento_id), 0) FROM stock_cortes)
+              AND m.id > COALESCE(c.movimiento_id, 0)
+            GROUP BY m.producto_id, c.cantidad
+        """, (fecha,)).rowcount
+
+    def conciliar(self, motivo, fecha):
+        """Anota la diferencia entre productos.cantidad y el libro (cargas masivas); devuelve cuántas"""
+        return self._ejecutar(f"""
+            INSERT INTO movimientos_stock (producto_id, delta, motivo, fecha)
+            SELECT p.id, p.cantidad - ({self._SQL_STOCK_LIBRO}), %s, %s
+            FROM productos p
+            WHERE p.cantidad <> ({self._SQL_STOCK_LIBRO})
+        """, (motivo, fecha)).rowcount
+
+
+class TrabajoRepo(Repo):
+    """Trabajos en segundo plano y el archivo que produce cada uno"""
+    tabla = 'trabajos'
+    ACTIVOS = "('pendiente', 'en_curso')"
+
+    def crear(self, tipo, formato, parametros, clave, usuario_id, ahora):
+        cur = self._ejecutar(
+            "INSERT INTO trabajos (tipo, formato, parametros, clave, usuario_id, creado, actualizado) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (tipo, formato, parametros, clave, usuario_id, ahora, ahora)
+        )
+        return cur.lastrowid
+
+    def por_id(self, trabajo_id):
+        return self._uno("SELECT * FROM trabajos WHERE id = %s", (trabajo_id,))
+
+    def vigente(self, clave, activo_desde):
+        """Último trabajo con esa clave terminado, o en marcha y con avances desde `activo_desde`"""
+        return self._uno(
+            f"SELECT * FROM trabajos WHERE clave = %s AND (estado = 'terminado' "
+            f"OR (estado IN {self.ACTIVOS} AND actualizado >= %s)) ORDER BY id DESC LIMIT 1",
+            (clave, activo_desde)
+        )
+
+    def recientes(self, limite):
+        return self._todos("SELECT * FROM trabajos ORDER BY id DESC LIMIT %s", (limite,))
+
+    def iniciar(self, trabajo_id, total, ahora):
+        self._ejecutar("UPDATE trabajos SET estado = 'en_curso', total = %s, actualizado = %s WHERE id = %s",
+                       (total, ahora, trabajo_id))
+
+    def avanzar(self, trabajo_id, progreso, ahora):
+        self._ejecutar("UPDATE trabajos SET progreso = %s, actualizado = %s WHERE id = %s",
+                       (progreso, ahora, trabajo_id))
+
+    def terminar(self, trabajo_id, archivo, tamano, filas, ahora):
+        self._ejecutar(
+            "UPDATE trabajos SET estado = 'terminado', archivo = %s, tamano = %s, progreso = %s, total = %s, "
+            "actualizado = %s WHERE id = %s",
+            (archivo, tamano, filas, filas, ahora, trabajo_id)
+        )
+
+    def fallar(self, trabajo_id, error, ahora):
+        self._ejecutar("UPDATE trabajos SET estado = 'error', error = %s, actualizado = %s WHERE id = %s",
+                       (error[:500], ahora, trabajo_id))
+
+    def abandonar(self, hasta, ahora):
+        """Marca como fallidos los trabajos en marcha sin avances desde `hasta` (proceso caído)"""
+        return self._ejecutar(
+            f"UPDATE trabajos SET estado = 'error', error = 'Interrumpido', actualizado = %s "
+            f"WHERE estado IN {self.ACTIVOS} AND actualizado < %s",
+            (ahora, hasta)
+        ).rowcount
+
+    def eliminar_anteriores(self, hasta):
+        """Borra los trabajos sin cambios desde `hasta` (terminados, fallidos o abandonados)"""
+        return self._ejecutar(
+            f"DELETE FROM trabajos WHERE actualizado < %s AND estado NOT IN {self.ACTIVOS}", (hasta,)
+        ).rowcount
+
+    def terminados(self):
+        """(id, archivo, tamano) de los trabajos terminados, del más reciente al más antiguo"""
+        return self._todos(
+            "SELECT id, archivo, tamano FROM trabajos WHERE estado = 'terminado' ORDER BY actualizado DESC, id DESC"
+        )
+
+    def eliminar(self, ids):
+        if ids:
+            marcadores = ', '.join(['%s'] * len(ids))
+            self._ejecutar(f"DELETE FROM trabajos WHERE id IN ({marcadores})", tuple(ids))
+
+    def archivos(self):
+        return {fila['archivo'] for fila in self._todos("SELECT DISTINCT archivo FROM trabajos WHERE archivo IS NOT NULL")}
+
+
+class VersionRepo(Repo):
+    tabla = 'versiones_tabla'
+
+    def leer(self, tablas):
+        """{tabla: versión} con una consulta por clave primaria.
+
+        La de 'productos' es la efectiva: el contador o, si es mayor, el último
+        sello de fila (MAX(version_fila), por índice), que ya está puesto
+        aunque el avance posterior al commit no haya llegado a ejecutarse.
+        """
+        marcadores = ', '.join(['%s'] * len(tablas))
+        filas = self._todos(f"SELECT tabla, version FROM versiones_tabla WHERE tabla IN ({marcadores})", tuple(tablas))
+        versiones = {fila['tabla']: int(fila['version']) for fila in filas}
+        if 'productos' in tablas:
+            sello = int(self._uno(SQL_VERSION_FILA_MAX)['version'])
+            versiones['productos'] = max(versiones.get('productos', 0), sello)
+        return {tabla: versiones.get(tabla, 0) for tabla in tablas}
+
+    def incrementar(self, tablas):
+        """Anota cambios en las tablas (cargas que no pasan por sus repositorios); avanzan tras el commit"""
+        for tabla in tablas:
+            self._tocar(tabla)
+
+
+class EsquemaRepo(Repo):
+    def ping(self):
+        return self._uno("SELECT 1 AS ok")
+
+    def tablas(self):
+        """Nombres de las tablas de la base en uso (SQLite, sin information_schema, lo sobrescribe)"""
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE' ORDER BY table_name"
+        )
+        return [fila[0] for fila in cur.fetchall()]
@@ -0,0 +1,87 @@
+# repositorios/mysql.py
+from paginacion import contar_aproximado
+from repositorios import base
+
+
+class _MySQL:
+    bloqueo = ' FOR UPDATE'
+
+    def contar_aproximado(self):
+        # Estadísticas de InnoDB: no recorre la tabla
+        return contar_aproximado(self.conn.cursor(dictionary=True), self.tabla)
+
+
+class ProductoRepo(_MySQL, base.ProductoRepo):
+    sql_upsert = (
+        "INSERT INTO productos (nombre, cantidad, precio) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE cantidad = VALUES(cantidad), precio = VALUES(precio)"
+    )
+
+
+class ClienteRepo(_MySQL, base.ClienteRepo):
+    sql_upsert = (
+        "INSERT INTO clientes (nombre, apellido, telefono, email) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE nombre = VALUES(nombre), apellido = VALUES(apellido), "
+        "telefono = VALUES(telefono)"
+    )
+
+
+class VentaRepo(_MySQL, base.VentaRepo):
+    pass
+
+
+class CompraRepo(_MySQL, base.CompraRepo):
+    pass
+
+
+class UsuarioRepo(_MySQL, base.UsuarioRepo):
+    pass
+
+
+class AlertaRepo(_MySQL, base.AlertaRepo):
+    sql_upsert = (
+        "INSERT INTO categorias_stock (categoria, stock_minimo) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE stock_minimo = VALUES(stock_minimo)"
+    )
+
+
+class ReporteRepo(_MySQL, base.ReporteRepo):
+    sql_upsert_dia_producto = (
+        "INSERT INTO ventas_dia_producto (fecha, producto_id, unidades, importe) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE unidades = unidades + VALUES(unidades), importe = importe + VALUES(importe)"
+    )
+    sql_upsert_dia_usuario = (
+        "INSERT INTO ventas_dia_usuario (fecha, usuario_id, ventas, importe) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE ventas = ventas + VALUES(ventas), importe = importe + VALUES(importe)"
+    )
+    sql_upsert_mes = (
+        "INSERT INTO ventas_mes (anio_mes, ventas, unidades, importe) VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE ventas = ventas + VALUES(ventas), unidades = unidades + VALUES(unidades), "
+        "importe = importe + VALUES(importe)"
+    )
+    sql_anio_mes = "DATE_FORMAT({columna}, '%Y-%m')"
+
+
+class EstadisticasRepo(_MySQL, base.EstadisticasRepo):
+    sql_upsert = (
+        "INSERT INTO estadisticas_clientes_mes (anio_mes, total) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE total = total + VALUES(total)"
+    )
+    sql_anio_mes = "DATE_FORMAT(fecha_registro, '%Y-%m')"
+    sql_mes_actual = "DATE_FORMAT(CURRENT_TIMESTAMP, '%Y-%m')"
+
+
+class MovimientoRepo(_MySQL, base.MovimientoRepo):
+    pass
+
+
+class TrabajoRepo(_MySQL, base.TrabajoRepo):
+    pass
+
+
+class VersionRepo(_MySQL, base.VersionRepo):
+    pass
+
+
+class EsquemaRepo(_MySQL, base.EsquemaRepo):
+    pass
@@ -0,0 +1,99 @@
+# repositorios/sqlite.py
+from paginacion import CONTEO_MAX
+from repositorios import base
+
+
+class _SQLite:
+    # SQLite bloquea la base entera al escribir: no hay FOR UPDATE
+    bloqueo = ''
+
+    def contar_aproximado(self):
+        # Sin estadísticas de filas: cuenta como mucho CONTEO_MAX
+        cur = self.conn.cursor(dictionary=True)
+        cur.execute(f"SELECT COUNT(*) AS total FROM (SELECT 1 FROM {self.tabla} LIMIT %s) AS t", (CONTEO_MAX + 1,))
+        total = int(cur.fetchone()['total'])
+        if total > CONTEO_MAX:
+            return CONTEO_MAX, False
+        return total, True
+
+
+class ProductoRepo(_SQLite, base.ProductoRepo):
+    sql_upsert = (
+        "INSERT INTO productos (nombre, cantidad, precio) VALUES (%s, %s, %s) "
+        "ON CONFLICT (nombre) DO UPDATE SET cantidad = excluded.cantidad, precio = excluded.precio"
+    )
+
+
+class ClienteRepo(_SQLite, base.ClienteRepo):
+    sql_upsert = (
+        "INSERT INTO clientes (nombre, apellido, telefono, email) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (email) DO UPDATE SET nombre = excluded.nombre, apellido = excluded.apellido, "
+        "telefono = excluded.telefono"
+    )
+
+
+class VentaRepo(_SQLite, base.VentaRepo):
+    pass
+
+
+class CompraRepo(_SQLite, base.CompraRepo):
+    pass
+
+
+class UsuarioRepo(_SQLite, base.UsuarioRepo):
+    pass
+
+
+class AlertaRepo(_SQLite, base.AlertaRepo):
+    sql_upsert = (
+        "INSERT INTO categorias_stock (categoria, stock_minimo) VALUES (%s, %s) "
+        "ON CONFLICT (categoria) DO UPDATE SET stock_minimo = excluded.stock_minimo"
+    )
+
+
+class ReporteRepo(_SQLite, base.ReporteRepo):
+    sql_upsert_dia_producto = (
+        "INSERT INTO ventas_dia_producto (fecha, producto_id, unidades, importe) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (fecha, producto_id) DO UPDATE SET unidades = unidades + excluded.unidades, "
+        "importe = importe + excluded.importe"
+    )
+    sql_upsert_dia_usuario = (
+        "INSERT INTO ventas_dia_usuario (fecha, usuario_id, ventas, importe) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (fecha, usuario_id) DO UPDATE SET ventas = ventas + excluded.ventas, "
+        "importe = importe + excluded.importe"
+    )
+    sql_upsert_mes = (
+        "INSERT INTO ventas_mes (anio_mes, ventas, unidades, importe) VALUES (%s, %s, %s, %s) "
+        "ON CONFLICT (anio_mes) DO UPDATE SET ventas = ventas + excluded.ventas, "
+        "unidades = unidades + excluded.unidades, importe = importe + excluded.importe"
+    )
+    sql_anio_mes = "strftime('%Y-%m', {columna})"
+
+
+class EstadisticasRepo(_SQLite, base.EstadisticasRepo):
+    sql_upsert = (
+        "INSERT INTO estadisticas_clientes_mes (anio_mes, total) VALUES (%s, %s) "
+        "ON CONFLICT (anio_mes) DO UPDATE SET total = total + excluded.total"
+    )
+    sql_anio_mes = "strftime('%Y-%m', fecha_registro)"
+    # fecha_registro se guarda en hora local (datetime('now', 'localtime')): el mes en curso también
+    sql_mes_actual = "strftime('%Y-%m', 'now', 'localtime')"
+
+
+class MovimientoRepo(_SQLite, base.MovimientoRepo):
+    pass
+
+
+class TrabajoRepo(_SQLite, base.TrabajoRepo):
+    pass
+
+
+class VersionRepo(_SQLite, base.VersionRepo):
+    pass
+
+
+class EsquemaRepo(_SQLite, base.EsquemaRepo):
+    def tablas(self):
+        cur = self.conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [fila[0] for fila in cur.fetchall()]
@@ -0,0 +1,54 @@
+// autocompletar.js
+// Campos de búsqueda con sugerencias por prefijo (/autocompletar/<recurso>).
+// Cada <input data-autocompletar="url" list="..."> va dentro de un elemento
+// .campo-autocompletar junto al campo numérico .id-destino; al elegir una
+// sugerencia se copia su id a ese campo. Se escucha en el documento, así
+// que también funciona en las filas que se agregan después (carrito).
+document.addEventListener('DOMContentLoaded', function() {
+    const ESPERA_MS = 150;
+    const temporizadores = new WeakMap();
+    const sugerencias = new WeakMap();  // input -> {texto de la opción: id}
+
+    function destino(entrada) {
+        return entrada.closest('.campo-autocompletar').querySelector('.id-destino');
+    }
+
+    function buscar(entrada) {
+        const texto = entrada.value.trim();
+        if (!texto) {
+            return;
+        }
+        fetch(entrada.dataset.autocompletar + '?q=' + encodeURIComponent(texto), {credentials: 'same-origin'})
+            .then(function(respuesta) { return respuesta.ok ? respuesta.json() : {resultados: []}; })
+            .then(function(datos) {
+                const lista = document.getElementById(entrada.getAttribute('list'));
+                const opciones = {};
+                lista.innerHTML = '';
+                datos.resultados.forEach(function(r) {
+                    const detalle = r.email ? r.email : 'stock ' + r.cantidad + ' · $' + r.precio.toFixed(2);
+                    const valor = r.etiqueta + ' (' + detalle + ') #' + r.id;
+                    opciones[valor] = r.id;
+                    const opcion = document.createElement('option');
+                    opcion.value = valor;
+                    lista.appendChild(opcion);
+                });
+                sugerencias.set(entrada, opciones);
+            })
+            .catch(function() {});
+    }
+
+    document.addEventListener('input', function(e) {
+        const entrada = e.target;
+        if (!entrada.matches('input[data-autocompletar]')) {
+            return;
+        }
+        // Opción elegida de la lista: copiar el id al campo numérico
+        const opciones = sugerencias.get(entrada) || {};
+        if (entrada.value in opciones) {
+            destino(entrada).value = opciones[entrada.value];
+            return;
+        }
+        clearTimeout(temporizadores.get(entrada));
+        temporizadores.set(entrada, setTimeout(function() { buscar(entrada); }, ESPERA_MS));
+    });
+});
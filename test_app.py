@@ -1,4 +1,57 @@
 from conexion.conexion import conexion, cerrar_conexion
+from conexion.pool import PoolConexiones, PoolAgotado
+from cache import CacheLRU
+from paginacion import paginar_keyset, codificar_cursor, decodificar_cursor
+from busqueda import IndiceTrigramas
+import busqueda
+from exportacion import generar_json, generar_csv
+from ventas import agrupar_lineas, VentaInvalida
+from importacion import importar, leer_filas, _leer_json_arreglo
+from migraciones import dividir_sentencias, listar_migraciones, migrar, estado as estado_migraciones
+from ventas import registrar_venta
+import estadisticas
+from benchmark import datos as datos_benchmark
+from benchmark.carga import percentil, comparar
+import diagnostico
+from conexion import instrumentacion
+from conexion.sqlite import ConexionSQLite
+from repositorios import repos
+from catalogo import Catalogo, catalogo
+from datetime import datetime
+from decimal import Decimal
+import io
+import json
+import pytest
+import sqlite3
+
+@pytest.fixture(autouse=True)
+def catalogo_vacio():
+    """Cada test usa su propia base: la foto del catálogo no pasa de uno a otro"""
+    catalogo.invalidar()
+
+
+@pytest.fixture
+def conn():
+    """Base SQLite en memoria con todas las migraciones aplicadas"""
+    base = ConexionSQLite(':memory:')
+    migrar(base)
+    yield base
+    base.close()
+
+
+@pytest.fixture
+def cliente(conn, monkeypatch):
+    """Cliente de pruebas de la app con la sesión de Ana iniciada; todas las rutas usan `conn`"""
+    import app as aplicacion
+    monkeypatch.setattr(aplicacion, 'conexion', lambda: conn)
+    monkeypatch.setattr(aplicacion, 'conexion_exclusiva', lambda: conn)
+    monkeypatch.setattr(aplicacion, 'cerrar_conexion', lambda c: None)
+    monkeypatch.setattr(aplicacion.Usuario, 'get', staticmethod(lambda user_id: aplicacion.Usuario(1, 'Ana', 'ana@x.com', 'hash')))
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = '1'
+    return cliente
+
 
 def test_conexion():
     conn = conexion()
@@ -12,5 +65,658 @@ def test_conexion():
     else:
         print("✗ Error de conexión")
 
+class ConexionFalsa:
+    def __init__(self):
+        self.cerrada = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.cerrada = True
+
+def test_pool_reutiliza_conexiones():
+    pool = PoolConexiones(ConexionFalsa, tamano=1, espera_max=0.05)
+    c1 = pool.obtener()
+    pool.devolver(c1)
+    c2 = pool.obtener()
+    assert c1 is c2
+    assert c1.rollbacks == 1
+
+    try:
+        pool.obtener()
+        assert False, "El pool debería estar agotado"
+    except PoolAgotado:
+        pass
+
+    pool.devolver(c2)
+    metricas = pool.metricas()
+    assert metricas['checkouts'] == 2
+    assert metricas['creadas'] == 1
+    assert metricas['en_uso'] == 0
+    assert metricas['inactivas'] == 1
+    assert metricas['agotado'] == 1
+
+def test_cache_lru_expulsa_y_cuenta():
+    cache = CacheLRU(max_entradas=2)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    assert cache.obtener('a') == 1
+    cache.guardar('c', 3)  # expulsa 'b', el menos usado
+    assert cache.obtener('b') is None
+    cache.invalidar('a')
+    assert cache.obtener('a') is None
+    stats = cache.estadisticas()
+    assert stats['aciertos'] == 1
+    assert stats['fallos'] == 2
+    assert stats['expulsiones'] == 1
+
+def test_cursor_conserva_tipos():
+    valores = ['Lápiz', 7, datetime(2025, 1, 2, 3, 4, 5)]
+    assert decodificar_cursor(codificar_cursor(valores), 3) == valores
+    assert decodificar_cursor('basura', 3) is None
+
+def test_paginacion_keyset_avanza_y_retrocede():
+    conn = ConexionSQLite(':memory:')
+    conn.cursor().execute("CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT)")
+    conn.cursor().executemany("INSERT INTO productos (id, nombre) VALUES (%s, %s)",
+                              [(i, f"p{i % 3}") for i in range(1, 8)])
+    cur = conn.cursor(dictionary=True)
+    select = "SELECT id, nombre FROM productos"
+
+    p1 = paginar_keyset(cur, select, ('nombre', 'id'), por_pagina=3)
+    assert [f['id'] for f in p1.filas] == [3, 6, 1]
+    assert p1.anterior is None and p1.siguiente
+
+    p2 = paginar_keyset(cur, select, ('nombre', 'id'), despues=p1.siguiente, por_pagina=3)
+    assert [f['id'] for f in p2.filas] == [4, 7, 2]
+
+    p1b = paginar_keyset(cur, select, ('nombre', 'id'), antes=p2.anterior, por_pagina=3)
+    assert [f['id'] for f in p1b.filas] == [3, 6, 1]
+    assert p1b.anterior is None
+
+def test_busqueda_sin_tildes_ni_mayusculas():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT, apellido TEXT)")
+    conn.executemany("INSERT INTO clientes VALUES (?, ?, ?)",
+                     [(1, 'Juan', 'Pérez'), (2, 'Pedro', 'Perezoso'), (3, 'María', 'Gómez')])
+    indice = IndiceTrigramas("SELECT id, nombre, apellido FROM clientes")
+
+    assert indice.buscar(conn, 'perez') == [1, 2]
+    assert indice.buscar(conn, 'MARIA gom') == [3]
+    assert indice.buscar(conn, 'ez') == []  # términos cortos: solo inicio de palabra
+
+    indice.agregar(4, 'Lápiz', 'HB')
+    indice.eliminar(1)
+    assert indice.buscar(conn, 'lapiz') == [4]
+    assert indice.buscar(conn, 'pérez') == [2]
+
+def test_exportacion_json_incremental_es_valida():
+    lotes = [[{'id': 1, 'nombre': 'Lápiz', 'cantidad': 3, 'precio': Decimal('1.50')}],
+             [{'id': 2, 'nombre': 'Borrador', 'cantidad': 0, 'precio': 0.5}]]
+    datos = json.loads(''.join(generar_json(iter(lotes))))
+    assert datos['total_productos'] == 2
+    assert [p['nombre'] for p in datos['productos']] == ['Lápiz', 'Borrador']
+
+    vacio = json.loads(''.join(generar_json(iter([]))))
+    assert vacio['productos'] == [] and vacio['total_productos'] == 0
+
+    csv_texto = ''.join(generar_csv(iter(lotes)))
+    assert csv_texto.splitlines()[1] == '1,Lápiz,3,1.50'
+
+def test_venta_agrupa_lineas_del_mismo_producto():
+    assert list(agrupar_lineas([(2, 1), ('5', '3'), (2, 4)]).items()) == [(2, 5), (5, 3)]
+    for lineas in ([], [(1, 0)], [('x', 1)]):
+        try:
+            agrupar_lineas(lineas)
+            assert False, f"Debería rechazar {lineas}"
+        except VentaInvalida:
+            pass
+
+def test_leer_json_por_bloques():
+    texto = io.StringIO('[{"nombre": "Lápiz", "precio": 1.5}, {"nombre": "Regla, 30cm"}]')
+    filas = list(_leer_json_arreglo(texto, tamano_bloque=7))
+    assert filas == [{'nombre': 'Lápiz', 'precio': 1.5}, {'nombre': 'Regla, 30cm'}]
+
+class ConexionGrabadora:
+    def __init__(self):
+        self.lotes = []
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, valores):
+        self.lotes.append(valores)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def test_importacion_valida_y_agrupa_en_lotes():
+    from app import app
+    ndjson = b'{"nombre": "Lapiz", "cantidad": 5, "precio": "1.25", "categoria": "Escritura", "stock_minimo": 4}\n' \
+             b'{"nombre": "X", "cantidad": -1, "precio": 1}\n' \
+             b'{"nombre": "Regla", "cantidad": "3", "precio": 0.8}\n'
+    conn = ConexionGrabadora()
+    with app.app_context():
+        informe = importar(conn, 'productos', leer_filas(io.BytesIO(ndjson), 'ndjson'), tamano_lote=10)
+    assert informe.procesadas == 3 and informe.guardadas == 2 and informe.con_error == 1
+    assert informe.errores[0]['fila'] == 2
+    # Upsert por nombre y, aparte, categoría y umbral solo de las filas que los traen
+    assert conn.lotes == [[('Lapiz', 5, 1.25), ('Regla', 3, 0.8)], [('Escritura', 4, 'Lapiz')]]
+
+    # Una línea NDJSON mal formada es un error de esa fila; las siguientes se importan
+    ndjson = b'{"nombre": "Goma", "cantidad": 1, "precio": 0.3}\n\n{"nombre": "Borrador", \n' \
+             b'{"nombre": "Tijera", "cantidad": 2, "precio": 2.5}\n'
+    conn = ConexionGrabadora()
+    with app.app_context():
+        informe = importar(conn, 'productos', leer_filas(io.BytesIO(ndjson), 'ndjson'), tamano_lote=10)
+    assert informe.procesadas == 3 and informe.guardadas == 2 and informe.con_error == 1
+    assert informe.errores[0]['fila'] == 2 and 'línea 3' in informe.errores[0]['errores']['fila'][0]
+    assert conn.lotes == [[('Goma', 1, 0.3), ('Tijera', 2, 2.5)]]
+
+def test_migraciones_ordenadas_y_divididas():
+    versiones = [v for v, _, _ in listar_migraciones()]
+    assert versiones == sorted(versiones) and versiones[0] == 1
+    sql = "-- comentario\nCREATE TABLE a (\n  x INT\n);\n\nINSERT INTO a VALUES (1);\n"
+    assert dividir_sentencias(sql) == ["CREATE TABLE a (\n  x INT\n)", "INSERT INTO a VALUES (1)"]
+
+def test_instrumentacion_cuenta_consultas_y_filas():
+    conn = instrumentacion.ConexionInstrumentada(sqlite3.connect(':memory:'))
+    eventos = []
+    instrumentacion.observadores.append(lambda d, filas, es_consulta: eventos.append((filas, es_consulta)))
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 UNION ALL SELECT 2")
+        assert cur.fetchall() == [(1,), (2,)]
+    finally:
+        instrumentacion.observadores.pop()
+    assert eventos == [(0, True), (2, False)]
+
+def test_endpoint_metrics_en_formato_prometheus():
+    from app import app
+    cliente = app.test_client()
+    cliente.get('/login')
+    texto = cliente.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="login"}' in texto
+    assert 'db_pool_checkouts' in texto
+
+def test_repositorios_sqlite_sin_servidor(conn):
+    # El fixture aplicó todas las migraciones; volver a migrar no hace nada
+    assert estado_migraciones(conn) == (listar_migraciones('sqlite')[-1][0],) * 2 and migrar(conn) == []
+    r = repos(conn)
+    usuario_id = r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    cliente_id = r.clientes.crear('Juan', 'Pérez', '0999123456', 'juan@x.com')
+    lapiz = r.productos.crear('Lápiz', 5, Decimal('1.50'))
+    r.productos.guardar_lote([('Regla', 2, 0.8), ('Lápiz', 9, 1.25)])
+    conn.commit()
+
+    producto = r.productos.por_id(lapiz)
+    assert producto['cantidad'] == 9 and producto['precio'] == Decimal('1.25')
+    assert isinstance(r.clientes.por_id(cliente_id)['fecha_registro'], datetime)
+    assert [p['nombre'] for p in r.productos.pagina(por_pagina=5).filas] == ['Lápiz', 'Regla']
+    # Conteo por defecto de la clase base (exacto) y el acotado de SQLite
+    from repositorios import base as repos_base
+    assert repos_base.Repo.contar_aproximado(r.productos) == (2, True) == r.productos.contar_aproximado()
+    assert {'productos', 'versiones_tabla'} <= set(r.esquema.tablas())
+
+    venta_id, total = registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 2)])
+    assert total == Decimal('2.50')
+    assert r.ventas.listar()[0]['id'] == venta_id
+    stats = estadisticas.leer(conn)
+    assert stats['ventas']['total'] == 1 and stats['productos']['total'] == 2
+    assert stats['clientes_este_mes'] == 1
+    # El alta incremental cuenta en el mes de fecha_registro, que es el que lee el dashboard
+    otro = r.clientes.crear('Eva', 'Ríos', '', 'eva@x.com')
+    estadisticas.cliente_creado(conn, otro)
+    conn.commit()
+    assert estadisticas.leer(conn)['clientes_este_mes'] == 2
+
+def test_benchmark_siembra_y_compara(conn):
+    datos_benchmark.sembrar(conn, escala=0.001, informar=lambda *a: None)
+    r = repos(conn)
+    assert (r.productos.contar(), r.clientes.contar(), r.ventas.contar(), r.compras.contar()) == (100, 50, 1000, 200)
+    assert estadisticas.leer(conn)['ventas']['total'] == 1000
+
+    assert percentil(list(range(1, 101)), 95) == 95 and percentil([], 50) is None
+    base = {'escenarios': {'a': {'p95_ms': 10.0, 'rps': 100.0}, 'b': {'p95_ms': 10.0, 'rps': 100.0}}}
+    nuevo = {'escenarios': {'a': {'p95_ms': 10.5, 'rps': 98.0}, 'b': {'p95_ms': 15.0, 'rps': 70.0}}}
+    assert [x['escenario'] for x in comparar(base, nuevo, 0.10)] == ['b']
+
+def test_sondas_cachean_salud_y_foto(conn, monkeypatch):
+    pedidas = []
+    monkeypatch.setattr(diagnostico, 'conexion', lambda: pedidas.append(1) or conn)
+    monkeypatch.setattr(diagnostico, 'conexion_exclusiva', lambda: conn)
+    monkeypatch.setattr(diagnostico, 'cerrar_conexion', lambda c: None)
+
+    sondas = diagnostico.Sondas(ttl_salud=60, intervalo=60)
+    assert sondas.salud()[:2] == (True, None)
+    assert sondas.salud()[:2] == (True, None)
+    assert len(pedidas) == 1
+
+    foto = sondas.foto()
+    sondas.detener()
+    assert foto['tabla_usuarios_existe'] and foto['total_productos'] == 0
+
+def test_bitacora_json_con_id_de_peticion_y_muestreo():
+    import logging
+    import bitacora
+    from app import app
+
+    registro = logging.LogRecord('papeleria.app', logging.ERROR, __file__, 1, 'fallo %s', ('x',), None)
+    registro.peticion_id = 'abc'
+    registro.tabla = 'ventas'
+    linea = json.loads(bitacora.FormateadorJSON().format(registro))
+    assert linea['msg'] == 'fallo x' and linea['nivel'] == 'ERROR'
+    assert linea['peticion_id'] == 'abc' and linea['tabla'] == 'ventas'
+
+    filtro = bitacora.FiltroMuestreo(0.25)
+    debug = logging.LogRecord('papeleria.conexion.pool', logging.DEBUG, __file__, 1, 'abierta', (), None)
+    aviso = logging.LogRecord('papeleria.conexion.pool', logging.WARNING, __file__, 1, 'lenta', (), None)
+    assert sum(filtro.filter(debug) for _ in range(100)) == 25
+    assert all(filtro.filter(aviso) for _ in range(10))
+
+    cliente = app.test_client()
+    assert cliente.get('/login', headers={'X-Request-ID': 'req-42'}).headers['X-Request-ID'] == 'req-42'
+    generado = cliente.get('/login', headers={'X-Request-ID': 'no válido; <script>'}).headers['X-Request-ID']
+    assert len(generado) == 32
+
+def test_alertas_de_stock_por_producto_y_categoria(conn):
+    import alertas
+    r = repos(conn)
+    estadisticas.recalcular(conn)
+    lapiz = r.productos.crear('Lápiz', 8, Decimal('1.00'))
+    regla = r.productos.crear('Regla', 30, Decimal('2.00'), categoria='geometria')
+    papel = r.productos.crear('Papel', 3, Decimal('5.00'), stock_minimo=2)
+    alertas.evaluar(conn, [lapiz, regla, papel])
+    assert [p['nombre'] for p in alertas.listar(conn)] == ['Lápiz']
+
+    alertas.fijar_umbral_categoria(conn, 'geometria', 50)
+    assert [(p['nombre'], p['umbral']) for p in alertas.listar(conn)] == [('Lápiz', 10), ('Regla', 50)]
+    r.productos.sumar_stock(lapiz, 5)
+    alertas.evaluar(conn, [lapiz])
+    alertas.producto_eliminado(conn, regla)
+    r.productos.eliminar(regla)
+    conn.commit()
+    assert alertas.listar(conn) == [] and estadisticas.leer(conn)['bajo_stock'] == 0
+
+    # El resumen se ajusta al confirmar, con un único UPDATE por transacción
+    version = estadisticas.leer(conn)['version']
+    alertas.fijar_umbral_categoria(conn, 'general', 20)
+    assert estadisticas.leer(conn)['bajo_stock'] == 0
+    conn.commit()
+    assert estadisticas.leer(conn)['bajo_stock'] == 1 and estadisticas.leer(conn)['version'] == version + 1
+    # recalcular() descarta los deltas pendientes: ya los cuenta al reconstruir
+    r.productos.sumar_stock(papel, -2)
+    alertas.evaluar(conn, [papel])
+    estadisticas.recalcular(conn)
+    assert estadisticas.leer(conn)['bajo_stock'] == 2
+
+def test_reportes_incrementales_coinciden_con_la_reconstruccion(conn):
+    import reportes
+    from datetime import date
+    r = repos(conn)
+    usuario_id = r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    cliente_id = r.clientes.crear('Juan', 'Pérez', '0999123456', 'juan@x.com')
+    lapiz = r.productos.crear('Lápiz', 50, Decimal('1.50'))
+    regla = r.productos.crear('Regla', 50, Decimal('2.00'))
+    conn.commit()
+    registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 2), (regla, 1)])
+    registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 4)])
+
+    # El día de los agregados es el de fecha_venta según la base, no el de la aplicación
+    cur = conn.cursor(dictionary=True)
+    cur.execute("SELECT DISTINCT DATE(fecha_venta) AS dia FROM ventas")
+    hoy = date.fromisoformat(str(cur.fetchone()['dia']))
+    incremental = (reportes.ventas_por_dia(conn, hoy, hoy), reportes.ventas_por_producto(conn, hoy, hoy),
+                   reportes.ventas_por_usuario(conn, hoy, hoy), reportes.ventas_por_mes(conn, *reportes.rango_meses()))
+    assert incremental[0] == [{'fecha': hoy.isoformat(), 'ventas': 2, 'importe': 11.0}]
+    assert [(p['nombre'], p['unidades'], p['importe']) for p in incremental[1]] == [('Lápiz', 6, 9.0), ('Regla', 1, 2.0)]
+    assert incremental[3][-1]['unidades'] == 7
+
+    reportes.recalcular(conn)
+    assert incremental == (reportes.ventas_por_dia(conn, hoy, hoy), reportes.ventas_por_producto(conn, hoy, hoy),
+                           reportes.ventas_por_usuario(conn, hoy, hoy), reportes.ventas_por_mes(conn, *reportes.rango_meses()))
+    with pytest.raises(reportes.ReporteInvalido):
+        reportes.rango_fechas('2024-02-30')
+
+def test_api_etag_y_304_con_contador_de_cambios(conn, cliente):
+    r = repos(conn)
+    r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    lapiz = r.productos.crear('Lápiz', 5, Decimal('1.50'))
+    r.productos.crear('Regla', 2, Decimal('0.80'))
+    conn.commit()
+    respuesta = cliente.get('/api/v1/productos?campos=nombre,precio&por_pagina=1')
+    assert respuesta.status_code == 200
+    assert respuesta.json['datos'] == [{'nombre': 'Lápiz', 'precio': 1.5}] and respuesta.json['siguiente']
+    etag = respuesta.headers['ETag']
+    assert cliente.get('/api/v1/productos?campos=nombre,precio&por_pagina=1',
+                       headers={'If-None-Match': etag}).status_code == 304
+    assert cliente.get('/api/v1/productos?campos=clave').status_code == 400
+
+    r.productos.sumar_stock(lapiz, 1)
+    conn.commit()
+    cambiada = cliente.get('/api/v1/productos?campos=nombre,precio&por_pagina=1', headers={'If-None-Match': etag})
+    assert cambiada.status_code == 200 and cambiada.headers['ETag'] != etag
+
+
+def test_listados_cachean_la_tabla_por_version(conn, cliente, monkeypatch):
+    import app as aplicacion
+    r = repos(conn)
+    lapiz = r.productos.crear('Lápiz', 5, Decimal('1.50'))
+    conn.commit()
+    monkeypatch.setattr(aplicacion, 'cache_listados', CacheLRU(max_entradas=8))
+
+    primera = cliente.get('/productos/lista')
+    assert primera.status_code == 200 and 'Lápiz' in primera.get_data(as_text=True)
+    assert cliente.get('/productos/lista').get_data() == primera.get_data()
+    assert aplicacion.cache_listados.estadisticas()['aciertos'] == 1
+
+    # Una escritura avanza la versión de productos: la siguiente petición vuelve a consultar
+    r.productos.sumar_stock(lapiz, 4)
+    conn.commit()
+    assert '<td>9</td>' in cliente.get('/productos/lista').get_data(as_text=True)
+    assert aplicacion.cache_listados.estadisticas()['fallos'] == 2
+
+
+def test_contrasenas_en_pool_con_rechazo_y_rehash(conn, monkeypatch):
+    import app as aplicacion
+    import models_user
+    import contrasenas
+    from werkzeug.security import generate_password_hash, check_password_hash
+
+    # Pool real de un proceso sin cola: una segunda tarea simultánea se rechaza
+    pool = contrasenas.PoolContrasenas(procesos=1, cola=0, metodo='pbkdf2:sha256:1000')
+    try:
+        assert check_password_hash(pool.cifrar('secreto'), 'secreto')
+        assert pool._huecos.acquire(blocking=False)
+        with pytest.raises(contrasenas.PoolSaturado):
+            pool.verificar(generate_password_hash('x'), 'x')
+        pool._huecos.release()
+        assert pool.estadisticas()['rechazadas'] == 1
+    finally:
+        pool.cerrar()
+
+    antiguo = generate_password_hash('secreto', method='pbkdf2:sha256:500')
+    repos(conn).usuarios.crear('Ana', 'ana@x.com', antiguo)
+    conn.commit()
+    for modulo in (aplicacion, models_user):
+        monkeypatch.setattr(modulo, 'conexion', lambda: conn)
+        monkeypatch.setattr(modulo, 'cerrar_conexion', lambda c: None)
+    monkeypatch.setitem(aplicacion.app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(contrasenas, 'pool', contrasenas.PoolContrasenas(procesos=0, metodo='pbkdf2:sha256:1000'))
+    models_user.Usuario.invalidar_cache()
+
+    cliente = aplicacion.app.test_client()
+    assert cliente.post('/login', data={'email': 'ana@x.com', 'password': 'mala'}).status_code == 200
+    assert repos(conn).usuarios.por_email('ana@x.com')['password'] == antiguo
+    assert cliente.post('/login', data={'email': 'ana@x.com', 'password': 'secreto'}).status_code == 302
+    nuevo = repos(conn).usuarios.por_email('ana@x.com')['password']
+    assert nuevo.startswith('pbkdf2:sha256:1000$') and check_password_hash(nuevo, 'secreto')
+
+    monkeypatch.setattr(contrasenas, 'pool', contrasenas.PoolContrasenas(procesos=1, cola=0))
+    contrasenas.pool._huecos.acquire()
+    assert aplicacion.app.test_client().post('/login', data={'email': 'ana@x.com', 'password': 'secreto'}).status_code == 503
+
+
+def test_catalogo_en_memoria_se_actualiza_por_version(conn, monkeypatch):
+    r = repos(conn)
+    lapiz = r.productos.crear('lápiz', 5, Decimal('1.50'))
+    regla = r.productos.crear('Regla', 2, Decimal('0.80'))
+    conn.commit()
+    foto = Catalogo().sincronizar(conn)
+    assert foto.ids_ordenados() == [lapiz, regla]
+    assert foto.producto(lapiz) == {'id': lapiz, 'nombre': 'lápiz', 'cantidad': 5, 'precio': Decimal('1.50')}
+
+    # Escrituras sueltas: solo se releen las filas selladas con una versión nueva,
+    # una por transacción; el contador la alcanza después del commit (hasta
+    # entonces solo esta conexión ve el sello provisional)
+    r.productos.sumar_stock(lapiz, 3)
+    r.productos.actualizar(regla, 'Agenda', 2, Decimal('4.25'))
+    goma = r.productos.crear('Goma', 9, Decimal('0.30'))
+    assert r.versiones.leer(['productos']) == {'productos': 3}
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM versiones_tabla WHERE tabla = 'productos'")
+    assert cur.fetchone()[0] == 2
+    conn.commit()
+    assert r.versiones.leer(['productos']) == {'productos': 3}
+    r.productos.sumar_stock(lapiz, 100)
+    conn.rollback()
+    conn.commit()
+    assert r.versiones.leer(['productos']) == {'productos': 3}
+    foto.sincronizar(conn)
+    assert foto.estadisticas()['recargas'] == 1 and foto.estadisticas()['parciales'] == 1
+    assert [p['cantidad'] for p in foto.filas([lapiz])] == [8]
+    assert foto.ids_ordenados() == [regla, goma, lapiz] and foto.id_por_nombre('Agenda') == regla
+    assert foto.id_por_nombre('Regla') is None
+
+    # Si el avance posterior al commit falla, el sello puesto en la transacción
+    # basta: la versión efectiva cambia igual y la foto relee la fila
+    import repositorios.base as repos_base
+    with monkeypatch.context() as m:
+        m.setattr(repos_base, '_avanzar_versiones', lambda conn, cambios: 1 / 0)
+        r.productos.actualizar(lapiz, 'lápiz', 8, Decimal('1.75'))
+        conn.commit()
+    assert r.versiones.leer(['productos']) == {'productos': 4}
+    assert foto.sincronizar(conn).producto(lapiz)['precio'] == Decimal('1.75')
+    r.productos.sumar_stock(regla, 1)
+    conn.commit()
+    assert r.versiones.leer(['productos']) == {'productos': 5}
+    assert foto.sincronizar(conn).producto(regla)['cantidad'] == 3
+    vencida = Catalogo(edad_max=0).sincronizar(conn)
+    assert vencida.sincronizar(conn).estadisticas()['recargas'] == 2
+
+    # Una baja fuerza la recarga completa
+    r.productos.eliminar(goma)
+    conn.commit()
+    assert foto.sincronizar(conn).producto(goma) is None
+    assert foto.estadisticas() == {'productos': 2, 'version': 6, 'recargas': 2, 'parciales': 3}
+    lotes = list(foto.lotes(1))
+    assert [[p['nombre'] for p in lote] for lote in lotes] == [['Agenda'], ['lápiz']]
+
+    # Cursor (nombre, id): sigue apuntando al mismo sitio aunque entre un producto antes
+    primera = foto.pagina(por_pagina=1)
+    assert primera.filas == [regla] and primera.anterior is None
+    r.productos.crear('Borrador', 1, Decimal('0.50'))
+    conn.commit()
+    segunda = foto.sincronizar(conn).pagina(despues=primera.siguiente, por_pagina=1)
+    assert segunda.filas == [foto.id_por_nombre('Borrador')] and segunda.total == 3
+    assert foto.pagina(antes=segunda.anterior, por_pagina=5).filas == [regla]
+
+
+def test_autocompletar_por_prefijo(conn, cliente, monkeypatch):
+    import app as aplicacion
+    r = repos(conn)
+    cuaderno = r.productos.crear('Cuaderno Rayado', 4, Decimal('2.10'))
+    cuadro = r.productos.crear('Cuadro de corcho', 1, Decimal('9.00'))
+    lapiz = r.productos.crear('Lápiz HB', 5, Decimal('0.50'))
+    juan = r.clientes.crear('Juan', 'Pérez', '', 'juan@x.com')
+    conn.commit()
+    indice = IndiceTrigramas("SELECT id, nombre FROM productos")
+
+    assert indice.autocompletar(conn, 'cuad') == [cuaderno, cuadro]  # más cortos primero
+    assert indice.autocompletar(conn, 'CUADERNO') == [cuaderno]
+    assert indice.autocompletar(conn, 'ray cua') == [cuaderno]
+    assert indice.autocompletar(conn, 'hb') == [lapiz] and indice.autocompletar(conn, 'aderno') == []
+    indice.agregar(lapiz, 'Cuadrícula')
+    assert indice.autocompletar(conn, 'cuadr') == [lapiz, cuadro]
+    assert lapiz not in indice.autocompletar(conn, 'lap')
+
+    # Con la clave indicada, un cambio de nombres (p. ej. de otro proceso) recarga
+    # el índice; los de stock de ventas y compras no
+    por_version = IndiceTrigramas("SELECT id, nombre FROM productos", tabla='productos_nombres', recarga_min=0)
+    assert por_version.buscar(conn, 'corcho') == [cuadro]
+    r.productos.restar_stock_lote({cuadro: 1})
+    r.productos.sumar_stock_lote({cuaderno: 2})
+    conn.commit()
+    assert por_version.buscar(conn, 'corcho') == [cuadro] and por_version.recargas == 1
+    tablero = r.productos.crear('Tablero de corcho', 1, Decimal('12.00'))
+    conn.commit()
+    assert por_version.buscar(conn, 'corcho') == [cuadro, tablero] and por_version.recargas == 2
+    # Se revisan como mucho BUSQUEDA_REVISION entradas, coincidan o no
+    monkeypatch.setattr(busqueda, 'BUSQUEDA_REVISION', 1)
+    assert len(por_version.buscar(conn, 'corcho')) == 1
+
+    monkeypatch.setattr(aplicacion, 'indice_productos', IndiceTrigramas("SELECT id, nombre FROM productos"))
+    monkeypatch.setattr(aplicacion, 'indice_clientes', IndiceTrigramas("SELECT id, nombre, apellido, email FROM clientes"))
+    productos = cliente.get('/autocompletar/productos?q=lá&limite=3').json['resultados']
+    assert productos == [{'id': lapiz, 'etiqueta': 'Lápiz HB', 'cantidad': 5, 'precio': 0.5}]
+    assert cliente.get('/autocompletar/clientes?q=pere').json['resultados'] == [
+        {'id': juan, 'etiqueta': 'Juan Pérez', 'email': 'juan@x.com'}]
+    assert cliente.get('/autocompletar/ventas?q=x').status_code == 404
+
+
+def test_compra_de_varias_lineas_en_una_transaccion(conn):
+    from compras import registrar_compra, CompraInvalida
+    r = repos(conn)
+    usuario_id = r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    lapiz = r.productos.crear('Lápiz', 5, Decimal('1.50'))
+    regla = r.productos.crear('Regla', 2, Decimal('0.80'))
+    conn.commit()
+    estadisticas.recalcular(conn)
+
+    with pytest.raises(CompraInvalida, match='no encontrado: 999'):
+        registrar_compra(conn, 'Proveedor SA', usuario_id, [(lapiz, 1, '1.00'), (999, 1, '1.00')])
+    assert r.compras.contar() == 0
+
+    lineas = [(lapiz, 10, '0.90'), (regla, 3, Decimal('0.40')), (lapiz, 2, 1)]
+    assert registrar_compra(conn, 'Proveedor SA', usuario_id, lineas) == 3
+    assert [p['cantidad'] for p in r.productos.por_ids([lapiz, regla])] == [17, 5]
+    assert sorted(float(c['precio_compra']) for c in r.compras.listar()) == [0.4, 0.9, 1.0]
+    resumen = estadisticas.leer(conn)
+    assert resumen['compras'] == 3 and resumen['productos']['stock_total'] == 22 and resumen['bajo_stock'] == 1
+
+
+def test_libro_de_movimientos_y_stock_por_fecha(conn, monkeypatch):
+    import movimientos
+    from compras import registrar_compra
+    r = repos(conn)
+    usuario_id = r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    cliente_id = r.clientes.crear('Juan', 'Pérez', '', 'juan@x.com')
+    lapiz = r.productos.crear('Lápiz', 10, Decimal('1.50'))
+    regla = r.productos.crear('Regla', 4, Decimal('0.80'))
+    hora = iter(datetime(2026, 1, 1, h) for h in range(8, 20))
+    monkeypatch.setattr(movimientos, '_ahora', lambda: next(hora))
+    assert movimientos.conciliar(conn, 'inicial') == 2  # 08:00
+    conn.commit()
+    estadisticas.recalcular(conn)
+
+    # La venta descuenta el stock y lo anota; sin stock suficiente no deja rastro
+    registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 3), (regla, 1)])  # 09:00
+    with pytest.raises(VentaInvalida, match='Stock insuficiente'):
+        registrar_venta(conn, cliente_id, usuario_id, [(regla, 5)])
+    assert [p['cantidad'] for p in r.productos.por_ids([lapiz, regla])] == [7, 3]
+    assert estadisticas.leer(conn)['productos']['stock_total'] == 10
+
+    # Otra venta se llevó las unidades después de leer la foto del catálogo
+    catalogo.sincronizar(conn)
+    conn.cursor().execute("UPDATE productos SET cantidad = 1 WHERE id = %s", (regla,))
+    with pytest.raises(VentaInvalida, match='Stock insuficiente'):
+        registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 1), (regla, 2)])
+    assert r.productos.por_id(lapiz)['cantidad'] == 7
+    conn.cursor().execute("UPDATE productos SET cantidad = 3 WHERE id = %s", (regla,))
+
+    assert movimientos.tomar_cortes(conn) == 2  # 10:00
+    registrar_compra(conn, 'Proveedor SA', usuario_id, [(lapiz, 5, '1.00')])  # 11:00
+    conn.cursor().execute("UPDATE productos SET cantidad = 10 WHERE id = %s", (lapiz,))
+    movimientos.registrar(conn, 'ajuste', {lapiz: -2})  # 12:00
+    conn.commit()
+
+    en = lambda h: movimientos.stock_en(conn, lapiz, datetime(2026, 1, 1, h, 30))
+    assert en(8) == (10, 1) and en(9) == (7, 2)
+    assert en(10) == (7, 0) and en(11) == (12, 1) and en(12) == (10, 2)
+    assert en(7) == (0, 0)
+    # El siguiente corte parte del último movimiento ya cortado: solo el lápiz tiene nuevos
+    assert movimientos.tomar_cortes(conn) == 1  # 13:00
+    assert en(12) == (10, 2) and movimientos.stock_en(conn, lapiz, datetime(2026, 1, 1, 13, 30)) == (10, 0)
+    # Una carga por fuera del libro se anota al conciliar
+    assert movimientos.conciliar(conn) == 0  # 14:00
+    conn.cursor().execute("UPDATE productos SET cantidad = 4 WHERE id = %s", (regla,))
+    assert movimientos.conciliar(conn) == 1  # 15:00
+    assert movimientos.stock_en(conn, regla) == (4, 1)  # corte de las 10:00 y la conciliación
+
+
+def test_trabajos_en_segundo_plano_reutilizan_y_limpian(conn, tmp_path):
+    from trabajos import Trabajos, TrabajoInvalido
+    r = repos(conn)
+    r.productos.crear('Lápiz', 5, Decimal('1.50'))
+    conn.commit()
+    opciones = dict(directorio=str(tmp_path), hilos=0, conectar=lambda: conn, cerrar=lambda c: None)
+    t = Trabajos(**opciones)
+
+    fila, nuevo = t.encolar(conn, 'productos', 'csv', {})
+    assert nuevo and fila['estado'] == 'terminado' and fila['progreso'] == 1
+    with open(t.ruta(fila), encoding='utf-8') as f:
+        assert f.read().splitlines()[1] == '1,Lápiz,5,1.50'
+    # Mismo pedido con los mismos datos: se reutiliza el trabajo
+    assert t.encolar(conn, 'productos', 'csv', {})[0]['id'] == fila['id']
+    r.productos.crear('Regla', 2, Decimal('0.80'))
+    conn.commit()
+    assert t.encolar(conn, 'productos', 'csv', {})[1]
+
+    # Otra versión de las ventas con el mismo resultado: trabajo nuevo, archivo compartido
+    rango = {'desde': '2026-01-01', 'hasta': '2026-01-31'}
+    primero, _ = t.encolar(conn, 'reporte_dia', 'json', rango)
+    r.versiones.incrementar(('ventas',))
+    conn.commit()
+    segundo, nuevo = t.encolar(conn, 'reporte_dia', 'json', rango)
+    assert nuevo and segundo['archivo'] == primero['archivo'] and t.compartidos == 1
+    compras, _ = t.encolar(conn, 'compras', 'ndjson', {})
+    assert compras['estado'] == 'terminado' and compras['total'] == 0 and compras['tamano'] == 0
+    assert json.loads(open(t.ruta(segundo), encoding='utf-8').read())['filas'] == []
+
+    for tipo, formato, args in (('productos', 'xml', {}), ('usuarios', 'csv', {}), ('ventas', 'txt', {}),
+                                ('reporte_dia', 'json', {'desde': 'ayer'})):
+        with pytest.raises(TrabajoInvalido):
+            t.encolar(conn, tipo, formato, args)
+
+    # Sin espacio disponible la retención borra los trabajos terminados y sus archivos
+    resultado = Trabajos(retencion_mb=0, abandono=0, **opciones).limpiar(conn)
+    assert resultado['por_espacio'] == 4 and resultado['archivos'] == 3
+    assert [f['id'] for f in r.trabajos.recientes(10)] == [compras['id']]  # el archivo vacío no ocupa espacio
+    assert [p.name for p in tmp_path.iterdir()] == [compras['archivo']]
+
+    # Si el hilo no consigue conexión el trabajo no queda pendiente: se marca con error
+    sin_base = Trabajos(**dict(opciones, conectar=lambda: None, reintentos=()))
+    fallido, _ = sin_base.encolar(conn, 'ventas', 'csv', {})
+    assert fallido['estado'] == 'error' and fallido['error'] == 'Sin conexión a la base de datos'
+
+
+def test_exportaciones_ndjson_comprimidas(conn, cliente):
+    import gzip
+    import lzma
+    r = repos(conn)
+    usuario_id = r.usuarios.crear('Ana', 'ana@x.com', 'hash')
+    cliente_id = r.clientes.crear('Juan', 'Pérez', '', 'juan@x.com')
+    lapiz = r.productos.crear('Lápiz', 10, Decimal('1.50'))
+    conn.commit()
+    registrar_venta(conn, cliente_id, usuario_id, [(lapiz, 2)])
+
+    # Sin Accept-Encoding: NDJSON plano, una fila por línea
+    respuesta = cliente.get('/exportar/detalle_ventas/ndjson')
+    assert 'Content-Encoding' not in respuesta.headers
+    assert [json.loads(l) for l in respuesta.data.decode().splitlines()] == [
+        {'id': 1, 'venta_id': 1, 'producto_id': lapiz, 'cantidad': 2, 'precio_unitario': 1.5, 'subtotal': 3.0}]
+
+    respuesta = cliente.get('/exportar/productos/csv', headers={'Accept-Encoding': 'br, gzip'})
+    assert respuesta.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in respuesta.headers['Vary']
+    assert gzip.decompress(respuesta.data).decode().splitlines() == ['ID,Nombre,Cantidad,Precio', f'{lapiz},Lápiz,8,1.50']
+
+    respuesta = cliente.get('/exportar/ventas/ndjson?comprimir=xz', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in respuesta.headers and respuesta.mimetype == 'application/x-xz'
+    assert '.ndjson.xz"' in respuesta.headers['Content-Disposition']
+    assert json.loads(lzma.decompress(respuesta.data))['total'] == 3.0
+
+    assert cliente.get('/exportar/compras/csv').data.decode().startswith('ID,Fecha,Proveedor')
+    assert cliente.get('/exportar/ventas/txt').status_code == 404
+    assert cliente.get('/exportar/usuarios/csv').status_code == 404
+
+
 if __name__ == '__main__':
-    test_conexion()
\ No newline at end of file
+    test_conexion()
@@ -0,0 +1,348 @@
+# trabajos.py
+# Exportaciones y reportes fuera del hilo de la petición. Cada pedido queda en
+# la tabla `trabajos` y lo ejecuta un pool de hilos acotado (EXPORT_WORKERS en
+# paralelo, EXPORT_QUEUE esperando; si está lleno se rechaza al momento). El
+# resultado se escribe en EXPORT_DIR con el SHA-256 de su contenido como
+# nombre, así dos trabajos con el mismo resultado comparten archivo, y un
+# pedido igual a otro vigente (mismos parámetros y misma versión de los datos
+# en versiones_tabla) reutiliza ese trabajo. Tras cada trabajo se borran los
+# de más de EXPORT_RETENTION_HOURS y, si los archivos superan EXPORT_MAX_MB,
+# los más antiguos.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from conexion.conexion import conexion_exclusiva, cerrar_conexion
+from catalogo import catalogo
+from exportacion import FORMATOS, FORMATOS_RECURSO, EXPORT_LOTE, lotes_tabla
+from repositorios import repos
+import reportes
+from reportes import ReporteInvalido
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                       'instance', 'exportaciones'))
+TRABAJOS_HILOS = int(os.environ.get('EXPORT_WORKERS', '2'))
+TRABAJOS_COLA = int(os.environ.get('EXPORT_QUEUE', '16'))
+RETENCION_HORAS = float(os.environ.get('EXPORT_RETENTION_HOURS', '24'))
+RETENCION_MB = float(os.environ.get('EXPORT_MAX_MB', '500'))
+# Un trabajo en marcha sin avances durante este tiempo (segundos) se da por perdido
+ABANDONO = float(os.environ.get('EXPORT_STALE_AFTER', '600'))
+# Segundos mínimos entre dos escrituras del progreso en la tabla
+AVANCE_INTERVALO = 1.0
+# Esperas (segundos) antes de reintentar la conexión de un trabajo; agotadas, el trabajo falla
+CONEXION_REINTENTOS = (0.5, 2.0)
+SIN_CONEXION = 'Sin conexión a la base de datos'
+
+# tipo -> (formatos admitidos, tablas de versiones_tabla de las que depende el resultado)
+TIPOS = {
+    'productos': (FORMATOS_RECURSO['productos'], ('productos', 'productos_recarga')),
+    'ventas': (FORMATOS_RECURSO['ventas'], ('ventas',)),
+    'detalle_ventas': (FORMATOS_RECURSO['detalle_ventas'], ('ventas',)),
+    'compras': (FORMATOS_RECURSO['compras'], ('compras',)),
+}
+TIPOS.update({f'reporte_{consulta}': (('json',), ('ventas',)) for consulta in reportes.CONSULTAS})
+
+log = logging.getLogger('papeleria.trabajos')
+
+
+class TrabajoInvalido(ValueError):
+    """Tipo, formato o parámetros de trabajo no válidos"""
+
+
+class TrabajosSaturados(RuntimeError):
+    """No hay hueco en la cola de trabajos; reintentar más tarde"""
+
+
+def _ahora():
+    return datetime.now().replace(microsecond=0)
+
+
+def parametros(tipo, formato, args):
+    """Parámetros validados del trabajo (para reportes, con el rango ya resuelto)"""
+    if tipo not in TIPOS:
+        raise TrabajoInvalido(f'Tipo de trabajo desconocido: {tipo}')
+    if formato not in TIPOS[tipo][0]:
+        raise TrabajoInvalido(f"Formato no disponible para {tipo}: {formato} (use {', '.join(TIPOS[tipo][0])})")
+    if not tipo.startswith('reporte_'):
+        return {}
+    try:
+        return reportes.parametros(tipo[len('reporte_'):], args)
+    except ReporteInvalido as e:
+        raise TrabajoInvalido(str(e))
+
+
+def resumen(fila):
+    """Estado del trabajo para la API y la página de trabajos"""
+    total = fila['total']
+    return {
+        'id': fila['id'],
+        'tipo': fila['tipo'],
+        'formato': fila['formato'],
+        'parametros': json.loads(fila['parametros'] or '{}'),
+        'estado': fila['estado'],
+        'progreso': fila['progreso'],
+        'total': total,
+        'porcentaje': 100 if fila['estado'] == 'terminado' else (
+            round(100 * fila['progreso'] / total) if total else 0),
+        'tamano': fila['tamano'],
+        'error': fila['error'],
+        'creado': str(fila['creado']),
+        'actualizado': str(fila['actualizado']),
+    }
+
+
+def _contar(lotes, avance):
+    hechas = 0
+    for lote in lotes:
+        yield lote
+        hechas += len(lote)
+        avance(hechas)
+
+
+def _generar(conn, tipo, formato, valores, avance):
+    """(total de filas o None si no se sabe de antemano, iterador de fragmentos de texto) del resultado"""
+    generador = FORMATOS[formato][0]
+    if tipo == 'productos':
+        foto = catalogo.sincronizar(conn)
+        return foto.estadisticas()['productos'], generador(_contar(foto.lotes(EXPORT_LOTE), avance))
+    if not tipo.startswith('reporte_'):
+        # Una consulta por lote: entre lote y lote la conexión queda libre para anotar el progreso
+        return None, generador(_contar(lotes_tabla(conn, tipo), avance), tipo)
+    datos = reportes.consultar(conn, tipo[len('reporte_'):], valores)
+    return len(datos['filas']), iter([json.dumps(datos, ensure_ascii=False)])
+
+
+class Trabajos:
+    def __init__(self, directorio=EXPORT_DIR, hilos=TRABAJOS_HILOS, cola=TRABAJOS_COLA,
+                 retencion_horas=RETENCION_HORAS, retencion_mb=RETENCION_MB, abandono=ABANDONO,
+                 conectar=conexion_exclusiva, cerrar=cerrar_conexion, reintentos=CONEXION_REINTENTOS):
+        self.directorio = directorio
+        self.hilos = max(0, hilos)
+        self.retencion_horas = retencion_horas
+        self.retencion_bytes = int(retencion_mb * 1024 * 1024)
+        self.abandono = abandono
+        self.conectar = conectar
+        self.cerrar_conexion = cerrar
+        self.reintentos = reintentos
+        # Trabajos en curso + en espera; hilos=0 ejecuta en el propio hilo (desarrollo y tests)
+        self._huecos = threading.BoundedSemaphore(max(1, self.hilos + max(0, cola)))
+        self._lock = threading.Lock()
+        self._ejecutor = None
+        self._sin_conexion = set()  # trabajos que fallaron sin poder escribirlo en la tabla
+        self.encolados = 0
+        self.reutilizados = 0
+        self.compartidos = 0
+        self.completados = 0
+        self.fallidos = 0
+        self.rechazados = 0
+        self.archivos_borrados = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='trabajo')
+            return self._ejecutor
+
+    def encolar(self, conn, tipo, formato, args, usuario_id=None):
+        """(fila del trabajo, True si es nuevo o False si se reutilizó uno vigente igual)"""
+        valores = parametros(tipo, formato, args)
+        versiones = repos(conn).versiones.leer(TIPOS[tipo][1])
+        clave = hashlib.sha256(json.dumps([tipo, formato, valores, versiones], sort_keys=True).encode()).hexdigest()
+        repo = repos(conn).trabajos
+        ahora = _ahora()
+
+        existente = repo.vigente(clave, ahora - timedelta(seconds=self.abandono))
+        if existente is not None and (existente['estado'] != 'terminado' or self.ruta(existente)):
+            with self._lock:
+                self.reutilizados += 1
+            return existente, False
+
+        if not self._huecos.acquire(blocking=False):
+            with self._lock:
+                self.rechazados += 1
+            log.warning("Cola de trabajos llena; se rechaza %s/%s", tipo, formato)
+            raise TrabajosSaturados('Hay demasiados trabajos en curso')
+        try:
+            trabajo_id = repo.crear(tipo, formato, json.dumps(valores, sort_keys=True), clave, usuario_id, ahora)
+            conn.commit()
+        except Exception:
+            self._huecos.release()
+            raise
+        with self._lock:
+            self.encolados += 1
+
+        if self.hilos == 0:
+            try:
+                self.ejecutar(trabajo_id)
+            finally:
+                self._huecos.release()
+        else:
+            self._pool().submit(self.ejecutar, trabajo_id).add_done_callback(lambda _: self._huecos.release())
+        self.marcar_sin_conexion(conn)
+        return repo.por_id(trabajo_id), True
+
+    def _conectar(self):
+        conn = self.conectar()
+        for espera in self.reintentos:
+            if conn is not None:
+                break
+            time.sleep(espera)
+            conn = self.conectar()
+        return conn
+
+    def marcar_sin_conexion(self, conn):
+        """Marca con error, usando `conn`, los trabajos cuyo hilo no consiguió conexión"""
+        with self._lock:
+            ids, self._sin_conexion = self._sin_conexion, set()
+        if not ids:
+            return
+        try:
+            repo = repos(conn).trabajos
+            for trabajo_id in ids:
+                repo.fallar(trabajo_id, SIN_CONEXION, _ahora())
+            conn.commit()
+        except Exception:
+            with self._lock:
+                self._sin_conexion |= ids
+            raise
+
+    def ejecutar(self, trabajo_id):
+        """Genera el archivo del trabajo con su propia conexión (hilo del pool)"""
+        conn = self._conectar()
+        if conn is None:
+            # Sin conexión tampoco se puede anotar el error: lo hace la próxima petición
+            # que pase por marcar_sin_conexion() (encolar, limpiar o la consulta del estado)
+            log.error("Trabajo %s sin conexión a la base de datos; se marcará como fallido", trabajo_id)
+            with self._lock:
+                self._sin_conexion.add(trabajo_id)
+                self.fallidos += 1
+            return
+        temporal = os.path.join(self.directorio, f'.{trabajo_id}.tmp')
+        try:
+            repo = repos(conn).trabajos
+            fila = repo.por_id(trabajo_id)
+            ultimo = [time.monotonic()]
+            filas = [0]
+
+            def avance(hechas):
+                filas[0] = hechas
+                if time.monotonic() - ultimo[0] >= AVANCE_INTERVALO:
+                    repo.avanzar(trabajo_id, hechas, _ahora())
+                    conn.commit()
+                    ultimo[0] = time.monotonic()
+
+            total, partes = _generar(conn, fila['tipo'], fila['formato'], json.loads(fila['parametros']), avance)
+            repo.iniciar(trabajo_id, total, _ahora())
+            conn.commit()
+
+            os.makedirs(self.directorio, exist_ok=True)
+            contenido = hashlib.sha256()
+            tamano = 0
+            with open(temporal, 'wb') as f:
+                for parte in partes:
+                    datos = parte.encode('utf-8')
+                    contenido.update(datos)
+                    f.write(datos)
+                    tamano += len(datos)
+
+            archivo = f"{contenido.hexdigest()}.{fila['formato']}"
+            destino = os.path.join(self.directorio, archivo)
+            if os.path.exists(destino):
+                # Mismo contenido que otro trabajo: se comparte el archivo (y se renueva para la limpieza)
+                os.remove(temporal)
+                os.utime(destino)
+                with self._lock:
+                    self.compartidos += 1
+            else:
+                os.replace(temporal, destino)
+            repo.terminar(trabajo_id, archivo, tamano, filas[0] if total is None else total, _ahora())
+            conn.commit()
+            with self._lock:
+                self.completados += 1
+        except Exception as e:
+            log.exception("Error en el trabajo %s: %s", trabajo_id, e)
+            conn.rollback()
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            repos(conn).trabajos.fallar(trabajo_id, str(e) or e.__class__.__name__, _ahora())
+            conn.commit()
+            with self._lock:
+                self.fallidos += 1
+            return
+        finally:
+            try:
+                self.limpiar(conn)
+            except Exception as e:
+                conn.rollback()
+                log.error("Error limpiando los trabajos: %s", e)
+            self.cerrar_conexion(conn)
+
+    def ruta(self, fila):
+        """Ruta del archivo del trabajo, o None si aún no está o ya se borró"""
+        if not fila['archivo']:
+            return None
+        ruta = os.path.join(self.directorio, fila['archivo'])
+        return ruta if os.path.exists(ruta) else None
+
+    def limpiar(self, conn):
+        """Aplica la retención por antigüedad y por espacio; devuelve cuántos trabajos y archivos borró"""
+        self.marcar_sin_conexion(conn)
+        ahora = _ahora()
+        repo = repos(conn).trabajos
+        abandonados = repo.abandonar(ahora - timedelta(seconds=self.abandono), ahora)
+        vencidos = repo.eliminar_anteriores(ahora - timedelta(hours=self.retencion_horas))
+
+        # Tope de espacio: se conservan los archivos de los trabajos más recientes
+        conservados, ocupado, lleno, sobrantes = set(), 0, False, []
+        for fila in repo.terminados():
+            if fila['archivo'] in conservados:
+                continue
+            if not lleno and ocupado + (fila['tamano'] or 0) <= self.retencion_bytes:
+                conservados.add(fila['archivo'])
+                ocupado += fila['tamano'] or 0
+            else:
+                lleno = True
+                sobrantes.append(fila['id'])
+        repo.eliminar(sobrantes)
+        conn.commit()
+
+        # Archivos sin trabajo (y temporales de trabajos perdidos) que no se tocan hace un rato
+        borrados = 0
+        if os.path.isdir(self.directorio):
+            referenciados = repo.archivos()
+            limite = time.time() - self.abandono
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                if nombre not in referenciados and os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    borrados += 1
+        with self._lock:
+            self.archivos_borrados += borrados
+        return {'abandonados': abandonados, 'vencidos': vencidos, 'por_espacio': len(sobrantes),
+                'archivos': borrados}
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'hilos': self.hilos,
+                'encolados': self.encolados,
+                'reutilizados': self.reutilizados,
+                'compartidos': self.compartidos,
+                'completados': self.completados,
+                'fallidos': self.fallidos,
+                'rechazados': self.rechazados,
+                'archivos_borrados': self.archivos_borrados,
+            }
+
+    def cerrar(self):
+        with self._lock:
+            ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+trabajos = Trabajos()
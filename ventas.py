@@ -0,0 +1,83 @@
+# ventas.py
+from collections import OrderedDict
+from repositorios import repos
+from catalogo import catalogo
+import alertas
+import estadisticas
+import movimientos
+import reportes
+
+
+class VentaInvalida(Exception):
+    """Error de validación de una venta (cliente, productos o stock)"""
+
+
+def agrupar_lineas(lineas):
+    """Suma las cantidades de un mismo producto conservando el orden de aparición"""
+    cantidades = OrderedDict()
+    for producto_id, cantidad in lineas:
+        try:
+            producto_id, cantidad = int(producto_id), int(cantidad)
+        except (TypeError, ValueError):
+            raise VentaInvalida('Cada línea necesita un producto y una cantidad numéricos')
+        if producto_id < 1 or cantidad < 1:
+            raise VentaInvalida('Cada línea necesita un producto válido y una cantidad mayor que cero')
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    if not cantidades:
+        raise VentaInvalida('La venta no tiene productos')
+    return cantidades
+
+
+def registrar_venta(conn, cliente_id, usuario_id, lineas):
+    """Registra una venta de N líneas en una sola transacción.
+
+    `lineas` es un iterable de pares (producto_id, cantidad). Valida los
+    productos contra la foto del catálogo en memoria, inserta el detalle con
+    executemany, calcula el total una sola vez y descuenta el stock con un
+    único UPDATE condicional que se vuelve a comprobar contra la base, porque
+    la foto puede estar un paso atrás de otra venta concurrente. Devuelve
+    (venta_id, total).
+    """
+    cantidades = agrupar_lineas(lineas)
+    r = repos(conn)
+    try:
+        # Verificar que el cliente existe
+        if not r.clientes.existe(cliente_id):
+            raise VentaInvalida('Cliente no encontrado')
+
+        # Todos los productos de la venta desde el catálogo en memoria
+        ids = list(cantidades)
+        productos = {p['id']: p for p in catalogo.sincronizar(conn).filas(ids)}
+
+        faltantes = [str(pid) for pid in ids if pid not in productos]
+        if faltantes:
+            raise VentaInvalida(f"Producto no encontrado: {', '.join(faltantes)}")
+
+        detalle = []
+        total = 0
+        for producto_id, cantidad in cantidades.items():
+            producto = productos[producto_id]
+            if producto['cantidad'] < cantidad:
+                raise VentaInvalida(
+                    f'Stock insuficiente de "{producto["nombre"]}". Solo hay {producto["cantidad"]} unidades'
+                )
+            subtotal = producto['precio'] * cantidad
+            total += subtotal
+            detalle.append((producto_id, cantidad, producto['precio'], subtotal))
+
+        # Crear venta y su detalle
+        venta_id = r.ventas.crear(cliente_id, usuario_id, total)
+        r.ventas.agregar_detalle(venta_id, detalle)
+        if not r.productos.restar_stock_lote(cantidades):
+            raise VentaInvalida('Stock insuficiente: otra venta acaba de llevarse parte de estos productos')
+        movimientos.registrar(conn, 'venta', {pid: -cantidad for pid, cantidad in cantidades.items()},
+                              referencia_id=venta_id, usuario_id=usuario_id)
+        estadisticas.venta_registrada(conn, total, unidades=sum(cantidades.values()))
+        reportes.venta_registrada(conn, venta_id, usuario_id, detalle, total)
+        alertas.evaluar(conn, ids)
+
+        conn.commit()
+        return venta_id, total
+    except Exception:
+        conn.rollback()
+        raise